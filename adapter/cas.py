@@ -0,0 +1,413 @@
+"""Content-addressed store for the copies of the input files
+and the input databases of runs. Each distinct content is
+stored once, as an object named after its hash, and the run
+folders hold hardlinks to the objects, so that repeated runs
+with unchanged inputs take up no further space.
+
+Restore a run folder to a folder of independent files with:
+
+    python -m adapter.cas restore <run folder> <destination folder>
+"""
+import argparse
+import errno
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import stat
+import tempfile
+import threading
+
+from adapter.comm.tools import lazy_import
+from adapter.manifest import Manifest
+
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# linux ioctl cloning a file on copy-on-write file systems
+_FICLONE = 0x40049409
+
+
+def clone_file(src, dest):
+    """Copies a file, as a reflink sharing the data blocks
+    where the file system supports it.
+
+    Parameters:
+
+        src: str
+            Source file path
+
+        dest: str
+            Destination file path
+    """
+    try:
+        import fcntl
+
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+
+    shutil.copyfile(src, dest)
+
+
+def unshare(path):
+    """Replaces a file that is a hardlink to a store
+    object with a private, writable copy, so that the
+    file can be modified without changing the store.
+
+    Parameters:
+
+        path: str
+            File path
+
+    Returns:
+
+        bool, whether the file got replaced
+    """
+    if not os.path.isfile(path) or os.stat(path).st_nlink < 2:
+        return False
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+
+    try:
+        clone_file(path, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    msg = "Replaced the link to the content store {} with a copy."
+    log.info(msg.format(path))
+
+    return True
+
+
+def table_digest(df):
+    """Hashes the column labels, types and values of a table,
+    and its index, which gets written as columns of its own.
+
+    Parameters:
+
+        df: pandas dataframe
+
+    Returns:
+
+        sha256 hexdigest: str
+    """
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps(
+            [
+                [str(col) for col in df.columns],
+                [str(dtype) for dtype in df.dtypes],
+                [str(name) for name in df.index.names],
+                [
+                    str(df.index.get_level_values(inx).dtype)
+                    for inx in range(df.index.nlevels)
+                ],
+            ]
+        ).encode()
+    )
+
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    except TypeError:
+        # unhashable values, such as lists
+        digest.update(pickle.dumps(df, protocol=4))
+
+    return digest.hexdigest()
+
+
+class ContentStore(object):
+    """Stores files by the hash of their content.
+
+    Objects are read only, so that a run file linked to an
+    object can not be modified in place by accident. Use
+    `unshare` before modifying a linked file.
+
+    Parameters:
+
+        store_dir: str
+            Store folder, created if missing. Has to be on
+            the same file system as the run folders for the
+            objects to be linked rather than copied.
+    """
+
+    manifest_filename = "content_store.json"
+
+    def __init__(self, store_dir):
+        self.store_dir = os.path.abspath(store_dir)
+        self.objects_dir = os.path.join(self.store_dir, "objects")
+        self.index_path = os.path.join(self.store_dir, "index.json")
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+
+    def object_path(self, digest):
+        """Path of the object with a given hash."""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def has(self, digest):
+        """Whether the store holds an object."""
+        return os.path.isfile(self.object_path(digest))
+
+    def read_index(self):
+        """Path: (size, mtime, hash) of the files hashed before."""
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def file_digest(self, path):
+        """Hashes a file, reusing the hash of the previous
+        call if the file size and modification time did not
+        change since, so that unchanged inputs are not read.
+
+        Parameters:
+
+            path: str
+                File path
+
+        Returns:
+
+            sha256 hexdigest: str
+        """
+        path = os.path.abspath(path)
+        file_stat = os.stat(path)
+
+        with self.lock:
+            entry = self.read_index().get(path)
+
+        if entry is not None and entry[:2] == [file_stat.st_size, file_stat.st_mtime_ns]:
+            return entry[2]
+
+        digest = Manifest.file_hash(path)
+
+        with self.lock:
+            index = self.read_index()
+            index[path] = [file_stat.st_size, file_stat.st_mtime_ns, digest]
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir)
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+        return digest
+
+    def put(self, path, digest=None):
+        """Adds a file to the store, unless an object
+        with the same content is stored already.
+
+        Parameters:
+
+            path: str
+                File path
+
+            digest: str
+                Default: None, hash of the file content
+                Key of the object
+
+        Returns:
+
+            digest: str
+        """
+        if digest is None:
+            digest = self.file_digest(path)
+
+        object_path = self.object_path(digest)
+
+        if not os.path.isfile(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(object_path))
+            os.close(fd)
+
+            try:
+                clone_file(path, tmp_path)
+                os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                # atomic, concurrent puts of the same content are harmless
+                os.replace(tmp_path, object_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            msg = "Stored {} as {}."
+            log.info(msg.format(path, digest))
+
+        return digest
+
+    def link(self, digest, dest):
+        """Places a stored object at a path, as a hardlink, or
+        as a copy if the store is on another file system.
+
+        Parameters:
+
+            digest: str
+                Key of the object
+
+            dest: str
+                Destination file path, replaced if it exists
+        """
+        object_path = self.object_path(digest)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest)))
+        os.close(fd)
+        os.remove(tmp_path)
+
+        try:
+            os.link(object_path, tmp_path)
+        except OSError as err:
+            if err.errno not in [errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP]:
+                raise
+
+            clone_file(object_path, tmp_path)
+
+        os.replace(tmp_path, dest)
+
+    def adopt(self, path, digest=None):
+        """Moves a file into the store and replaces it
+        with a link to the stored object.
+
+        Parameters:
+
+            path: str
+                File path
+
+            digest: str
+                Default: None, hash of the file content
+                Key of the object
+
+        Returns:
+
+            digest: str
+        """
+        digest = self.put(path, digest=digest)
+        self.link(digest, path)
+
+        return digest
+
+    def write_run_manifest(self, run_dir, entries):
+        """Records the stored objects of the files of a run folder.
+
+        Parameters:
+
+            run_dir: str
+                Run folder
+
+            entries: dict
+                File name: object hash
+        """
+        manifest_path = os.path.join(run_dir, self.manifest_filename)
+
+        manifest = {"store_dir": self.store_dir, "files": dict()}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+
+        manifest["store_dir"] = self.store_dir
+        manifest["files"].update(entries)
+
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+def restore(run_dir, dest_dir):
+    """Restores a run folder to a folder of independent,
+    writable files. Files listed in the run manifest that
+    are missing from the run folder get restored from the store.
+
+    Parameters:
+
+        run_dir: str
+            Run folder
+
+        dest_dir: str
+            Destination folder, created if missing
+
+    Returns:
+
+        file_names: list of str
+            Restored files
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+
+    manifest_path = os.path.join(run_dir, ContentStore.manifest_filename)
+    manifest = {"store_dir": None, "files": dict()}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+
+    restored = list()
+
+    for name in sorted(os.listdir(run_dir)):
+        path = os.path.join(run_dir, name)
+        if name == ContentStore.manifest_filename or not os.path.isfile(path):
+            continue
+
+        clone_file(path, os.path.join(dest_dir, name))
+        restored.append(name)
+
+    missing = [name for name in manifest["files"].keys() if name not in restored]
+
+    if len(missing) > 0:
+        store = ContentStore(manifest["store_dir"])
+
+        failures = list()
+        for name in missing:
+            if store.has(manifest["files"][name]):
+                clone_file(
+                    store.object_path(manifest["files"][name]), os.path.join(dest_dir, name)
+                )
+                restored.append(name)
+            else:
+                failures.append(name)
+
+        if len(failures) > 0:
+            msg = "Objects of files {} of run {} not found in the store {}."
+            log.error(msg.format(failures, run_dir, store.store_dir))
+            raise ValueError(msg.format(failures, run_dir, store.store_dir))
+
+    for name in restored:
+        os.chmod(os.path.join(dest_dir, name), 0o644)
+
+    msg = "Restored {} files of run {} to {}."
+    log.info(msg.format(len(restored), run_dir, dest_dir))
+
+    return restored
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        description="Restores a run folder linked to a content store."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="copy a run folder to a folder of independent files"
+    )
+    restore_parser.add_argument("run_dir")
+    restore_parser.add_argument("dest_dir")
+
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "restore":
+        restore(args.run_dir, args.dest_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+import csv
+import logging
+import ntpath
+import os
+import posixpath
+import re
+import sqlite3
+import zipfile
+from urllib.request import pathname2url
+from xml.etree import ElementTree
+
+from adapter.comm.tools import lazy_import
+from adapter.label_map import Labels
+
+pd = lazy_import("pandas")
+openpyxl = lazy_import("openpyxl")
+sqlalchemy = lazy_import("sqlalchemy")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+_ns = {
+    "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+_rel_id = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# catalog columns
+catalog_columns = [
+    "file_path",
+    "file_type",
+    "table_name",
+    "object_type",
+    "columns",
+    "n_columns",
+    "n_rows",
+    "rows_exact",
+    "query_only",
+    "parent_path",
+]
+
+
+def _read_rels(zf, part):
+    """Relationship id: target part path of a zip part."""
+    folder, name = posixpath.split(part)
+    rels_part = posixpath.join(folder, "_rels", name + ".rels")
+
+    if rels_part not in zf.namelist():
+        return dict()
+
+    targets = dict()
+    for rel in ElementTree.fromstring(zf.read(rels_part)).findall("rel:Relationship", _ns):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        targets[rel.get("Id")] = target
+
+    return targets
+
+
+def _ref_size(ref):
+    """Number of rows and columns of a cell range reference."""
+    min_col, min_row, max_col, max_row = openpyxl.utils.cell.range_boundaries(
+        ref.replace("$", "")
+    )
+    return max_row - min_row + 1, max_col - min_col + 1
+
+
+def get_excel_objects(file_path):
+    """Lists the named tables and named ranges of an excel
+    workbook, reading only the workbook, relationship and
+    table parts of the xlsx file, but none of the cells.
+
+    Parameters:
+
+        file_path: str
+            Path to an xlsx file
+
+    Returns:
+
+        objects: list of dict
+            One per named table or range, with keys 'name',
+            'object_type' ('table' or 'named_range'), 'sheet',
+            'ref', 'columns' (None for named ranges), 'n_columns'
+            and 'n_rows', the latter not counting the header row
+    """
+    objects = list()
+
+    with zipfile.ZipFile(file_path) as zf:
+        workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+        workbook_rels = _read_rels(zf, "xl/workbook.xml")
+
+        for sheet in workbook.findall("main:sheets/main:sheet", _ns):
+            sheet_part = workbook_rels.get(sheet.get(_rel_id))
+            if sheet_part is None:
+                continue
+
+            for table_part in _read_rels(zf, sheet_part).values():
+                if not table_part.startswith("xl/tables/"):
+                    continue
+
+                table = ElementTree.fromstring(zf.read(table_part))
+                columns = [
+                    column.get("name")
+                    for column in table.findall("main:tableColumns/main:tableColumn", _ns)
+                ]
+                n_rows, _ = _ref_size(table.get("ref"))
+                n_rows -= int(table.get("headerRowCount", 1)) + int(
+                    table.get("totalsRowCount", 0)
+                )
+
+                objects.append(
+                    {
+                        "name": table.get("name") or table.get("displayName"),
+                        "object_type": "table",
+                        "sheet": sheet.get("name"),
+                        "ref": table.get("ref"),
+                        "columns": columns,
+                        "n_columns": len(columns),
+                        "n_rows": n_rows,
+                    }
+                )
+
+        for defined_name in workbook.findall("main:definedNames/main:definedName", _ns):
+            if defined_name.get("localSheetId") is not None:
+                # worksheet scoped names are not loaded
+                continue
+
+            obj = {
+                "name": defined_name.get("name"),
+                "object_type": "named_range",
+                "sheet": None,
+                "ref": None,
+                "columns": None,
+                "n_columns": None,
+                "n_rows": None,
+            }
+
+            match = re.match(r"^'?(.+?)'?!(\$?[A-Z]+\$?\d+(:\$?[A-Z]+\$?\d+)?)$", defined_name.text or "")
+            if match is not None:
+                obj["sheet"] = match.group(1).replace("''", "'")
+                obj["ref"] = match.group(2).replace("$", "")
+
+                n_rows, n_columns = _ref_size(obj["ref"])
+                if ":" in obj["ref"]:
+                    # first row holds the column labels
+                    n_rows -= 1
+                else:
+                    obj["columns"] = [obj["name"]]
+
+                obj["n_rows"] = n_rows
+                obj["n_columns"] = n_columns
+
+            objects.append(obj)
+
+    return objects
+
+
+def read_excel_objects(file_path, names, objects=None):
+    """Reads named tables and ranges from an excel workbook,
+    streaming only the cells of those objects, instead of
+    parsing the whole workbook.
+
+    Parameters:
+
+        file_path: str
+            Path to an xlsx file
+
+        names: list of str
+            Named tables and ranges
+
+        objects: list of dict
+            Default: None, listed from the file
+            Return of `get_excel_objects`
+
+    Returns:
+
+        dict_of_dfs: dict of pandas dataframes
+            Tables found, keyed by name
+    """
+    if objects is None:
+        objects = get_excel_objects(file_path)
+
+    found = dict()
+    for obj in objects:
+        if obj["name"] in names and obj["ref"] is not None:
+            found.setdefault(obj["name"], obj)
+
+    if len(found) == 0:
+        return dict()
+
+    dict_of_dfs = dict()
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for name, obj in found.items():
+            min_col, min_row, max_col, max_row = openpyxl.utils.cell.range_boundaries(
+                obj["ref"]
+            )
+            rows = list(
+                wb[obj["sheet"]].iter_rows(
+                    min_row=min_row,
+                    max_row=max_row,
+                    min_col=min_col,
+                    max_col=max_col,
+                    values_only=True,
+                )
+            )
+
+            if ":" not in obj["ref"]:
+                dict_of_dfs[name] = pd.DataFrame([[rows[0][0]]], columns=[name])
+            else:
+                dict_of_dfs[name] = pd.DataFrame(
+                    [list(row) for row in rows[1:]], columns=list(rows[0])
+                )
+    finally:
+        wb.close()
+
+    return dict_of_dfs
+
+
+def read_excel_object(file_path, name, objects=None):
+    """Reads a single named table or range from an excel
+    workbook, see `read_excel_objects`.
+
+    Returns:
+
+        df: pandas dataframe or None
+            None if the object is not found
+    """
+    return read_excel_objects(file_path, [name], objects=objects).get(name)
+
+
+def get_excel_sheet_names(file_path):
+    """Lists the worksheet names of an excel workbook."""
+    with zipfile.ZipFile(file_path) as zf:
+        workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+
+    return [sheet.get("name") for sheet in workbook.findall("main:sheets/main:sheet", _ns)]
+
+
+def catalog_excel(file_path):
+    """Catalog entries of an excel workbook, see
+    `get_excel_objects`. Workbooks without any named
+    tables or ranges get read sheet by sheet, so the
+    sheets are listed instead, without their sizes.
+    """
+    objects = get_excel_objects(file_path)
+
+    if len(objects) == 0:
+        return [
+            {
+                "table_name": name,
+                "object_type": "sheet",
+                "columns": None,
+                "n_columns": None,
+                "n_rows": None,
+                "rows_exact": False,
+            }
+            for name in get_excel_sheet_names(file_path)
+        ]
+
+    return [
+        {
+            "table_name": obj["name"],
+            "object_type": obj["object_type"],
+            "columns": obj["columns"],
+            "n_columns": obj["n_columns"],
+            "n_rows": obj["n_rows"],
+            "rows_exact": obj["n_rows"] is not None,
+        }
+        for obj in objects
+    ]
+
+
+def connect_read_only(file_path):
+    """Opens a read only connection to a sqlite file."""
+    uri = "file:{}?mode=ro".format(pathname2url(os.path.abspath(file_path)))
+
+    return sqlite3.connect(uri, uri=True)
+
+
+def get_sqlite_table_names(con_or_path):
+    """Lists the tables of a sqlite database.
+
+    Parameters:
+
+        con_or_path: sqlite3 connection or str
+            Connection or path to a sqlite file
+
+    Returns:
+
+        table_names: list of str
+    """
+    if isinstance(con_or_path, str):
+        con = connect_read_only(con_or_path)
+        try:
+            return get_sqlite_table_names(con)
+        finally:
+            con.close()
+
+    # leaves out the fingerprints of incremental writes
+    return [
+        row[0]
+        for row in con_or_path.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' AND name != ? ORDER BY name",
+            (Labels().set_labels()["fingerprints"],),
+        )
+    ]
+
+
+def catalog_sqlite(file_path, exact_counts=False):
+    """Catalog entries of a sqlite database.
+
+    Parameters:
+
+        file_path: str
+            Path to a sqlite file
+
+        exact_counts: bool
+            Default: False, row counts are taken from the
+            `sqlite_stat1` table, if the database got analyzed,
+            or estimated from the largest rowid
+            True: count the rows of each table
+
+    Returns:
+
+        entries: list of dict
+    """
+    con = connect_read_only(file_path)
+
+    try:
+        names = get_sqlite_table_names(con)
+
+        stats = dict()
+        if not exact_counts and con.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone():
+            for table, stat in con.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                if stat:
+                    stats[table] = int(stat.split()[0])
+
+        entries = list()
+        for name in names:
+            quoted = '"{}"'.format(name.replace('"', '""'))
+            columns = [row[1] for row in con.execute("PRAGMA table_info({})".format(quoted))]
+
+            if exact_counts:
+                n_rows = con.execute("SELECT count(*) FROM {}".format(quoted)).fetchone()[0]
+                rows_exact = True
+            elif name in stats:
+                n_rows = stats[name]
+                rows_exact = False
+            else:
+                try:
+                    # rowid tables, exact unless rows got deleted
+                    n_rows = con.execute(
+                        "SELECT max(rowid) FROM {}".format(quoted)
+                    ).fetchone()[0] or 0
+                except sqlite3.OperationalError:
+                    n_rows = con.execute(
+                        "SELECT count(*) FROM {}".format(quoted)
+                    ).fetchone()[0]
+                rows_exact = False
+
+            entries.append(
+                {
+                    "table_name": name,
+                    "object_type": "sql_table",
+                    "columns": columns,
+                    "n_columns": len(columns),
+                    "n_rows": n_rows,
+                    "rows_exact": rows_exact,
+                }
+            )
+    finally:
+        con.close()
+
+    return entries
+
+
+def catalog_csv(file_path, table_name, sample_size=2**16):
+    """Catalog entry of a csv file. The number of rows is
+    estimated from the file size and the average length of
+    the rows found in the first sample_size bytes, unless
+    the whole file fits in the sample.
+
+    Parameters:
+
+        file_path: str
+            Path to a csv file
+
+        table_name: str
+            Table name of the file
+
+        sample_size: int
+            Default: 65536
+            Number of bytes read
+
+    Returns:
+
+        entries: list of dict
+    """
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, "r", newline="", encoding="utf-8", errors="replace") as f:
+        sample = f.read(sample_size)
+
+    lines = sample.splitlines(keepends=True)
+    columns = next(csv.reader(lines[:1]), list())
+
+    if len(columns) > 0 and columns[0] == "":
+        # unnamed index column, dropped when loaded
+        columns = columns[1:]
+
+    data_lines = [line for line in lines[1:] if line.strip() != ""]
+
+    if len(sample.encode("utf-8", errors="replace")) >= file_size:
+        n_rows = len(data_lines)
+        rows_exact = True
+    else:
+        # the last line of the sample may be cut
+        complete = data_lines[:-1]
+        if len(complete) == 0:
+            n_rows = None
+        else:
+            header_size = len(lines[0].encode("utf-8", errors="replace"))
+            row_size = sum(len(line.encode("utf-8", errors="replace")) for line in complete) / len(complete)
+            n_rows = int(round((file_size - header_size) / row_size))
+        rows_exact = False
+
+    return [
+        {
+            "table_name": table_name,
+            "object_type": "csv",
+            "columns": columns,
+            "n_columns": len(columns),
+            "n_rows": n_rows,
+            "rows_exact": rows_exact,
+        }
+    ]
+
+
+def catalog_sqlalchemy(engine):
+    """Catalog entries of a database, using
+    the SQLAlchemy inspector. Rows are not counted.
+
+    Parameters:
+
+        engine: sqlalchemy engine
+
+    Returns:
+
+        entries: list of dict
+    """
+    inspector = sqlalchemy.inspect(engine)
+
+    entries = list()
+    for name in inspector.get_table_names():
+        columns = [column["name"] for column in inspector.get_columns(name)]
+        entries.append(
+            {
+                "table_name": name,
+                "object_type": "sql_table",
+                "columns": columns,
+                "n_columns": len(columns),
+                "n_rows": None,
+                "rows_exact": False,
+            }
+        )
+
+    return entries
+
+
+def csv_table_name(file_path, extra_files_label):
+    """Table name of a csv file, as named by `IO.get_tables`."""
+    table_name = re.split(r"\.", ntpath.basename(file_path))[0]
+
+    if extra_files_label in table_name:
+        table_name = extra_files_label
+
+    return table_name
@@ -2,13 +2,13 @@ import os
 import logging
 import sqlite3
 
-import pandas as pd
+from adapter.comm.tools import lazy_import
+
+pd = lazy_import("pandas")
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
-from pdb import set_trace as bp
-
 
 class Sql(object):
     """Performs python-sqlite db communication.
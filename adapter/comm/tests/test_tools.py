@@ -3,9 +3,11 @@ from unittest import TestCase
 from unittest.mock import patch
 
 from adapter.comm.tools import (
+    PathResolver,
     convert_network_drive_path,
     get_mount_point_len,
     mark_time,
+    process_column_labels,
 )
 
 
@@ -186,6 +188,31 @@ class Test(TestCase):
             "/Volumes/Abc/First_Level/Second_Level/Third_Level/input",
         )
 
+    @patch("sys.platform", "linux")
+    def test_path_resolver(self):
+        paths = [r"X:\abc\1.xlsx", "/Volumes/A/abc/2.xlsx", r"X:\abc\1.xlsx"]
+        expected = ["/media/b/abc/1.xlsx", "/media/b/abc/2.xlsx", "/media/b/abc/1.xlsx"]
+
+        resolver = PathResolver()
+
+        with patch("os.path.exists", return_value=False) as exists:
+            self.assertEqual(resolver.resolve_many(paths), expected)
+            self.assertEqual(resolver.resolve(paths[0]), expected[0])
+            # each unique path got looked up once
+            self.assertEqual(exists.call_count, 2)
+
+        # results expire after ttl seconds
+        resolver = PathResolver(ttl=0)
+
+        with patch("os.path.exists", return_value=False) as exists:
+            resolver.resolve(paths[0])
+            resolver.resolve(paths[0])
+            self.assertEqual(exists.call_count, 2)
+
+    def test_process_column_labels(self):
+        labels = [" aa  bb ", "cc", 1]
+        self.assertEqual(process_column_labels(labels), ["aa bb", "cc", 1])
+
     def test_mark_time(self):
         self.assertRegex(
             mark_time(prefix="adapter", ts_format="short"),
@@ -1,10 +1,80 @@
+import fnmatch
+import glob
+import importlib
 import os
 import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import PureWindowsPath, PurePosixPath
-import tkinter as tk
-from tkinter import filedialog as fd
+
+
+class LazyModule(object):
+    """Stands in for a module that gets imported
+    only once any of its attributes is first accessed,
+    so that heavy dependencies do not slow down
+    the import of the adapter modules that
+    may not need them.
+
+    Parameters:
+
+        name: str
+            Module name, e.g. 'pandas'
+    """
+
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attr):
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+
+        return getattr(self.__module, attr)
+
+    def __repr__(self):
+        return "<lazily imported module '{}'>".format(self.__name)
+
+
+def lazy_import(name):
+    """Returns the module if it was already imported,
+    otherwise a proxy that imports it on first use.
+
+    Parameters:
+
+        name: str
+            Module name, e.g. 'pandas'
+
+    Returns:
+
+        module or LazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    return LazyModule(name)
+
+
+@lru_cache(maxsize=2**16)
+def clean_label(label):
+    """Removes leading and trailing spaces and
+    repeated spaces from a single string label.
+    Results are memoized, as the same labels
+    tend to repeat across many tables.
+
+    Parameters:
+
+        label: str
+            column label
+
+    Returns:
+
+        cleaned label: str
+    """
+    return re.sub(" +", " ", label.strip())
 
 
 def process_column_labels(list_of_labels):
@@ -21,7 +91,7 @@ def process_column_labels(list_of_labels):
             A list with cleaned lables
     """
     list_of_cleaned_labels = [
-        re.sub(" +", " ", lbl.strip()) if lbl is str else lbl
+        clean_label(lbl) if isinstance(lbl, str) else lbl
         for lbl in list_of_labels
     ]
 
@@ -71,6 +141,9 @@ def convert_network_drive_path(
         return str_or_path
     if os.path.exists(str_or_path):
         return str_or_path
+    if glob.has_magic(str_or_path) and glob.glob(str_or_path):
+        # return if it's a glob pattern matching local files
+        return str_or_path
     if os.getcwd() in str_or_path:
         # return if it's a local relative path
         return str_or_path
@@ -94,6 +167,107 @@ def convert_network_drive_path(
         raise IOError(f"Not supported OS: {sys.platform}!")
 
 
+class PathResolver(object):
+    """Converts network drive paths, see `convert_network_drive_path`,
+    and memoizes the results. Path conversion may need to look up
+    the path on the file system, which can be slow on network
+    mounts, so each unique path gets looked up only once
+    (or once per `ttl` seconds).
+
+    Parameters:
+
+        mapping: dict
+            OS, mount point pair. See `convert_network_drive_path`
+
+        ttl: float
+            Default: None, results never expire
+            Number of seconds after which a memoized
+            result gets looked up again
+    """
+
+    def __init__(
+        self,
+        mapping={"win32": "X:", "darwin": "/Volumes/A", "linux": "/media/b"},
+        ttl=None,
+    ):
+        self.mapping = mapping
+        self.ttl = ttl
+        self.cache = dict()
+        self.lock = threading.Lock()
+
+        # cache statistics
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, str_or_path):
+        """Converts a single path.
+
+        Parameters:
+
+            str_or_path: str
+                string holding a filepath
+
+        Returns:
+
+            str_or_path: str
+                converted filepath
+        """
+        if not isinstance(str_or_path, str):
+            return convert_network_drive_path(str_or_path, mapping=self.mapping)
+
+        now = time.monotonic()
+
+        with self.lock:
+            cached = self.cache.get(str_or_path)
+
+            if (cached is not None) and (self.ttl is None or now - cached[1] < self.ttl):
+                self.hits += 1
+                return cached[0]
+
+            self.misses += 1
+
+        resolved = convert_network_drive_path(str_or_path, mapping=self.mapping)
+
+        with self.lock:
+            self.cache[str_or_path] = (resolved, now)
+
+        return resolved
+
+    def resolve_many(self, paths, max_workers=None):
+        """Converts a batch of paths, looking up each
+        unique path not already memoized concurrently.
+
+        Parameters:
+
+            paths: list of str
+                filepaths
+
+            max_workers: int
+                Maximum number of concurrent look ups.
+                Default: None, see
+                concurrent.futures.ThreadPoolExecutor
+
+        Returns:
+
+            list of str
+                converted filepaths, in the order of paths
+        """
+        unique_paths = [
+            path for path in dict.fromkeys(paths) if isinstance(path, str)
+        ]
+
+        if len(unique_paths) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(self.resolve, unique_paths))
+
+        return [self.resolve(path) for path in paths]
+
+    def clear(self):
+        """Forgets all memoized paths."""
+        with self.lock:
+            self.cache = dict()
+
+
 def get_mount_point_len(mapping: dict, str_or_path: str) -> int:
     """Get the length of the current mount point.
     For example, get_mount_point_len(mapping={'win32': 'X:',
@@ -116,6 +290,93 @@ def get_mount_point_len(mapping: dict, str_or_path: str) -> int:
     return 0
 
 
+def is_multi_file_path(str_or_path):
+    """Checks whether a path points to more than a single
+    file, that is, whether it is a directory or a glob pattern.
+
+    Parameters:
+
+        str_or_path: str
+            string holding a filepath
+
+    Returns:
+
+        bool
+    """
+    if not isinstance(str_or_path, str):
+        return False
+
+    return os.path.isdir(str_or_path) or glob.has_magic(str_or_path)
+
+
+def expand_file_path(str_or_path, extensions=None):
+    """Lists all files found in a directory or matched
+    by a glob pattern. Directories are not searched
+    recursively, use a `**` glob pattern for that.
+
+    Parameters:
+
+        str_or_path: str
+            Directory path or a glob pattern,
+            e.g. 'inputs/regions/*.csv'
+
+        extensions: list of str, optional
+            File extensions without the leading dot
+            to keep, e.g. ['csv', 'db']. Default: None
+            keeps all files
+
+    Returns:
+
+        file_paths: list of str
+            Sorted list of matched file paths
+    """
+    if os.path.isdir(str_or_path):
+        pattern = os.path.join(str_or_path, "*")
+    else:
+        pattern = str_or_path
+
+    file_paths = [
+        path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)
+    ]
+
+    if extensions is not None:
+        file_paths = [
+            path
+            for path in file_paths
+            if re.split(r"\.", path)[-1].lower() in extensions
+        ]
+
+    return sorted(file_paths)
+
+
+def select_names(names, patterns, always=None):
+    """Selects the names matching any of the given
+    names or glob patterns, keeping their order.
+
+    Parameters:
+
+        names: list of str
+            Names to select from, e.g. table names
+
+        patterns: list of str
+            Names or glob patterns, e.g. ['prices', 'demand_*']
+
+        always: list of str, optional
+            Names or glob patterns selected in any case
+
+    Returns:
+
+        selected: list of str
+    """
+    patterns = list(patterns) + ([] if always is None else list(always))
+
+    return [
+        name
+        for name in names
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+    ]
+
+
 def user_select_file(user_message="", mul_fls=False):
     """Prompts the user to navigate and select a desired
     input file, as needed for a specific calculation.
@@ -137,6 +398,11 @@ def user_select_file(user_message="", mul_fls=False):
             in case of multiple file selection,
             the selected input folder path holding the files.
     """
+    # imported here as tkinter is not needed elsewhere
+    # and may not be available on headless machines
+    import tkinter as tk
+    from tkinter import filedialog as fd
+
     root = tk.Tk()
     root.withdraw()
 
@@ -0,0 +1,188 @@
+import logging
+
+from adapter.comm.tools import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def get_categorical_candidates(df, max_category_ratio=0.5):
+    """Finds the string columns of a table with few
+    distinct values relative to the number of rows.
+
+    Parameters:
+
+        df: pandas dataframe
+            Table
+
+        max_category_ratio: float
+            Largest ratio of the number of distinct values
+            to the number of rows for a column to be converted
+
+    Returns:
+
+        candidates: dict
+            Column label: array of distinct values
+    """
+    candidates = dict()
+
+    if len(df) == 0:
+        return candidates
+
+    for col in df.columns:
+        series = df[col]
+
+        if not isinstance(series, pd.Series) or series.dtype != object:
+            # skip duplicated labels and non-object columns
+            continue
+
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            continue
+
+        values = series.dropna().unique()
+
+        if len(values) <= max_category_ratio * len(series):
+            candidates[col] = values
+
+    return candidates
+
+
+def downcast_numeric(series):
+    """Downcasts an integer or float column to the smallest
+    type of the same kind that holds all of its values exactly.
+
+    Parameters:
+
+        series: pandas series
+
+    Returns:
+
+        series: pandas series
+            Downcast series, or the original if
+            it can not be downcast without loss
+    """
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+
+    if pd.api.types.is_integer_dtype(series.dtype) and isinstance(
+        series.dtype, np.dtype
+    ):
+        if pd.api.types.is_unsigned_integer_dtype(series.dtype):
+            return pd.to_numeric(series, downcast="unsigned")
+        return pd.to_numeric(series, downcast="integer")
+
+    if series.dtype == np.float64:
+        if series.abs().max() > np.finfo(np.float32).max:
+            return series
+
+        downcast = series.astype(np.float32)
+
+        exact = (downcast.astype(np.float64) == series) | (
+            series.isna() & downcast.isna()
+        )
+
+        if exact.all():
+            return downcast
+
+    return series
+
+
+def compact_dtypes(dict_of_dfs, max_category_ratio=0.5, share_categories=True):
+    """Reduces the memory used by a dictionary of dataframes.
+    Repeated string labels get stored as categoricals
+    and numeric columns get downcast where lossless.
+
+    Parameters:
+
+        dict_of_dfs: dict of pandas dataframes
+            Tables to compact. Compacted tables replace the
+            original tables in the passed dictionary.
+
+        max_category_ratio: float
+            Default: 0.5
+            Largest ratio of the number of distinct values
+            to the number of rows of a string column
+            to be converted to a categorical
+
+        share_categories: bool
+            Default: True
+            Same-labeled categorical columns across all tables
+            share a single categorical type, holding the
+            distinct values of all of them, so that they
+            can be compared and merged without conversions
+
+    Returns:
+
+        report: dict
+            Table name: dict with keys 'bytes_before',
+            'bytes_after', 'bytes_saved' and 'columns',
+            the latter being a dict of column label:
+            (original dtype, compacted dtype) for
+            each converted column
+    """
+    candidates = dict()
+    for name in dict_of_dfs.keys():
+        df = dict_of_dfs[name]
+        if isinstance(df, pd.DataFrame):
+            candidates[name] = get_categorical_candidates(
+                df, max_category_ratio=max_category_ratio
+            )
+
+    # shared categories of same-labeled columns
+    shared = dict()
+    if share_categories:
+        for columns in candidates.values():
+            for col, values in columns.items():
+                shared.setdefault(col, set()).update(values)
+
+        shared = {
+            col: pd.CategoricalDtype(sorted(values))
+            for col, values in shared.items()
+        }
+
+    report = dict()
+    for name in candidates.keys():
+        df = dict_of_dfs[name]
+        bytes_before = int(df.memory_usage(index=True, deep=True).sum())
+        dtypes_before = df.dtypes
+
+        converted = dict()
+        for inx, col in enumerate(df.columns):
+            series = df.iloc[:, inx]
+
+            if col in candidates[name]:
+                if share_categories:
+                    new = series.astype(shared[col])
+                else:
+                    new = series.astype("category")
+            else:
+                new = downcast_numeric(series)
+
+            if new.dtype != series.dtype:
+                converted[inx] = new
+
+        if len(converted) > 0:
+            df = df.copy(deep=False)
+            for inx, new in converted.items():
+                df.isetitem(inx, new)
+            dict_of_dfs[name] = df
+
+        bytes_after = int(df.memory_usage(index=True, deep=True).sum())
+
+        report[name] = {
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_saved": bytes_before - bytes_after,
+            "columns": {
+                df.columns[inx]: (str(dtypes_before.iloc[inx]), str(new.dtype))
+                for inx, new in converted.items()
+            },
+        }
+
+    msg = "Compacted table dtypes, saving {} bytes in total."
+    log.info(msg.format(sum(table["bytes_saved"] for table in report.values())))
+
+    return report
@@ -0,0 +1,348 @@
+import datetime
+import getpass
+import logging
+import socket
+import sqlite3
+
+from adapter.cas import table_digest
+from adapter.comm.tools import lazy_import
+
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def quote(name):
+    """Quotes an sqlite identifier."""
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def sql_type(dtype):
+    """Sqlite column type of a pandas dtype."""
+    kind = getattr(dtype, "kind", "O")
+
+    if kind in "bium":
+        return "INTEGER"
+    if kind == "f":
+        return "REAL"
+    if kind == "M":
+        return "TIMESTAMP"
+
+    return "TEXT"
+
+
+def sql_values(series):
+    """Converts a column to python values that sqlite can store,
+    as `pandas.DataFrame.to_sql` does. Durations are
+    stored as integer nanoseconds.
+
+    Parameters:
+
+        series: pandas series
+
+    Returns:
+
+        values: list
+    """
+    nulls = series.isna().to_numpy()
+
+    if getattr(series.dtype, "kind", "O") == "M":
+        values = series.astype(str).tolist()
+    elif getattr(series.dtype, "kind", "O") == "m":
+        values = series.to_numpy().view("int64").tolist()
+    else:
+        values = series.astype(object).tolist()
+
+    if nulls.any():
+        values = [None if null else value for value, null in zip(values, nulls)]
+
+    return values
+
+
+class ConsolidatedDb(object):
+    """Database holding the tables of many runs.
+
+    Each table `name` gets a `name__rows` table holding the
+    rows of each distinct version of the table once, tagged with
+    the content hash of the version in a `_version` column, and
+    a `name` view that lists the rows of each run with a `run_tag`
+    column. The `table_versions` table lists the table versions
+    of each run, and the `runs` table the run parameters and
+    provenance of each run. Tables that did not change between
+    runs are referenced rather than stored again. Query across
+    runs with, for example:
+
+        SELECT * FROM prices WHERE run_tag IN ('v1_2024...', 'v2_2024...')
+
+    Each run gets written in a single transaction.
+
+    Parameters:
+
+        path: str
+            Sqlite database path, created if missing
+
+        timeout: float
+            Default: 60
+            Seconds to wait for other processes
+            writing to the database
+    """
+
+    reserved = ["runs", "table_versions"]
+
+    def __init__(self, path, timeout=60.0):
+        self.path = path
+        self.timeout = timeout
+
+        with self.connect() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_tag TEXT PRIMARY KEY, created_at TEXT, input_path TEXT, "
+                "outpath TEXT, host TEXT, user TEXT, run_parameters TEXT)"
+            )
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS table_versions ("
+                "run_tag TEXT NOT NULL, table_name TEXT NOT NULL, "
+                "digest TEXT NOT NULL, n_rows INTEGER, "
+                "PRIMARY KEY (run_tag, table_name))"
+            )
+            con.execute(
+                "CREATE INDEX IF NOT EXISTS table_versions_digest "
+                "ON table_versions (table_name, digest)"
+            )
+        con.close()
+
+    def connect(self):
+        """Opens a connection to the database."""
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def add_run(self, run_tag, run_parameters=None, input_path=None, outpath=None):
+        """Records a run, replacing any earlier
+        record of a run with the same tag.
+
+        Parameters:
+
+            run_tag: str
+
+            run_parameters: pandas dataframe
+                Default: None
+                `run_parameters` table of the run
+
+            input_path: str
+                Default: None
+                Main input file path
+
+            outpath: str
+                Default: None
+                Output folder of the run
+        """
+        if run_parameters is not None:
+            run_parameters = run_parameters.to_json(orient="records", date_format="iso")
+
+        con = self.connect()
+        try:
+            with con:
+                con.execute(
+                    "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_tag,
+                        datetime.datetime.now().isoformat(timespec="seconds"),
+                        None if input_path is None else str(input_path),
+                        None if outpath is None else str(outpath),
+                        socket.gethostname(),
+                        getpass.getuser(),
+                        run_parameters,
+                    ),
+                )
+        finally:
+            con.close()
+
+    def write_tables(self, run_tag, dict_of_dfs):
+        """Writes the tables of a run. Table versions stored
+        before, by this or any other run, only get referenced.
+
+        Parameters:
+
+            run_tag: str
+
+            dict_of_dfs: dict of pandas dataframes
+
+        Returns:
+
+            stored: dict
+                Table name: True if the rows got
+                stored, False if referenced
+        """
+        stored = dict()
+
+        con = self.connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+
+            # runs written without being loaded
+            con.execute(
+                "INSERT OR IGNORE INTO runs (run_tag, created_at) VALUES (?, ?)",
+                (run_tag, datetime.datetime.now().isoformat(timespec="seconds")),
+            )
+
+            for table_name, df in dict_of_dfs.items():
+                stored[table_name] = self.write_table(con, run_tag, table_name, df)
+
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+        finally:
+            con.close()
+
+        msg = "Wrote {} tables of run {} to {}, {} of them unchanged."
+        log.info(
+            msg.format(
+                len(stored), run_tag, self.path, sum(not i for i in stored.values())
+            )
+        )
+
+        return stored
+
+    def write_table(self, con, run_tag, table_name, df):
+        """Writes a table of a run within an open transaction,
+        see `write_tables`."""
+        if table_name in self.reserved or table_name.endswith("__rows"):
+            msg = "Table name {} is reserved in the consolidated database."
+            log.error(msg.format(table_name))
+            raise ValueError(msg.format(table_name))
+
+        columns = [str(col) for col in df.columns]
+        if "run_tag" in columns or "_version" in columns:
+            msg = (
+                "Table {} has a run_tag or _version column, "
+                "which the consolidated database adds."
+            )
+            log.error(msg.format(table_name))
+            raise ValueError(msg.format(table_name))
+
+        digest = table_digest(df)
+        rows_table = quote(table_name + "__rows")
+
+        previous = con.execute(
+            "SELECT digest FROM table_versions WHERE run_tag = ? AND table_name = ?",
+            (run_tag, table_name),
+        ).fetchone()
+
+        con.execute(
+            "INSERT OR REPLACE INTO table_versions VALUES (?, ?, ?, ?)",
+            (run_tag, table_name, digest, len(df)),
+        )
+
+        if previous is not None and previous[0] != digest:
+            # drop the rows of a rewritten version no run refers to
+            if con.execute(
+                "SELECT 1 FROM table_versions WHERE table_name = ? AND digest = ?",
+                (table_name, previous[0]),
+            ).fetchone() is None:
+                con.execute(
+                    "DELETE FROM {} WHERE _version = ?".format(rows_table), (previous[0],)
+                )
+
+        if con.execute(
+            "SELECT 1 FROM table_versions WHERE table_name = ? AND digest = ? "
+            "AND run_tag != ?",
+            (table_name, digest, run_tag),
+        ).fetchone() is not None or (previous is not None and previous[0] == digest):
+            return False
+
+        existing = [
+            row[1] for row in con.execute("PRAGMA table_info({})".format(rows_table))
+        ]
+
+        if len(existing) == 0:
+            con.execute(
+                "CREATE TABLE {} (_version TEXT NOT NULL, {})".format(
+                    rows_table,
+                    ", ".join(
+                        "{} {}".format(quote(col), sql_type(dtype))
+                        for col, dtype in zip(columns, df.dtypes)
+                    ),
+                )
+            )
+            con.execute(
+                "CREATE INDEX {} ON {} (_version)".format(
+                    quote(table_name + "__rows_version"), rows_table
+                )
+            )
+
+        new_columns = [
+            (col, dtype) for col, dtype in zip(columns, df.dtypes) if col not in existing
+        ]
+        if len(existing) > 0:
+            for col, dtype in new_columns:
+                con.execute(
+                    "ALTER TABLE {} ADD COLUMN {} {}".format(
+                        rows_table, quote(col), sql_type(dtype)
+                    )
+                )
+
+        if len(existing) == 0 or len(new_columns) > 0:
+            all_columns = [
+                row[1]
+                for row in con.execute("PRAGMA table_info({})".format(rows_table))
+                if row[1] != "_version"
+            ]
+            con.execute("DROP VIEW IF EXISTS {}".format(quote(table_name)))
+            con.execute(
+                "CREATE VIEW {} AS SELECT v.run_tag AS run_tag, {} FROM table_versions v "
+                "JOIN {} r ON r._version = v.digest WHERE v.table_name = {}".format(
+                    quote(table_name),
+                    ", ".join("r.{}".format(quote(col)) for col in all_columns),
+                    rows_table,
+                    "'{}'".format(table_name.replace("'", "''")),
+                )
+            )
+
+        values = [sql_values(df.iloc[:, inx]) for inx in range(df.shape[1])]
+        con.executemany(
+            "INSERT INTO {} (_version, {}) VALUES (?, {})".format(
+                rows_table,
+                ", ".join(quote(col) for col in columns),
+                ", ".join("?" for _ in columns),
+            ),
+            ((digest,) + row for row in zip(*values)) if len(columns) > 0 else [],
+        )
+
+        return True
+
+    def read_table(self, table_name, run_tags=None):
+        """Reads the rows of a table of some or all runs.
+
+        Parameters:
+
+            table_name: str
+
+            run_tags: list of str
+                Default: None, all runs
+
+        Returns:
+
+            df: pandas dataframe
+                With a run_tag column
+        """
+        query = "SELECT * FROM {}".format(quote(table_name))
+        params = list()
+
+        if run_tags is not None:
+            query += " WHERE run_tag IN ({})".format(", ".join("?" for _ in run_tags))
+            params = list(run_tags)
+
+        con = self.connect()
+        try:
+            return pd.read_sql_query(query, con, params=params)
+        finally:
+            con.close()
+
+    def get_runs(self):
+        """Lists the runs, as a dataframe of the `runs` table."""
+        con = self.connect()
+        try:
+            return pd.read_sql_query("SELECT * FROM runs ORDER BY created_at", con)
+        finally:
+            con.close()
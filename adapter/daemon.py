@@ -0,0 +1,617 @@
+"""Local loader service that keeps the input tables of
+an analysis loaded in memory and serves them to other
+processes on the same machine over a Unix socket.
+
+Start the service, from the repo root folder:
+
+    python -m adapter.daemon path/to/input.xlsx --socket /tmp/adapter.sock
+
+and load from any script:
+
+    from adapter.daemon import LoaderClient
+
+    res = LoaderClient("/tmp/adapter.sock").load()
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+from adapter.comm.tools import expand_file_path, lazy_import
+from adapter.i_o import IO
+from adapter.shared import _is_shareable
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# length prefix of each message frame
+_frame_header = struct.Struct("<Q")
+
+
+def send_frame(sock, payload):
+    """Sends a length prefixed frame.
+
+    Parameters:
+
+        sock: socket
+
+        payload: bytes-like
+    """
+    payload = memoryview(payload).cast("B")
+    sock.sendall(_frame_header.pack(payload.nbytes))
+    sock.sendall(payload)
+
+
+def recv_exact(sock, size):
+    """Receives exactly size bytes."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Connection closed while receiving.")
+        received += n
+
+    return buf
+
+
+def recv_frame(sock):
+    """Receives a length prefixed frame.
+
+    Returns:
+
+        payload: bytearray
+    """
+    (size,) = _frame_header.unpack(recv_exact(sock, _frame_header.size))
+
+    return recv_exact(sock, size)
+
+
+def encode_tables(dict_of_dfs):
+    """Encodes tables into the columnar wire format. Fixed
+    width columns and the codes of categorical columns
+    are sent as raw buffers, all other columns, the
+    indexes and the column labels are pickled.
+
+    Parameters:
+
+        dict_of_dfs: dict of pandas dataframes
+
+    Returns:
+
+        header: dict
+            Json serializable description of the buffers
+
+        buffers: list of bytes-like
+    """
+    header = list()
+    buffers = list()
+
+    for name, df in dict_of_dfs.items():
+        columns = list()
+
+        for inx in range(df.shape[1]):
+            series = df.iloc[:, inx]
+
+            if _is_shareable(series.dtype):
+                columns.append({"kind": "array", "dtype": series.dtype.str})
+                # raw bytes, as not all types export buffers
+                buffers.append(np.ascontiguousarray(series.to_numpy()).view(np.uint8))
+
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                codes = np.ascontiguousarray(series.cat.codes.to_numpy())
+                columns.append({"kind": "categorical", "dtype": codes.dtype.str})
+                buffers.append(codes.view(np.uint8))
+                buffers.append(pickle.dumps(series.dtype, protocol=5))
+
+            else:
+                columns.append({"kind": "pickle"})
+                buffers.append(pickle.dumps(series.array, protocol=5))
+
+        header.append({"name": name, "nrows": len(df), "columns": columns})
+        buffers.append(
+            pickle.dumps({"columns": list(df.columns), "index": df.index}, protocol=5)
+        )
+
+    return header, buffers
+
+
+def decode_tables(header, buffers):
+    """Decodes tables from the columnar wire format,
+    see `encode_tables`.
+
+    Parameters:
+
+        header: list of dict
+
+        buffers: iterator of bytearray
+
+    Returns:
+
+        dict_of_dfs: dict of pandas dataframes
+    """
+    dict_of_dfs = dict()
+
+    for table in header:
+        data = dict()
+
+        for inx, column in enumerate(table["columns"]):
+            if column["kind"] == "array":
+                data[inx] = np.frombuffer(next(buffers), dtype=np.dtype(column["dtype"]))
+
+            elif column["kind"] == "categorical":
+                codes = np.frombuffer(next(buffers), dtype=np.dtype(column["dtype"]))
+                data[inx] = pd.Categorical.from_codes(
+                    codes, dtype=pickle.loads(next(buffers))
+                )
+
+            else:
+                data[inx] = pickle.loads(next(buffers))
+
+        labels = pickle.loads(next(buffers))
+
+        df = pd.DataFrame(data, index=labels["index"], copy=False)
+        df.columns = labels["columns"]
+
+        dict_of_dfs[table["name"]] = df
+
+    return dict_of_dfs
+
+
+class LoaderServer(object):
+    """Loads an input file with an incremental `IO` object,
+    keeps the tables in memory and serves them over a
+    Unix socket, see `LoaderClient`.
+
+    All input files read in are watched for changes,
+    as are the directories and glob patterns listing
+    input files for files added or removed. Once any
+    of them change, the inputs get reloaded,
+    reusing the tables of all unchanged files, and the
+    served generation number increases. If a reload
+    fails, the previously loaded tables continue to be
+    served and the error is reported to the clients
+    through `LoaderClient.status`.
+
+    The socket is only accessible to the user running
+    the service. Clients unpickle the non-numeric columns
+    sent by the service, so only connect to services
+    started by the same user.
+
+    Parameters:
+
+        path: str
+            Input file path, see `IO`
+
+        socket_path: str
+            Path of the Unix socket to listen on
+
+        poll_interval: float
+            Default: 1.0
+            Seconds between checks for changed input files
+
+        cache_dir: str
+            Default: None
+            See `IO`
+
+        **load_kwargs:
+            Passed to `IO.load`. Defaults to skip_writeout=True.
+    """
+
+    def __init__(
+        self, path, socket_path, poll_interval=1.0, cache_dir=None, **load_kwargs
+    ):
+        self.path = path
+        self.socket_path = socket_path
+        self.poll_interval = poll_interval
+
+        self.load_kwargs = {"skip_writeout": True}
+        self.load_kwargs.update(load_kwargs)
+
+        self.io = IO(path, incremental=True, cache_dir=cache_dir)
+
+        self.lock = threading.Lock()
+        # the IO object loads one generation at a time
+        self.reload_lock = threading.Lock()
+        self.res = None
+        self.generation = 0
+        self.file_stats = dict()
+        self.file_sets = dict()
+        self.last_error = None
+
+        self.stopped = threading.Event()
+        self.server = None
+        self.threads = list()
+
+        self.reload()
+
+    def get_input_files(self):
+        """Paths of all files read in by the latest load."""
+        paths = {entry["path"] for entry in self.io.manifest.entries.values()}
+
+        if isinstance(self.io.input_path, str) and os.path.isfile(self.io.input_path):
+            paths.add(os.path.abspath(self.io.input_path))
+
+        return paths
+
+    @staticmethod
+    def stat_files(paths):
+        """Sizes and modification times of files,
+        None for missing files."""
+        file_stats = dict()
+
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                file_stats[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                file_stats[path] = None
+
+        return file_stats
+
+    def list_file_sets(self, patterns):
+        """Files found in each directory or matched
+        by each glob pattern."""
+        return {
+            pattern: expand_file_path(
+                pattern, extensions=self.io.supported_extensions
+            )
+            for pattern in patterns
+        }
+
+    def reload(self):
+        """Loads the inputs, reusing the tables of unchanged
+        files, and swaps in the new tables."""
+        with self.reload_lock:
+            res = self.io.load(**self.load_kwargs)
+
+            # connections can not be served to clients
+            res.pop("db_conn", None)
+
+            file_stats = self.stat_files(self.get_input_files())
+            file_sets = self.list_file_sets(self.io.file_sets)
+
+        with self.lock:
+            self.res = res
+            self.file_stats = file_stats
+            self.file_sets = file_sets
+            self.generation += 1
+            self.last_error = None
+
+        msg = "Loaded generation {} of {} tables from {} files."
+        log.info(
+            msg.format(self.generation, len(res["tables_as_dict_of_dfs"]), len(file_stats))
+        )
+
+    def changed(self):
+        """True if any watched input file changed, or
+        files got added to or removed from a watched
+        directory or glob pattern."""
+        with self.lock:
+            file_stats = self.file_stats
+            file_sets = self.file_sets
+
+        return (
+            self.stat_files(file_stats.keys()) != file_stats
+            or self.list_file_sets(file_sets.keys()) != file_sets
+        )
+
+    def watch(self):
+        """Reloads the inputs whenever a watched file
+        changes, until the server is stopped."""
+        while not self.stopped.wait(self.poll_interval):
+            if not self.changed():
+                continue
+
+            try:
+                self.reload()
+            except Exception as e:
+                msg = "Reloading {} failed, serving generation {}: {}"
+                log.error(msg.format(self.path, self.generation, e))
+
+                with self.lock:
+                    self.last_error = "{}: {}".format(type(e).__name__, e)
+                    # do not retry until the files change again
+                    self.file_stats = self.stat_files(self.file_stats.keys())
+                    self.file_sets = self.list_file_sets(self.file_sets.keys())
+
+    def handle(self, sock):
+        """Answers the requests of a connected client."""
+        while True:
+            try:
+                request = json.loads(recv_frame(sock))
+            except ConnectionError:
+                return
+
+            command = request.get("command")
+
+            with self.lock:
+                res = self.res
+                status = {
+                    "generation": self.generation,
+                    "last_error": self.last_error,
+                    "files": sorted(self.file_stats.keys()),
+                    "file_sets": sorted(self.file_sets.keys()),
+                }
+
+            tables = res["tables_as_dict_of_dfs"]
+
+            if command == "status":
+                send_frame(sock, json.dumps(status).encode())
+
+            elif command == "tables":
+                send_frame(sock, json.dumps(list(tables.keys())).encode())
+
+            elif command == "load":
+                names = request.get("tables")
+                if names is None:
+                    names = list(tables.keys())
+
+                missing = [name for name in names if name not in tables.keys()]
+                if len(missing) > 0:
+                    send_frame(
+                        sock,
+                        json.dumps(
+                            {"error": "Tables {} are not loaded.".format(missing)}
+                        ).encode(),
+                    )
+                    continue
+
+                header, buffers = encode_tables({name: tables[name] for name in names})
+
+                send_frame(
+                    sock,
+                    json.dumps(
+                        {
+                            "tables": header,
+                            "outpath": res["outpath"],
+                            "run_tag": res["run_tag"],
+                            "generation": status["generation"],
+                        }
+                    ).encode(),
+                )
+                for buffer in buffers:
+                    send_frame(sock, buffer)
+
+            elif command == "reload":
+                try:
+                    self.reload()
+                    response = {"generation": self.generation}
+                except Exception as e:
+                    response = {"error": "{}: {}".format(type(e).__name__, e)}
+                send_frame(sock, json.dumps(response).encode())
+
+            else:
+                send_frame(
+                    sock,
+                    json.dumps({"error": "Unknown command {}.".format(command)}).encode(),
+                )
+
+    def start(self):
+        """Starts serving and watching in background threads.
+        Replaces a stale socket file, but raises a ValueError
+        if a running daemon answers on the socket."""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except ConnectionRefusedError:
+                # stale socket of a previous run
+                os.remove(self.socket_path)
+            else:
+                msg = "A loader daemon is already serving on {}."
+                log.error(msg.format(self.socket_path))
+                raise ValueError(msg.format(self.socket_path))
+            finally:
+                probe.close()
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server.handle(self.request)
+
+        old_umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+
+        self.server.daemon_threads = True
+
+        self.threads = [
+            threading.Thread(target=self.server.serve_forever, daemon=True),
+            threading.Thread(target=self.watch, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+        log.info("Serving {} on {}.".format(self.path, self.socket_path))
+
+        return self
+
+    def stop(self):
+        """Stops serving and removes the socket."""
+        self.stopped.set()
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+        for thread in self.threads:
+            thread.join()
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class LoaderClient(object):
+    """Loads tables served by a `LoaderServer`.
+
+    Parameters:
+
+        socket_path: str
+            Path of the Unix socket the server listens on
+
+        timeout: float
+            Default: None, no timeout
+            Socket timeout in seconds
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+
+    def connect(self):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            self.sock.connect(self.socket_path)
+
+        return self.sock
+
+    def request(self, command, **kwargs):
+        """Sends a request and receives the json response."""
+        sock = self.connect()
+
+        request = {"command": command}
+        request.update(kwargs)
+        send_frame(sock, json.dumps(request).encode())
+
+        response = json.loads(recv_frame(sock))
+
+        if isinstance(response, dict) and "error" in response:
+            msg = "Loader service at {} failed: {}".format(
+                self.socket_path, response["error"]
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+        return response
+
+    def load(self, tables=None):
+        """Gets the served tables, in the format
+        returned by `IO.load`.
+
+        Parameters:
+
+            tables: list of str
+                Default: None, all tables
+                Names of the tables to get
+
+        Returns:
+
+            res : dict
+                Keys:
+
+                'tables_as_dict_of_dfs' - dictionary
+                    of dataframes
+                'outpath' - output folder path
+                'run_tag' - version + analysis start time
+                'generation' - number of the served load,
+                    increases with each reload
+        """
+        response = self.request("load", tables=tables)
+
+        def buffers():
+            while True:
+                yield recv_frame(self.sock)
+
+        return {
+            "tables_as_dict_of_dfs": decode_tables(response["tables"], buffers()),
+            "outpath": response["outpath"],
+            "run_tag": response["run_tag"],
+            "generation": response["generation"],
+        }
+
+    def tables(self):
+        """Names of the served tables."""
+        return self.request("tables")
+
+    def status(self):
+        """Generation number, last reload error, and
+        watched files, directories and glob patterns
+        of the server.
+
+        Returns:
+
+            status: dict
+        """
+        return self.request("status")
+
+    def reload(self):
+        """Makes the server reload the inputs now.
+
+        Returns:
+
+            generation: int
+        """
+        return self.request("reload")["generation"]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("path", help="input file path")
+    parser.add_argument("--socket", required=True, help="Unix socket path")
+    parser.add_argument("--poll-interval", type=float, default=1.0,
+                        help="seconds between checks for changed inputs")
+    parser.add_argument("--cache-dir", default=None,
+                        help="folder to persist parsed tables to")
+    parser.add_argument("--recursive", action="store_true",
+                        help="follow nested inputs_from_files tables")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    server = LoaderServer(
+        args.path,
+        args.socket,
+        poll_interval=args.poll_interval,
+        cache_dir=args.cache_dir,
+        recursive=args.recursive,
+    ).start()
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,61 @@
 import gzip
+import hashlib
+import json
 import logging
 import ntpath
 import os
 import pickle
 import re
 import sqlite3
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from shutil import copy
 
-import numpy as np
-import pandas as pd
-
-from adapter.comm.tools import convert_network_drive_path, mark_time
+from adapter.comm.tools import (
+    PathResolver,
+    clean_label,
+    expand_file_path,
+    is_multi_file_path,
+    lazy_import,
+    mark_time,
+    select_names,
+)
+from adapter.catalog import (
+    catalog_columns,
+    catalog_csv,
+    catalog_excel,
+    catalog_sqlalchemy,
+    catalog_sqlite,
+    connect_read_only,
+    csv_table_name,
+    get_excel_objects,
+    get_sqlite_table_names,
+    read_excel_objects,
+)
+from adapter.cas import ContentStore, table_digest, unshare
+from adapter.compact import compact_dtypes
+from adapter.consolidated import ConsolidatedDb
+from adapter.incremental import (
+    discard_scratch,
+    is_open,
+    open_scratch,
+    publish_scratch,
+    read_fingerprints,
+    write_table,
+)
 from adapter.label_map import Labels
+from adapter.manifest import Manifest
+from adapter.overlay import upsert_rows
+from adapter.sampling import csv_sample_kwargs, parse_sample, sample_frame
+from adapter.schema import Schema
+from adapter.spill import SpillingDict
+from adapter.stats import LoadStats
 from adapter.to_python import Excel, Db, Db_sqlalchemy, Debugger
 
+# backends get imported once first used
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 
@@ -53,10 +95,41 @@ class IO(object):
             network drive location (e.g. "/Volumes/A").
             Defaults to [("X:","/Volumes/my_folder")].
 
+        incremental: bool
+            Default: False
+            Keep a manifest of all input files read in,
+            so that repeated calls of `load` only read
+            in the files that changed since, and reuse
+            the tables of all other files. The reused
+            tables share their data with the manifest,
+            so they should not be modified in place.
+
+        cache_dir: str
+            Default: None, the manifest is only kept in
+            memory
+            Folder where the manifest and the parsed tables
+            get stored, so that they can be reused by
+            any later `IO` instance. Implies incremental=True.
+
+        path_cache_ttl: float
+            Default: None, converted paths never expire
+            Number of seconds for which the network drive
+            path conversion of any input and output path is
+            memoized, see `adapter.comm.tools.PathResolver`
+
     """
 
+    # input file extensions recognized when
+    # reading all files found in a folder
+    supported_extensions = ["xlsx", "db", "sqlite", "csv"]
+
+    # csv output file extension suffixes
+    # for each supported compression
+    csv_compression_extensions = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
     def __init__(self, path, os_mapping={'win32': 'X:', 'darwin': '/Volumes/A',
-                                         'linux': '/media/b'}):
+                                         'linux': '/media/b'},
+                 incremental=False, cache_dir=None, path_cache_ttl=None):
         # backwards compatibility
         if not isinstance(os_mapping, dict):
             # automatically assume list of tuples
@@ -67,7 +140,10 @@ class IO(object):
         else:
             self.os_mapping = os_mapping
 
-        path = convert_network_drive_path(path, mapping=os_mapping)
+        # memoizes network drive path conversions
+        self.resolver = PathResolver(mapping=os_mapping, ttl=path_cache_ttl)
+
+        path = self.resolver.resolve(path)
 
         self.input_path = path
 
@@ -77,6 +153,35 @@ class IO(object):
         # set labels
         self.la = Labels().set_labels()
 
+        if incremental or (cache_dir is not None):
+            self.manifest = Manifest(cache_dir=cache_dir)
+        else:
+            self.manifest = None
+
+        # statistics of the latest load, see `load`
+        self.stats = LoadStats(enabled=False)
+
+        # declared table schema of the latest load, see `load`
+        self.schema = None
+
+        # names or patterns of the tables to load, see `load`
+        self.table_selection = None
+
+        # row sample read from each table, see `load`
+        self.sample = None
+
+        # directories and glob patterns expanded
+        # by the latest load, see `get_tables`
+        self.file_sets = set()
+
+        # tables read regardless of the table selection,
+        # any table named run_parameters{any_text} is used
+        self.always_read = [
+            "*{}*".format(self.la["run_pars"]),
+            self.la["extra_files"],
+            self.la["schema"],
+        ]
+
     def get_file_type(self, path):
         """Extracts the file type from the fullpath.
 
@@ -124,6 +229,25 @@ class IO(object):
         clean_labels=True,
         to_numeric=None,
         ts_format="short",
+        max_workers=None,
+        recursive=False,
+        collect_stats=False,
+        stats_hook=None,
+        copy_tables=True,
+        memory_budget=None,
+        spill_dir=None,
+        compact=False,
+        max_category_ratio=0.5,
+        schema=None,
+        unique_run_tag=False,
+        tables=None,
+        sample=None,
+        write_sample=False,
+        store_dir=None,
+        consolidated_db=None,
+        strict_db=False,
+        db_indexes=None,
+        db_scratch=None,
     ):
         """Loads tables from the input file
         as a dictionary of python dataframes.
@@ -137,10 +261,26 @@ class IO(object):
 
             - `inputs_from_files`, that specifies a list of
             additional input files of file types: csv, excel, db.
+            A `File Path` entry can also be a directory or a glob
+            pattern (e.g. `inputs/regions/*.csv`), in which
+            case all matched files get loaded, and, if the
+            optional `Concatenate` column is set to 'Y',
+            concatenated into a single table per table name.
             See examples in the test folders on the master
             branch of the adapter repo for details on the
             structure and labels of the table.
 
+            - `table_schema`, that declares column types,
+            index columns and required columns of any input
+            tables, see `adapter.schema.Schema`. Tables read
+            after the schema table get parsed directly into
+            the declared types and all other tables get
+            converted once read. Any values that do not match
+            the declared types, missing required columns and
+            missing required values raise a single ValueError
+            listing all of them, before anything is written out.
+            Declared index columns are set as the table index.
+
         Parameters:
 
             ts_format : str
@@ -193,6 +333,155 @@ class IO(object):
             clean_labels: bool
                 Process table columns to remove trailing whitespaces
 
+            max_workers: int
+                Maximum number of files read concurrently
+                when a `File Path` entry of the `inputs_from_files`
+                table matches multiple files, and while the
+                main input file gets parsed, see `read_pointer_tables`.
+                Default: None, see
+                concurrent.futures.ThreadPoolExecutor
+
+            recursive: bool
+                Default: False
+                Follow `inputs_from_files` tables found in any
+                of the additional input files, see
+                `get_tables_recursively`. Otherwise only the
+                `inputs_from_files` table of the main input
+                file is used.
+
+            collect_stats: bool
+                Default: False
+                Measure wall time, cpu time and tracemalloc
+                memory peak of each loading stage and table,
+                and the size of each loaded table. Returned
+                under the 'load_stats' key, see
+                `adapter.stats.LoadStats`. Memory tracing
+                slows the load down.
+
+            stats_hook: callable
+                Default: None
+                Called with each stage and table
+                statistics record as soon as it gets
+                created. Implies collect_stats=True.
+
+            copy_tables: bool
+                Default: True
+                False: set the first column as index in
+                place instead of working on copies of all
+                tables, see `first_col_to_index`. Lowers
+                the peak memory use of the load.
+
+            memory_budget: int
+                Default: None, all tables are held in memory
+                Number of bytes of table memory to hold in
+                memory. Once exceeded, the least recently used
+                tables get spilled to disk and transparently read
+                back in when accessed, see
+                `adapter.spill.SpillingDict`. The returned
+                'tables_as_dict_of_dfs' is then a SpillingDict,
+                with spill and reload counts available through
+                its `get_metrics` method. Implies copy_tables=False.
+                Tables held by an incremental `IO` manifest stay
+                in memory regardless.
+
+            spill_dir: str
+                Default: None, a temporary folder
+                Local scratch folder to spill the tables to
+                when over the memory_budget
+
+            compact: bool
+                Default: False
+                True: reduce the memory used by the loaded
+                tables once all processing is done. String
+                columns with few distinct values get converted
+                to categoricals, sharing a single categorical type
+                across all tables for same-labeled columns, and
+                numeric columns get downcast where no values
+                change, see `adapter.compact.compact_dtypes`.
+                Databases and files written by the load
+                keep the original types.
+
+            max_category_ratio: float
+                Default: 0.5
+                Largest ratio of the number of distinct values
+                to the number of rows of a string column to get
+                converted to a categorical when compacting
+
+            schema: pandas dataframe
+                Default: None, use the `table_schema` table
+                of the inputs, if any
+                Table schema to use, in the format of
+                a `table_schema` table. Declares the types
+                of all input tables, including the ones in
+                the main input file.
+
+            unique_run_tag: bool
+                Default: False, runs started within the same
+                minute with the same version share the output folder
+                True: if the output folder of the run already
+                exists, append a number to the run tag, so
+                that each run writes to its own folder
+
+            tables: list of str
+                Default: None, load all tables
+                Names or glob patterns, such as 'demand_*',
+                of the tables to load. Only the selected tables
+                get read from each input file, and input files
+                that hold none of them are not opened. The
+                `run_parameters`, `inputs_from_files` and
+                `table_schema` tables are always read.
+
+            sample: int or float
+                Default: None, read all rows
+                int: read only the first rows of each table
+                float between 0 and 1: read only a fraction of the
+                rows of each table, the same rows each time, see
+                `adapter.sampling`. The sample is taken by
+                the readers, so the remaining rows are not read.
+                The `run_parameters`, `inputs_from_files` and
+                `table_schema` tables are read in full.
+
+            write_sample: bool
+                Default: False, no database gets created
+                of the sampled tables
+                True: create the database as without sampling
+
+            store_dir: str
+                Default: None, the input file gets copied and
+                the database written to the run folder
+                Content store folder, see `adapter.cas`. The copy
+                of the input file and, with close_db=True, the
+                database are kept in the store once per distinct
+                content and hardlinked into the run folder.
+                The linked database is read only, until written to
+                with `write`. Place the store on the same file
+                system as the output folders.
+
+            consolidated_db: str
+                Default: None
+                Path of a database holding the tables of many runs,
+                see `adapter.consolidated.ConsolidatedDb`. The run,
+                with its run parameters, and its input tables get
+                added to it. Pass the returned dict to `write` with
+                type='consolidated' to add output tables as well.
+
+            strict_db: bool
+                Default: False, column types chosen by pandas
+                Write the database as STRICT tables typed by
+                the table dtypes, with the index columns declared
+                in the table schema as primary key, see `create_db`
+
+            db_indexes: bool or dict
+                Default: None, no indexes
+                Indexes of the database tables, see `create_db`
+
+            db_scratch: str
+                Default: None, the database gets written
+                in place
+                'memory' or a local folder path: assemble the
+                database there and copy it to the output folder
+                at once, see `create_db`
+
         Returns:
 
             res : dict
@@ -208,8 +497,93 @@ class IO(object):
 
                 'db_path' - database fullpath
                 'db_conn' - database connection
+
+                If statistics were collected:
+
+                'load_stats' - dict of 'stages', 'tables' and
+                    'totals' statistics, see `adapter.stats.LoadStats`
+
+                If tables got compacted:
+
+                'compaction_report' - dict of bytes before, after
+                    and saved, and converted columns, by table
+
+                If rows got sampled:
+
+                'sample' - the sample argument, flags that the
+                    tables hold a sample of the input rows only
+
+                If written to a consolidated database:
+
+                'consolidated_db' - consolidated database path
         """
-        dict_of_dfs = self.get_tables(self.input_path)
+        collect_stats = collect_stats or (stats_hook is not None)
+        self.stats = LoadStats(enabled=collect_stats, hook=stats_hook)
+
+        self.schema = None if schema is None else Schema(schema)
+
+        self.file_sets = set()
+
+        if isinstance(tables, str):
+            tables = [tables]
+        self.table_selection = tables
+
+        if sample is not None:
+            parse_sample(sample)
+
+            msg = (
+                "Reading a row sample ({}) of each input table. "
+                "Results will not match those of the full inputs."
+            )
+            log.warning(msg.format(sample))
+
+            if create_db and not write_sample and not skip_writeout:
+                msg = (
+                    "No database will be created of the sampled tables, "
+                    "pass write_sample=True to create it."
+                )
+                log.warning(msg)
+                create_db = False
+        self.sample = sample
+
+        # read the inputs_from_files and table_schema tables
+        # of the main input file first, so that the listed files
+        # get read while the rest of the main input file is parsed
+        with self.stats.stage("read_pointer_tables", file_path=self.input_path):
+            pointer_tables = self.read_pointer_tables(self.input_path)
+
+        if self.schema is None and self.la["schema"] in pointer_tables.keys():
+            # declared types apply to all further reads
+            self.schema = Schema(pointer_tables[self.la["schema"]])
+
+        executor = None
+        if self.la["extra_files"] in pointer_tables.keys():
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            extra_reads = self.submit_extra_files(
+                executor,
+                self.get_extra_files(pointer_tables[self.la["extra_files"]]),
+                recursive=recursive,
+                max_workers=max_workers,
+            )
+
+        try:
+            with self.stats.stage("get_tables", file_path=self.input_path):
+                dict_of_dfs = self.get_tables(self.input_path)
+        except Exception:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+        if self.schema is None and self.la["schema"] in dict_of_dfs.keys():
+            # declared types apply to all further reads
+            self.schema = Schema(dict_of_dfs[self.la["schema"]])
+
+        if memory_budget is not None:
+            dict_of_dfs = SpillingDict(
+                memory_budget, spill_dir=spill_dir, data=dict_of_dfs
+            )
+            # copies of all tables would be held at once
+            copy_tables = False
 
         if skip_writeout==True:
             if save_input==True:
@@ -222,40 +596,82 @@ class IO(object):
         # are there any further input files?
         # if that is the case, the file paths and further info
         # should be placed in an `inputs_from_files` table
-        qry_flags = dict()
-
-        if self.la["extra_files"] in dict_of_dfs.keys():
-
-            extra_files = dict_of_dfs[self.la["extra_files"]].reset_index()
-
-            for inx in extra_files.index:
-
-                file_path = extra_files.loc[inx, self.la["inpath"]].strip()
+        if executor is not None:
+            # merge in the order of the inputs_from_files table,
+            # raising the error of the first file that failed
+            try:
+                with self.stats.stage("merge_extra_files"):
+                    for inx in range(len(extra_reads)):
+                        extra_tables = extra_reads[inx].result()
+                        # a finished future holds on to its tables,
+                        # which could then not be freed once spilled
+                        extra_reads[inx] = None
+
+                        Debugger.check_for_duplicates(
+                            list(dict_of_dfs.keys()), list(extra_tables.keys())
+                        )
+                        dict_of_dfs.update(extra_tables)
+                        del extra_tables
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
 
-                table_names = extra_files.loc[inx, self.la["tbl_nam"]]
+        elif self.la["extra_files"] in dict_of_dfs.keys():
 
-                if isinstance(table_names, str):
-                    table_names = re.split(",", table_names)
-                    table_names = [i.strip() for i in table_names]
+            extra_files = self.get_extra_files(dict_of_dfs[self.la["extra_files"]])
 
-                qry_flags[file_path] = extra_files.loc[inx, self.la["query"]]
+            # look up all listed paths up front
+            self.resolver.resolve_many(
+                [extra_file["file_path"] for extra_file in extra_files],
+                max_workers=max_workers,
+            )
 
-                if (qry_flags[file_path] is not None) and isinstance(table_names, str):
+            if recursive:
+                with self.stats.stage("get_tables_recursively"):
+                    dict_of_dfs.update(
+                        self.get_tables_recursively(
+                            extra_files,
+                            parent_path=self.input_path,
+                            pre_existing_keys=dict_of_dfs.keys(),
+                            max_workers=max_workers,
+                        )
+                    )
 
-                    qry_flags[file_path] = re.split(",", qry_flags[file_path])
-                    qry_flags[file_path] = [i.strip() for i in qry_flags[file_path]]
+            else:
+                for extra_file in extra_files:
+                    with self.stats.stage("get_tables", file_path=extra_file["file_path"]):
+                        dict_of_dfs.update(
+                            self.get_tables(
+                                extra_file["file_path"],
+                                table_names=extra_file["table_names"],
+                                query_only=extra_file["query_only"],
+                                pre_existing_keys=dict_of_dfs.keys(),
+                                concat=extra_file["concat"],
+                                max_workers=max_workers,
+                            )
+                        )
 
-                dict_of_dfs.update(
-                    self.get_tables(
-                        file_path,
-                        table_names=table_names,
-                        query_only=qry_flags[file_path],
-                        pre_existing_keys=dict_of_dfs.keys(),
-                    )
+        if self.schema is None and self.la["schema"] in dict_of_dfs.keys():
+            self.schema = Schema(dict_of_dfs[self.la["schema"]])
+
+        # validate all tables before anything gets written out
+        if self.schema is not None:
+            with self.stats.stage("validate_schema"):
+                for table in self.schema.tables.keys():
+                    if table in dict_of_dfs.keys():
+                        dict_of_dfs[table] = self.schema.cast(table, dict_of_dfs[table])
+
+                self.schema.check(
+                    dict_of_dfs,
+                    table_names=None
+                    if tables is None
+                    else select_names(self.schema.tables.keys(), tables),
                 )
 
-        else:
-            qry_flags = None
+        if tables is not None:
+            for pattern in tables:
+                if not select_names(dict_of_dfs.keys(), [pattern]):
+                    msg = "No input table matches the requested table {}."
+                    log.warning(msg.format(pattern))
 
         # define output path for the analysis run
 
@@ -294,9 +710,8 @@ class IO(object):
 
             if len(run_params_table) != 0:
 
-                outpath = convert_network_drive_path(
-                    dict_of_dfs[run_params_table[0]].loc[0, self.la["outpath"]],
-                    mapping=self.os_mapping,
+                outpath = self.resolver.resolve(
+                    dict_of_dfs[run_params_table[0]].loc[0, self.la["outpath"]]
                 )
                 outpath_base = os.path.join(
                     os.getcwd(),
@@ -336,7 +751,10 @@ class IO(object):
             outpath += "_will_not_be_used"
 
         if not skip_writeout:
-            if not os.path.exists(outpath):
+            if unique_run_tag and quick_db_out_filename is None:
+                outpath, run_tag = self.make_unique_outpath(outpath, run_tag)
+
+            elif not os.path.exists(outpath):
                 os.makedirs(outpath)
 
             if save_input and isinstance(self.input_path, str):
@@ -347,28 +765,84 @@ class IO(object):
 
                 versioned_filename = filename_only + "_" + run_tag + "." + filename_extns
 
-                copy(self.input_path, os.path.join(outpath, versioned_filename))
+                with self.stats.stage("save_input", file_path=self.input_path):
+                    if store_dir is None:
+                        copy(self.input_path, os.path.join(outpath, versioned_filename))
+                    else:
+                        store = ContentStore(store_dir)
+                        digest = store.put(self.input_path)
+                        store.link(digest, os.path.join(outpath, versioned_filename))
+                        store.write_run_manifest(outpath, {versioned_filename: digest})
 
             if create_db == True:
                 
                 try:
-                    db_res = self.create_db(
-                        dict_of_dfs,
-                        outpath=outpath,
-                        run_tag=run_tag,
-                        flavor=db_flavor,
-                        close=close_db,
-                    )
+                    with self.stats.stage("create_db"):
+                        db_res = self.create_db(
+                            dict_of_dfs,
+                            outpath=outpath,
+                            run_tag=run_tag,
+                            flavor=db_flavor,
+                            close=close_db,
+                            store_dir=store_dir,
+                            strict=strict_db,
+                            indexes=db_indexes,
+                            scratch=db_scratch,
+                        )
                     
                 except:
                     msg = "Not able to create a db of tables " "that were read in from {}."
 
                     log.error(msg.format(self.input_path))
 
+            if consolidated_db is not None:
+                run_parameters = sorted(
+                    key for key in dict_of_dfs.keys() if self.la["run_pars"] in key
+                )
+
+                with self.stats.stage("consolidated_db"):
+                    db = ConsolidatedDb(consolidated_db)
+                    db.add_run(
+                        run_tag,
+                        run_parameters=dict_of_dfs[run_parameters[0]]
+                        if len(run_parameters) > 0
+                        else None,
+                        input_path=self.input_path,
+                        outpath=outpath,
+                    )
+                    db.write_tables(run_tag, dict_of_dfs)
+
+        # tables with declared index columns
+        schema_indexed = (
+            list()
+            if self.schema is None
+            else [
+                table
+                for table, declared in self.schema.tables.items()
+                if len(declared["index"]) > 0 and table in dict_of_dfs.keys()
+            ]
+        )
+
         if set_first_col_as_index != False:
-            dict_of_dfs = self.first_col_to_index(
-                dict_of_dfs, table_names=set_first_col_as_index, drop=True
-            )
+            if len(schema_indexed) > 0:
+                if set_first_col_as_index == True:
+                    set_first_col_as_index = list(dict_of_dfs.keys())
+                set_first_col_as_index = [
+                    table
+                    for table in set_first_col_as_index
+                    if table not in schema_indexed
+                ]
+
+            with self.stats.stage("first_col_to_index"):
+                dict_of_dfs = self.first_col_to_index(
+                    dict_of_dfs,
+                    table_names=set_first_col_as_index,
+                    drop=True,
+                    copy=copy_tables,
+                )
+
+        for table in schema_indexed:
+            dict_of_dfs[table] = self.schema.set_index(table, dict_of_dfs[table])
 
         # value type conversion for any tables listed
         # as to_numeric and to_float
@@ -384,9 +858,10 @@ class IO(object):
 
             for key in dict_of_dfs.keys():
                 if any([key in tb_nm for tb_nm in to_numeric]):
-                    dict_of_dfs[key] = dict_of_dfs[key].apply(
-                        pd.to_numeric, errors="ignore", axis=1
-                    )
+                    with self.stats.stage("to_numeric", table=key):
+                        dict_of_dfs[key] = dict_of_dfs[key].apply(
+                            pd.to_numeric, errors="ignore", axis=1
+                        )
 
         res = dict()
         res["tables_as_dict_of_dfs"] = dict_of_dfs
@@ -394,6 +869,12 @@ class IO(object):
         res["outpath"] = outpath
         res["run_tag"] = run_tag
 
+        if sample is not None:
+            res["sample"] = sample
+
+        if consolidated_db is not None and not skip_writeout:
+            res["consolidated_db"] = consolidated_db
+
         if skip_writeout == False:
             if create_db == True:
                 res.update(db_res)
@@ -406,20 +887,937 @@ class IO(object):
 
                 table_columns = input_tables_list[table].columns
 
-                clean_cols = self.process_column_labels(table_columns)
-                input_tables_list[table].columns = clean_cols
+                with self.stats.stage("process_column_labels", table=table):
+                    clean_cols = self.process_column_labels(table_columns)
+
+                    # avoid rebuilding column indexes that are already clean
+                    if clean_cols != list(table_columns):
+                        input_tables_list[table].columns = clean_cols
 
             msg = "All table column labels were processed to remove undesired whitespaces."
             log.info(msg)
 
+        if compact == True:
+            with self.stats.stage("compact_dtypes"):
+                res["compaction_report"] = compact_dtypes(
+                    res["tables_as_dict_of_dfs"],
+                    max_category_ratio=max_category_ratio,
+                )
+
+        if collect_stats:
+            loaded = res["tables_as_dict_of_dfs"]
+
+            for table in loaded.keys():
+                if isinstance(loaded, SpillingDict):
+                    # without reading spilled tables back in
+                    self.stats.table(
+                        table, shape=loaded.shapes[table], memory=loaded.sizes[table]
+                    )
+                else:
+                    self.stats.table(table, loaded[table])
+
+            res["load_stats"] = self.stats.as_dict()
+
         return res
 
+    @classmethod
+    def load_many(cls, paths, max_workers=None, cache_dir=None, **kwargs):
+        """Loads many scenarios at once, such as the input
+        files of a parameter sweep, parsing each input file
+        shared between the scenarios only once.
+
+        First reads the main input files and their
+        `inputs_from_files` tables, then parses the union of all
+        referenced files, each once, and finally loads each
+        scenario from the parsed tables. Tables of shared
+        files share their data between the scenarios, so they
+        should not be modified in place. Each scenario gets its
+        own run tag, output folder and output database, as with
+        `load` and unique_run_tag=True.
+
+        Parameters:
+
+            paths: list of str
+                Main input file paths, one per scenario
+
+            max_workers: int
+                Default: None, the `ThreadPoolExecutor` default
+                Number of files parsed and scenarios
+                loaded concurrently
+
+            cache_dir: str
+                Default: None
+                See `IO`
+
+            **kwargs:
+                Passed to `IO` (os_mapping, path_cache_ttl)
+                and to `load`. Defaults to copy_tables=False,
+                so that the tables set to have the first column
+                as index do not get copied for each scenario.
+                With close_db=False, the database connections
+                get opened in the calling thread.
+
+        Returns:
+
+            list of dicts, as returned by `load`,
+            one per scenario and in the order of paths
+        """
+        init_kwargs = {
+            key: kwargs.pop(key)
+            for key in ["os_mapping", "path_cache_ttl"]
+            if key in kwargs.keys()
+        }
+
+        if kwargs.get("quick_db_out_filename") is not None:
+            msg = (
+                "quick_db_out_filename is not supported when loading "
+                "many scenarios, as all of them would write to the same file."
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+        kwargs.setdefault("copy_tables", False)
+        kwargs["unique_run_tag"] = True
+
+        # sqlite connections can only be used by the thread
+        # that opened them, reopened below if requested
+        close_db = kwargs.get("close_db", True)
+        kwargs["close_db"] = True
+
+        # one manifest shared by all scenarios
+        manifest = Manifest(cache_dir=cache_dir)
+
+        tables = kwargs.get("tables")
+        if isinstance(tables, str):
+            tables = [tables]
+
+        scenarios = list()
+        for path in paths:
+            i_o = cls(path, **init_kwargs)
+            i_o.manifest = manifest
+            # parse the files the way the scenario loads will
+            i_o.table_selection = tables
+            i_o.sample = kwargs.get("sample")
+            scenarios.append(i_o)
+
+        def get_extra_files(i_o):
+            tables = i_o.get_tables(i_o.input_path)
+
+            if i_o.la["extra_files"] not in tables.keys():
+                return list()
+
+            return [
+                (i_o, extra_file)
+                for extra_file in i_o.get_extra_files(tables[i_o.la["extra_files"]])
+            ]
+
+        def parse(i_o, extra_file):
+            i_o.get_tables(
+                extra_file["file_path"],
+                table_names=extra_file["table_names"],
+                query_only=extra_file["query_only"],
+                concat=extra_file["concat"],
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # main input files
+            referenced = dict()
+            for future in [executor.submit(get_extra_files, i_o) for i_o in scenarios]:
+                try:
+                    extra_files = future.result()
+                except Exception:
+                    # reported once the scenario gets loaded
+                    continue
+
+                for i_o, extra_file in extra_files:
+                    key = (
+                        Manifest.get_key(
+                            i_o.resolver.resolve(extra_file["file_path"]),
+                            extra_file["table_names"],
+                            extra_file["query_only"],
+                            i_o.sample,
+                        ),
+                        extra_file["concat"],
+                    )
+                    referenced.setdefault(key, (i_o, extra_file))
+
+            msg = "Parsing {} input files referenced by {} scenarios."
+            log.info(msg.format(len(referenced), len(scenarios)))
+
+            # each referenced file once
+            for future in [
+                executor.submit(parse, i_o, extra_file)
+                for i_o, extra_file in referenced.values()
+            ]:
+                try:
+                    future.result()
+                except Exception:
+                    # reported once the scenario gets loaded
+                    continue
+
+            # scenarios, reusing the parsed tables
+            futures = [executor.submit(i_o.load, **kwargs) for i_o in scenarios]
+
+            results = list()
+            failures = list()
+            for path, future in zip(paths, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failures.append("{} - {}: {}".format(path, type(e).__name__, e))
+
+        if len(failures) > 0:
+            msg = "Failed to load {} of {} scenarios:\n    {}".format(
+                len(failures), len(paths), "\n    ".join(failures)
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+        if not close_db:
+            for res in results:
+                if isinstance(res.get("db_path"), str) and os.path.isfile(
+                    res["db_path"]
+                ):
+                    res["db_conn"] = sqlite3.connect(res["db_path"])
+
+        if kwargs.get("skip_writeout", False):
+            # no output folders got created to make
+            # the run tags unique
+            run_tags = set()
+            for res in results:
+                run_tag = res["run_tag"]
+                count = 1
+                while run_tag in run_tags:
+                    count += 1
+                    run_tag = "{}_{}".format(res["run_tag"], count)
+
+                if run_tag != res["run_tag"]:
+                    res["outpath"] = os.path.join(
+                        os.path.dirname(res["outpath"]), run_tag + "_will_not_be_used"
+                    )
+                    res["run_tag"] = run_tag
+
+                run_tags.add(run_tag)
+
+        msg = "Loaded {} scenarios, reusing parsed tables {} times."
+        log.info(msg.format(len(results), manifest.hits))
+
+        return results
+
+    def overlay(self, base, overlay, keys=None):
+        """Applies an overlay, such as a small workbook holding
+        the changes of a scenario, to a base set of loaded tables.
+        Overlay tables either replace the base tables whole, or,
+        if key columns are given for them, update the base rows
+        with matching keys and add the rows with new keys, see
+        `adapter.overlay.upsert_rows`.
+
+        Neither the base tables nor the base dictionary get
+        modified. The returned dictionary holds the very same
+        dataframes as the base for all tables not in the overlay,
+        and the updated tables share all unchanged columns with
+        the base tables, so that many variants of a base take up
+        memory in proportion to their changes only. Modify the
+        returned tables in place only after copying them.
+
+        Parameters:
+
+            base: dict of pandas dataframes
+                Base tables, such as the 'tables_as_dict_of_dfs'
+                returned by `load`
+
+            overlay: str or dict of pandas dataframes
+                Overlay input file path, of any file type
+                supported by `get_tables`, or overlay tables
+
+            keys: dict
+                Default: None, use the `overlay_keys` table of
+                the overlay, with columns `Table Name` and
+                `Key Columns` (comma separated), if any
+                Table name: list of key column labels, or
+                index level names of the base table
+
+        Returns:
+
+            dict_of_dfs: dict of pandas dataframes
+                Base tables with the overlay applied
+        """
+        if isinstance(overlay, Mapping):
+            overlay_tables = dict(overlay)
+        else:
+            overlay_tables = self.get_tables(overlay)
+
+            for table, df in overlay_tables.items():
+                clean_cols = self.process_column_labels(df.columns)
+                if clean_cols != list(df.columns):
+                    overlay_tables[table] = df.set_axis(clean_cols, axis=1)
+
+        keys_table = overlay_tables.pop(self.la["overlay_keys"], None)
+
+        if keys is None:
+            keys = dict()
+
+            if keys_table is not None:
+                for row in keys_table.to_dict(orient="records"):
+                    keys[str(row[self.la["tbl_nam"]]).strip()] = [
+                        clean_label(col)
+                        for col in str(row[self.la["key_cols"]]).split(",")
+                    ]
+
+        dict_of_dfs = dict(base)
+
+        for table, df in overlay_tables.items():
+            if table in keys.keys() and table in dict_of_dfs.keys():
+                dict_of_dfs[table] = upsert_rows(dict_of_dfs[table], df, keys[table])
+
+                msg = "Overlaid rows of table {} by keys {}."
+                log.info(msg.format(table, keys[table]))
+
+            else:
+                if table not in dict_of_dfs.keys():
+                    msg = "Overlay table {} is not in the base tables and got added."
+                    log.warning(msg.format(table))
+
+                dict_of_dfs[table] = df
+
+                msg = "Overlaid table {}."
+                log.info(msg.format(table))
+
+        return dict_of_dfs
+
+    def catalog(self, recursive=False, exact_counts=False):
+        """Lists the tables that `load` would read in, with their
+        columns and row counts, without reading any table data.
+        Only the metadata of each input file gets read: the
+        workbook and table parts of xlsx files, the schema and
+        statistics of sqlite databases, the header and size of
+        csv files and the SQLAlchemy inspector for databases on
+        a server. The `inputs_from_files` tables are the only
+        tables read in full, to follow the listed input files.
+
+        Parameters:
+
+            recursive: bool
+                Default: False, as in `load`, follow the
+                `inputs_from_files` table of the main input file only
+                True: also follow any `inputs_from_files` tables
+                found in the listed input files, and so on
+
+            exact_counts: bool
+                Default: False, see `adapter.catalog.catalog_sqlite`
+                True: count the rows of database tables
+
+        Returns:
+
+            catalog: pandas dataframe
+                One row per table, with columns listed in
+                `adapter.catalog.catalog_columns`. Row counts
+                not flagged as `rows_exact` are estimates, and
+                missing where they can not be estimated cheaply.
+        """
+        entries = list()
+        failures = dict()
+        seen = set()
+
+        def read_extra_files(file_path, file_type):
+            if file_type == "text":
+                df = pd.read_csv(file_path)
+            else:
+                df = self.read_pointer_tables(file_path)[self.la["extra_files"]]
+
+            return self.get_extra_files(df)
+
+        def get_query_flags(table_names, query_only):
+            if not isinstance(query_only, str):
+                return dict(), False
+
+            flags = [i.strip() == "Y" for i in re.split(",", query_only)]
+
+            if table_names is None:
+                return dict(), len(flags) == 1 and flags[0]
+
+            return dict(zip(table_names, flags)), False
+
+        def visit(file_path, table_names, query_only, parent_path, depth):
+            if is_multi_file_path(file_path):
+                for path in expand_file_path(file_path, extensions=self.supported_extensions):
+                    visit(path, table_names, query_only, parent_path, depth)
+                return
+
+            file_type = self.get_file_type(file_path)
+
+            key = (os.path.abspath(file_path), str(table_names))
+            if file_type == "" or key in seen:
+                return
+            seen.add(key)
+
+            try:
+                if file_type == "excel":
+                    file_entries = catalog_excel(file_path)
+                elif file_type == "text":
+                    file_entries = catalog_csv(
+                        file_path, csv_table_name(file_path, self.la["extra_files"])
+                    )
+                elif file_type == "database":
+                    file_entries = catalog_sqlite(file_path, exact_counts=exact_counts)
+                else:
+                    file_entries = catalog_sqlalchemy(Db_sqlalchemy(file_path).engine)
+            except Exception as err:
+                failures[file_path] = "{}: {}".format(type(err).__name__, err)
+                return
+
+            flags, all_query_only = get_query_flags(table_names, query_only)
+
+            has_extra_files = False
+            for entry in file_entries:
+                if (table_names is not None) and (file_type != "text"):
+                    if entry["table_name"] not in table_names:
+                        continue
+
+                entry.update(
+                    file_path=file_path,
+                    file_type=file_type,
+                    query_only=flags.get(entry["table_name"], all_query_only),
+                    parent_path=parent_path,
+                )
+                entries.append(entry)
+
+                has_extra_files |= entry["table_name"] == self.la["extra_files"]
+
+            if has_extra_files and (depth == 0 or recursive) and file_type != "sqlalchemy":
+                try:
+                    extra_files = read_extra_files(file_path, file_type)
+                except Exception as err:
+                    failures[file_path] = "{}: {}".format(type(err).__name__, err)
+                    return
+
+                for extra_file in extra_files:
+                    visit(
+                        self.get_node_path(extra_file["file_path"], file_path),
+                        extra_file["table_names"],
+                        extra_file["query_only"],
+                        file_path,
+                        depth + 1,
+                    )
+
+        if isinstance(self.input_path, str):
+            visit(self.input_path, None, None, None, 0)
+
+        if len(failures) > 0:
+            msg = "Failed to catalog {} input files:\n{}".format(
+                len(failures),
+                "\n".join(
+                    "    {} - {}".format(path, err) for path, err in failures.items()
+                ),
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+        catalog = pd.DataFrame(entries, columns=catalog_columns)
+        catalog = catalog.astype({"n_columns": "Int64", "n_rows": "Int64"})
+
+        msg = "Cataloged {} tables in {} input files."
+        log.info(msg.format(len(catalog), catalog["file_path"].nunique()))
+
+        return catalog
+
+    @staticmethod
+    def make_unique_outpath(outpath, run_tag):
+        """Creates a run output folder, appending
+        a number to the run tag if the folder exists.
+
+        Parameters:
+
+            outpath: str
+                Output folder path, ending with the run tag
+
+            run_tag: str
+                Run tag
+
+        Returns:
+
+            outpath: str
+                Created output folder path
+
+            run_tag: str
+                Run tag of the created output folder
+        """
+        base_outpath = outpath
+        base_run_tag = run_tag
+
+        count = 1
+        while True:
+            try:
+                # fails if the folder exists, also if it
+                # got created by a concurrent run just now
+                os.makedirs(outpath)
+                return outpath, run_tag
+            except FileExistsError:
+                count += 1
+                outpath = "{}_{}".format(base_outpath, count)
+                run_tag = "{}_{}".format(base_run_tag, count)
+
+    def read_pointer_tables(self, file_path):
+        """Reads only the `inputs_from_files` and `table_schema`
+        tables of an excel or sqlite input file, without parsing
+        any of its other tables, so that reading the listed input
+        files can start before the whole file got parsed.
+
+        Parameters:
+
+            file_path: str
+                Input file path
+
+        Returns:
+
+            dict_of_dfs: dict of pandas dataframes
+                Tables found. Empty for other file types,
+                or if the tables could not be read selectively.
+        """
+        names = [self.la["extra_files"], self.la["schema"]]
+
+        file_path = self.resolver.resolve(file_path)
+
+        if not isinstance(file_path, str) or is_multi_file_path(file_path):
+            return dict()
+
+        file_type = self.get_file_type(file_path)
+
+        try:
+            if file_type == "excel":
+                dict_of_dfs = read_excel_objects(file_path, names)
+
+            elif file_type == "database":
+                dict_of_dfs = dict()
+
+                con = connect_read_only(file_path)
+                try:
+                    for name in get_sqlite_table_names(con):
+                        if name in names:
+                            dict_of_dfs[name] = pd.read_sql_query(
+                                'SELECT * FROM "{}"'.format(name), con
+                            )
+                finally:
+                    con.close()
+
+            else:
+                return dict()
+
+        except Exception as err:
+            # the full read of the file reports any errors
+            msg = "Could not read the {} tables of {} ahead: {}"
+            log.debug(msg.format(names, file_path, err))
+            return dict()
+
+        for name, df in dict_of_dfs.items():
+            df.columns = self.process_column_labels(df.columns)
+
+        return dict_of_dfs
+
+    def submit_extra_files(self, executor, extra_files, recursive=False, max_workers=None):
+        """Starts reading the input files listed in
+        an `inputs_from_files` table.
+
+        Parameters:
+
+            executor: concurrent.futures.ThreadPoolExecutor
+
+            extra_files: list of dicts
+                Parsed `inputs_from_files` table,
+                see `get_extra_files`
+
+            recursive: bool
+                See `load`
+
+            max_workers: int
+                See `load`
+
+        Returns:
+
+            futures: list of concurrent.futures.Future
+                One per listed file in the order of the table,
+                or a single one if recursive, each holding a
+                dict of pandas dataframes
+        """
+        # look up all listed paths up front
+        self.resolver.resolve_many(
+            [extra_file["file_path"] for extra_file in extra_files],
+            max_workers=max_workers,
+        )
+
+        if recursive:
+
+            def read_recursively():
+                with self.stats.stage("get_tables_recursively"):
+                    return self.get_tables_recursively(
+                        extra_files,
+                        parent_path=self.input_path,
+                        max_workers=max_workers,
+                    )
+
+            return [executor.submit(read_recursively)]
+
+        def read(extra_file):
+            with self.stats.stage("get_tables", file_path=extra_file["file_path"]):
+                return self.get_tables(
+                    extra_file["file_path"],
+                    table_names=extra_file["table_names"],
+                    query_only=extra_file["query_only"],
+                    concat=extra_file["concat"],
+                    max_workers=max_workers,
+                )
+
+        return [executor.submit(read, extra_file) for extra_file in extra_files]
+
+    def get_extra_files(self, extra_files):
+        """Parses an `inputs_from_files` table.
+
+        Parameters:
+
+            extra_files: pandas dataframe
+                `inputs_from_files` table
+
+        Returns:
+
+            list of dicts, one per table row, with keys:
+
+                'file_path' - str, input file path, directory
+                    or glob pattern
+                'table_names' - list of str or None
+                'query_only' - query only flags
+                'concat' - bool
+        """
+        extra_files = extra_files.reset_index()
+
+        res = list()
+
+        for inx in extra_files.index:
+
+            file_path = extra_files.loc[inx, self.la["inpath"]].strip()
+
+            table_names = extra_files.loc[inx, self.la["tbl_nam"]]
+
+            if isinstance(table_names, str):
+                table_names = re.split(",", table_names)
+                table_names = [i.strip() for i in table_names]
+            elif pd.isna(table_names):
+                # empty cell, load all tables
+                table_names = None
+
+            query_only = extra_files.loc[inx, self.la["query"]]
+
+            concat = False
+            if self.la["concat"] in extra_files.columns:
+                concat = extra_files.loc[inx, self.la["concat"]]
+                concat = isinstance(concat, str) and concat.strip() == "Y"
+
+            res.append(
+                {
+                    "file_path": file_path,
+                    "table_names": table_names,
+                    "query_only": query_only,
+                    "concat": concat,
+                }
+            )
+
+        return res
+
+    def get_node_path(self, file_path, parent_path):
+        """Looks up a file path listed in an `inputs_from_files`
+        table relative to the current working directory first,
+        and then relative to the folder of the file listing it.
+
+        Parameters:
+
+            file_path: str
+                Listed file path
+
+            parent_path: str or None
+                Path of the file holding the
+                `inputs_from_files` table
+
+        Returns:
+
+            file_path: str
+        """
+        file_path = self.resolver.resolve(file_path)
+
+        if (
+            (parent_path is not None)
+            and not os.path.isabs(file_path)
+            and not os.path.exists(file_path)
+            and not (is_multi_file_path(file_path) and expand_file_path(file_path))
+        ):
+            file_path = os.path.join(os.path.dirname(parent_path), file_path)
+
+        return file_path
+
+    def get_tables_recursively(
+        self,
+        extra_files,
+        parent_path=None,
+        pre_existing_keys=None,
+        max_workers=None,
+    ):
+        """Gets all tables from the additional input files
+        listed in an `inputs_from_files` table, and from any
+        further input files listed in `inputs_from_files`
+        tables found in those files, and so on.
+
+        The files form a dependency graph that gets
+        loaded concurrently: each file is read as soon as the
+        file pointing to it got read, and files pointed
+        to from multiple places with the same table selection
+        are read only once. A file pointing back to any of the
+        files it was reached from raises an error.
+
+        Relative file paths are looked up relative to the
+        current working directory first and then relative
+        to the folder of the file pointing to them.
+        The nested `inputs_from_files` tables are not
+        included in the returned tables.
+
+        Parameters:
+
+            extra_files: list of dicts
+                Parsed `inputs_from_files` table,
+                see `get_extra_files`
+
+            parent_path: str
+                Path of the file holding the
+                `inputs_from_files` table
+
+            pre_existing_keys: dictionary key index
+                Keys is the previously loaded
+                dictionary of dataframes
+
+            max_workers: int
+                Maximum number of files read at a time.
+                Default: None, see
+                concurrent.futures.ThreadPoolExecutor
+
+        Returns:
+
+            dict_of_dfs: dict of pd dfs
+                Dictionary of pandas dataframes
+                containing all the tables
+                from all the files
+        """
+        # node key -> (order, tables)
+        results = dict()
+        failures = dict()
+        pending = dict()
+        seen = set()
+        # file -> files listed in its inputs_from_files table
+        edges = dict()
+
+        def find_path(start, goal):
+            """Chain of files from start to goal following
+            the edges, None if there is none."""
+            stack = [(start, [start])]
+            visited = set()
+
+            while len(stack) > 0:
+                node, chain = stack.pop()
+                if node == goal:
+                    return chain
+
+                if node in visited:
+                    continue
+                visited.add(node)
+
+                for child in edges.get(node, ()):
+                    stack.append((child, chain + [child]))
+
+            return None
+
+        def submit(extra_files, parent_path, ancestors, order):
+            self.resolver.resolve_many(
+                [extra_file["file_path"] for extra_file in extra_files],
+                max_workers=max_workers,
+            )
+
+            for inx, extra_file in enumerate(extra_files):
+                file_path = self.get_node_path(extra_file["file_path"], parent_path)
+
+                # a path back to the pointing file closes a cycle,
+                # also across branches with files read in once
+                parent, child = ancestors[-1], os.path.abspath(file_path)
+                edges.setdefault(parent, set()).add(child)
+
+                chain = find_path(child, parent)
+                if chain is not None:
+                    chain = [parent] + chain
+                    msg = "Circular reference in inputs_from_files tables: {}."
+                    log.error(msg.format(" -> ".join(str(i) for i in chain)))
+                    raise ValueError(msg.format(" -> ".join(str(i) for i in chain)))
+
+                key = (
+                    os.path.abspath(file_path),
+                    str(extra_file["table_names"]),
+                    str(extra_file["query_only"]),
+                    extra_file["concat"],
+                )
+
+                if key in seen:
+                    msg = "Input file {} already read in, skipping."
+                    log.info(msg.format(file_path))
+                    continue
+
+                seen.add(key)
+
+                future = executor.submit(
+                    self.get_tables,
+                    file_path,
+                    table_names=extra_file["table_names"],
+                    query_only=extra_file["query_only"],
+                    concat=extra_file["concat"],
+                    max_workers=max_workers,
+                )
+                pending[future] = (
+                    key,
+                    file_path,
+                    ancestors + (os.path.abspath(file_path),),
+                    order + (inx,),
+                )
+
+        if parent_path is None or not isinstance(parent_path, str):
+            root = (None,)
+        else:
+            root = (os.path.abspath(parent_path),)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            submit(extra_files, parent_path, root, ())
+
+            while len(pending) > 0:
+                done, _ = wait(list(pending.keys()), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    key, file_path, ancestors, order = pending.pop(future)
+
+                    try:
+                        tables = future.result()
+                    except Exception as err:
+                        failures[file_path] = "{}: {}".format(type(err).__name__, err)
+                        continue
+
+                    nested_extra_files = tables.pop(self.la["extra_files"], None)
+
+                    results[key] = (order, tables)
+
+                    if nested_extra_files is not None:
+                        msg = "Following inputs_from_files table found in {}."
+                        log.info(msg.format(file_path))
+
+                        submit(
+                            self.get_extra_files(nested_extra_files),
+                            file_path,
+                            ancestors,
+                            order,
+                        )
+
+        if len(failures) > 0:
+            msg = "Failed to read {} input files:\n{}".format(
+                len(failures),
+                "\n".join(
+                    "    {} - {}".format(path, err) for path, err in failures.items()
+                ),
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+        if pre_existing_keys is None:
+            pre_existing_keys = []
+
+        dict_of_dfs = dict()
+
+        # merge in the depth-first order of the input files,
+        # regardless of the order in which the reads completed
+        for order, tables in sorted(results.values(), key=lambda x: x[0]):
+            Debugger.check_for_duplicates(
+                list(pre_existing_keys) + list(dict_of_dfs.keys()),
+                list(tables.keys()),
+            )
+            dict_of_dfs.update(tables)
+
+        return dict_of_dfs
+
+    def select_tables(self, file_path, file_type, table_names=None, query_only=None):
+        """Narrows the tables to read from an input file down to
+        those matching the table selection of `load`, and the
+        `run_parameters`, `inputs_from_files` and `table_schema`
+        tables. Lists the tables of excel and sqlite files
+        from their metadata, without reading any data.
+
+        Parameters:
+
+            file_path: str
+                Input file path
+
+            file_type: str
+                See `get_file_type`
+
+            table_names: list of str
+                Default: None, all tables of the file
+                Tables to read, see `get_tables`
+
+            query_only: str list of 'N' and 'Y', or empty cell (None)
+                See `get_tables`
+
+        Returns:
+
+            table_names: list of str or None
+                Selected tables, None if the tables
+                can not be listed without reading the file.
+                Empty if the file holds none of them.
+
+            query_only: str list of 'N' and 'Y', or None
+                Query flags of the selected tables
+        """
+        always = self.always_read
+
+        if file_type == "text":
+            # a single table, named after the file
+            name = csv_table_name(file_path, self.la["extra_files"])
+            if select_names([name], self.table_selection, always=always):
+                return table_names, query_only
+
+            return list(), query_only
+
+        if table_names is not None:
+            available = list(table_names)
+        elif file_type == "excel":
+            available = [obj["name"] for obj in get_excel_objects(file_path)]
+            if len(available) == 0:
+                # sheets get read instead
+                return table_names, query_only
+        elif file_type == "database":
+            available = get_sqlite_table_names(file_path)
+        else:
+            return table_names, query_only
+
+        selected = select_names(available, self.table_selection, always=always)
+
+        if isinstance(query_only, str):
+            flags = [i.strip() for i in re.split(",", query_only)]
+            if table_names is None and len(flags) == 1:
+                flags = flags * len(available)
+
+            query_only = ", ".join(
+                flag for name, flag in zip(available, flags) if name in selected
+            )
+
+        return selected, query_only
+
     def get_tables(
         self,
         file_path,
         table_names=None,
         query_only=None,
         pre_existing_keys=None,
+        concat=False,
+        max_workers=None,
+        apply_selection=True,
     ):
         """Gets all tables from an input
         file. Creates a dictionary
@@ -435,7 +1833,10 @@ class IO(object):
             file_path: str or None
                 Input file path
                 No data is read in when None,
-                creates an empty dictionary
+                creates an empty dictionary.
+                A directory or a glob pattern
+                loads all matched files, see
+                `get_tables_from_many`
 
             query_only: str list of 'N' and 'Y', or empty cell (None)
                 Default: None - all tables get
@@ -452,6 +1853,19 @@ class IO(object):
                 Keys is the previously loaded
                 dictionary of dataframes
 
+            concat: bool
+                Only used if file_path matches multiple
+                files. See `get_tables_from_many`
+
+            max_workers: int
+                Only used if file_path matches multiple
+                files. See `get_tables_from_many`
+
+            apply_selection: bool
+                Default: True, read only the tables of
+                the table selection of `load`, if any,
+                see `select_tables`
+
         Returns:
 
             dict_of_dfs: dict of pd dfs
@@ -461,16 +1875,61 @@ class IO(object):
                 indicated using the query_only
                 flags, if applicable.
         """
-        file_path = convert_network_drive_path(file_path, mapping=self.os_mapping)
+        file_path = self.resolver.resolve(file_path)
 
         if file_path is None:
 
             dict_of_dfs = dict()
 
+        elif is_multi_file_path(file_path):
+
+            self.file_sets.add(file_path)
+
+            dict_of_dfs = self.get_tables_from_many(
+                file_path,
+                table_names=table_names,
+                query_only=query_only,
+                pre_existing_keys=pre_existing_keys,
+                concat=concat,
+                max_workers=max_workers,
+            )
+
         elif isinstance(file_path, str):
 
             file_type = self.get_file_type(file_path)
 
+            if apply_selection and (self.table_selection is not None):
+                table_names, query_only = self.select_tables(
+                    file_path, file_type, table_names=table_names, query_only=query_only
+                )
+
+                if table_names is not None and len(table_names) == 0:
+                    msg = "No requested tables in input file {}, skipping."
+                    log.info(msg.format(file_path))
+
+                    return dict()
+
+            # table selection as passed, used to identify the
+            # file read in the manifest
+            manifest_selection = dict(
+                table_names=table_names, query_only=query_only, sample=self.sample
+            )
+
+            if (self.manifest is not None) and (file_type in ["excel", "text", "database"]):
+                dict_of_dfs = self.manifest.get(file_path, **manifest_selection)
+
+                if dict_of_dfs is not None:
+                    if pre_existing_keys is not None:
+                        Debugger.check_for_duplicates(
+                            pre_existing_keys, list(dict_of_dfs.keys())
+                        )
+
+                    return dict_of_dfs
+
+                # taken before the read, so that a file changing
+                # meanwhile does not get recorded as unchanged
+                file_state = self.manifest.file_state(file_path)
+
             if isinstance(query_only, str):
 
                 query_only = re.split(",", query_only)
@@ -508,9 +1967,14 @@ class IO(object):
             if file_type == "excel":
                 # load all named tables and ranges found in
                 # excel file to python as a dictionary of dataframes
-                dict_of_dfs = Excel(file_path, pre_existing_keys).load(
-                    data_object_names=table_names_to_load
-                )
+                dict_of_dfs = Excel(
+                    file_path,
+                    pre_existing_keys,
+                    stats=self.stats,
+                    schema=self.schema,
+                    sample=self.sample,
+                    unsampled=self.always_read,
+                ).load(data_object_names=table_names_to_load)
                 
                 # if no tables were found, try reading
                 # all sheets as individual tables
@@ -519,6 +1983,12 @@ class IO(object):
                         file_path, sheet_name=None,
                         skiprows=5, header=0
                         )
+
+                    if self.sample is not None:
+                        dict_of_dfs = {
+                            name: sample_frame(df, self.sample)
+                            for name, df in dict_of_dfs.items()
+                        }
                     
             elif file_type == "text":
                 dict_of_dfs = dict()
@@ -532,8 +2002,12 @@ class IO(object):
                 if self.la["extra_files"] in filename_to_tablename:
                     filename_to_tablename = self.la["extra_files"]
 
-                dict_of_dfs[filename_to_tablename] = pd.read_csv(
-                    file_path)
+                with self.stats.stage(
+                    "read_csv", table=filename_to_tablename, file_path=file_path
+                ):
+                    dict_of_dfs[filename_to_tablename] = self.read_csv(
+                        file_path, filename_to_tablename
+                    )
                 
                 if "Unnamed: 0" in dict_of_dfs[
                     filename_to_tablename].columns:
@@ -547,9 +2021,14 @@ class IO(object):
                 # load all tables found in the
                 # file as a dict of dataframes
 
-                dict_of_dfs = Db(file_path, pre_existing_keys).load(
-                    table_names=table_names_to_load
-                )
+                dict_of_dfs = Db(
+                    file_path,
+                    pre_existing_keys,
+                    stats=self.stats,
+                    schema=self.schema,
+                    sample=self.sample,
+                    unsampled=self.always_read,
+                ).load(table_names=table_names_to_load)
 
             elif file_type == "sqlalchemy":
                 # load all tables found in the
@@ -559,12 +2038,229 @@ class IO(object):
                     table_names=table_names_for_conn
                 )
 
+                if self.sample is not None:
+                    dict_of_dfs = {
+                        name: sample_frame(df, self.sample)
+                        for name, df in dict_of_dfs.items()
+                    }
+
+            if (self.manifest is not None) and (file_type in ["excel", "text", "database"]):
+                self.manifest.put(
+                    file_path, dict_of_dfs, state=file_state, **manifest_selection
+                )
+
         else:
             msg = "Unsupported value ({}) provided as input file path."
             log.error(msg.format(file_path))
 
         return dict_of_dfs
 
+    def get_tables_from_many(
+        self,
+        file_path,
+        table_names=None,
+        query_only=None,
+        pre_existing_keys=None,
+        concat=False,
+        max_workers=None,
+    ):
+        """Gets all tables from all input files
+        found in a directory or matched by a glob
+        pattern. The files are read concurrently
+        using a bounded pool of worker threads.
+
+        Any files that fail to load are collected
+        and reported together in a single error,
+        once all the other files were attempted.
+
+        Parameters:
+
+            file_path: str
+                Directory path or a glob pattern
+                such as 'inputs/regions/*.csv'.
+                Only files of supported
+                types get loaded.
+
+            table_names: list of str
+                Tables to load from each file,
+                see `get_tables`
+
+            query_only: str list of 'N' and 'Y', or empty cell (None)
+                See `get_tables`
+
+            pre_existing_keys: dictionary key index
+                Keys is the previously loaded
+                dictionary of dataframes
+
+            concat: bool
+                False: each table read from each file
+                is kept as a separate table. Csv file
+                tables are named after the file.
+                True: all same-named tables are concatenated
+                into a single table. All csv files
+                are concatenated into a single table
+                named after the folder holding them.
+                Default: False
+
+            max_workers: int
+                Maximum number of files read at a time.
+                Default: None, see
+                concurrent.futures.ThreadPoolExecutor
+
+        Returns:
+
+            dict_of_dfs: dict of pd dfs
+                Dictionary of pandas dataframes
+                containing all the tables from all
+                matched files
+        """
+        file_paths = expand_file_path(file_path, extensions=self.supported_extensions)
+
+        if len(file_paths) == 0:
+            msg = "No input files of supported types found in {}."
+            log.error(msg.format(file_path))
+            raise ValueError(msg.format(file_path))
+
+        msg = "Reading {} input files found in {}."
+        log.info(msg.format(len(file_paths), file_path))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self.get_tables,
+                    path,
+                    table_names=table_names,
+                    query_only=query_only,
+                    # csv files get named after the folder
+                    apply_selection=not concat,
+                )
+                for path in file_paths
+            ]
+
+            tables_per_file = dict()
+            failures = dict()
+
+            for path, future in zip(file_paths, futures):
+                try:
+                    tables_per_file[path] = future.result()
+                except Exception as err:
+                    failures[path] = "{}: {}".format(type(err).__name__, err)
+
+        if len(failures) > 0:
+            msg = "Failed to read {} of {} input files found in {}:\n{}".format(
+                len(failures),
+                len(file_paths),
+                file_path,
+                "\n".join(
+                    "    {} - {}".format(path, err) for path, err in failures.items()
+                ),
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+        if pre_existing_keys is None:
+            pre_existing_keys = []
+
+        dict_of_dfs = dict()
+
+        if concat:
+            # csv files hold a single table named after the file,
+            # use the folder name instead so that they get stacked
+            folder_name = ntpath.basename(
+                os.path.dirname(os.path.join(file_path, ""))
+                if os.path.isdir(file_path)
+                else os.path.dirname(file_path)
+            )
+
+            frames = dict()
+            for path, tables in tables_per_file.items():
+                for name, df in tables.items():
+                    if self.get_file_type(path) == "text":
+                        name = folder_name
+                    frames.setdefault(name, []).append(df)
+
+            Debugger.check_for_duplicates(pre_existing_keys, list(frames.keys()))
+
+            if self.table_selection is not None:
+                frames = {
+                    name: frames[name]
+                    for name in select_names(
+                        frames.keys(),
+                        self.table_selection,
+                        always=self.always_read,
+                    )
+                }
+
+            for name, dfs in frames.items():
+                dict_of_dfs[name] = pd.concat(dfs, ignore_index=True)
+
+        else:
+            for path, tables in tables_per_file.items():
+                Debugger.check_for_duplicates(
+                    list(pre_existing_keys) + list(dict_of_dfs.keys()),
+                    list(tables.keys()),
+                )
+                dict_of_dfs.update(tables)
+
+        return dict_of_dfs
+
+    def read_csv(self, file_path, table_name):
+        """Reads a csv file, parsing any columns declared
+        in the table schema directly into the declared types.
+        If any declared column fails to parse, the file
+        is read without declared types, so that all
+        offending values get reported by the schema
+        validation.
+
+        Parameters:
+
+            file_path: str
+                Csv file path
+
+            table_name: str
+                Table name of the file
+
+        Returns:
+
+            df: pandas dataframe
+        """
+        # row sample, see `load`
+        if self.sample is None or select_names([table_name], self.always_read):
+            sample_kwargs = dict()
+        else:
+            sample_kwargs = csv_sample_kwargs(self.sample)
+
+        if self.schema is None or table_name not in self.schema.tables:
+            return pd.read_csv(file_path, **sample_kwargs)
+
+        header = pd.read_csv(file_path, nrows=0).columns
+        labels = {clean_label(str(col)): col for col in header}
+
+        dtypes = {
+            labels[col]: (object if dtype.kind == "U" else dtype)
+            for col, dtype in self.schema.get_dtypes(table_name, kind="other").items()
+            if col in labels
+        }
+        parse_dates = [
+            labels[col]
+            for col in self.schema.get_dtypes(table_name, kind="datetime").keys()
+            if col in labels
+        ]
+
+        try:
+            df = pd.read_csv(
+                file_path, dtype=dtypes, parse_dates=parse_dates, **sample_kwargs
+            )
+        except (TypeError, ValueError):
+            msg = (
+                "Declared column types of table {} do not match the "
+                "contents of {}. Reading without declared types."
+            )
+            log.warning(msg.format(table_name, file_path))
+            df = pd.read_csv(file_path, **sample_kwargs)
+
+        return self.schema.cast(table_name, df)
+
     def create_db(
         self,
         dict_of_dfs,
@@ -574,9 +2270,19 @@ class IO(object):
         run_tag="",
         flavor="sqlite",
         close=True,
+        store_dir=None,
+        keys=None,
+        strict=False,
+        indexes=None,
+        scratch=None,
     ):
         """Creates a database with all the input
-        tables that were read in.
+        tables that were read in, or adds tables to it.
+        Tables are written incrementally, see
+        `adapter.incremental.write_table`: tables that did not
+        change since they were last written get skipped,
+        rows added at the end get appended and, with key
+        columns, only the changed rows get rewritten.
 
         Parameters:
 
@@ -591,7 +2297,8 @@ class IO(object):
                 None: Writes to the db initiated at
                 input data read-in
                 Otherwise pass a database connection
-                to an existing database
+                to an existing database. A closed
+                connection gets reopened.
 
             skip_writeout: bool
                 Do not create any new files or folders
@@ -607,6 +2314,52 @@ class IO(object):
             db_flavor:
                 Database file format
 
+            store_dir: str
+                Default: None
+                Content store folder, see `adapter.cas`. With
+                close=True, a database of tables identical to
+                those of a database stored before gets linked
+                from the store instead of written, and a new
+                database gets added to the store.
+
+            keys: dict
+                Default: None
+                Table name: list of columns identifying
+                the rows, for writing only the changed rows
+
+            strict: bool
+                Default: False, column types chosen by
+                `pandas.DataFrame.to_sql`
+                Write STRICT tables typed by the dtypes, see
+                `adapter.incremental.create_table`. Named
+                index columns, such as those declared in the
+                table schema, get written as columns, and key
+                columns, by default the declared index columns,
+                that identify the rows become the primary key.
+
+            indexes: bool or dict
+                Default: None, no indexes
+                True: index the key columns, unless they are
+                the primary key, or else the first column of
+                each table
+                Table name: list of columns, or list of lists
+                of columns, of the indexes of the table
+                The indexes get created after the rows got
+                inserted.
+
+            scratch: str
+                Default: None, the database gets written
+                in place
+                'memory': assemble the database in memory
+                Folder path, on a local disk: assemble the
+                database in a scratch file there
+                The database, including the tables it held
+                before, then gets copied to the output
+                folder at once and renamed into place, so
+                that no partly written database is left
+                behind. Suited for output folders on network
+                shares. An open db_conn gets closed.
+
         Returns:
 
             res: dict
@@ -631,32 +2384,129 @@ class IO(object):
 
             # create an sql database within the output folder and connect
             db_path = os.path.join(outpath, run_tag + db_out_type)
-            db_con = sqlite3.connect(db_path)
 
-            # write all input tables in the db
-            for table_name in dict_of_dfs.keys():
-                try:
-                    dict_of_dfs[table_name].to_sql(
-                        name=table_name,
-                        con=db_con,
-                        if_exists="replace",
-                        index=False,
-                    )
-                except:
-                    msg = "An error occurred when writting {} table " "to a db {}."
-                    log.error(msg.format(table_name, db_path))
-                    raise ValueError
+            if store_dir is not None and close:
+                store = ContentStore(store_dir)
+                layout = [flavor]
+                if strict or indexes:
+                    layout.append({"strict": strict, "keys": keys, "indexes": indexes})
+
+                digest = hashlib.sha256(
+                    json.dumps(
+                        layout
+                        + [[name, table_digest(df)] for name, df in dict_of_dfs.items()]
+                    ).encode()
+                ).hexdigest()
+
+                if store.has(digest):
+                    store.link(digest, db_path)
+                    store.write_run_manifest(outpath, {ntpath.basename(db_path): digest})
+
+                    msg = "Linked the database of unchanged tables {} from the store."
+                    log.info(msg.format(db_path))
 
-                msg = "Wrote tables in a database: {}."
-                log.info(msg.format(db_path))
+                    db_con = sqlite3.connect(db_path)
+                    db_con.close()
+
+                    return {"db_path": db_path, "db_conn": db_con}
+
+            if scratch is not None:
+                # the connection would point to the replaced file
+                if is_open(db_conn):
+                    db_conn.close()
+
+                db_con, scratch_path = open_scratch(db_path, scratch)
+            # write to a private copy of a database linked to a store
+            elif not unshare(db_path) and is_open(db_conn):
+                db_con = db_conn
+            else:
+                db_con = sqlite3.connect(db_path)
+
+            try:
+                actions = self.write_db_tables(
+                    db_con, dict_of_dfs, db_path, keys=keys, strict=strict, indexes=indexes
+                )
+            except BaseException:
+                if scratch is not None:
+                    discard_scratch(db_con, scratch_path)
+                raise
+
+            if scratch is not None:
+                publish_scratch(db_con, scratch_path, db_path)
+                db_con = sqlite3.connect(db_path)
+
+            msg = "Wrote tables in a database: {}. Skipped {} unchanged tables."
+            log.info(
+                msg.format(db_path, sum(i == "skipped" for i in actions.values()))
+            )
 
             if close:
                 db_con.close()
 
+                if store_dir is not None:
+                    store.adopt(db_path, digest)
+                    store.write_run_manifest(outpath, {ntpath.basename(db_path): digest})
+
             res = {"db_path": db_path, "db_conn": db_con}
 
         return res
 
+    def write_db_tables(
+        self, db_con, dict_of_dfs, db_path, keys=None, strict=False, indexes=None
+    ):
+        """Writes tables to an open database, see `create_db`.
+
+        Returns:
+
+            actions: dict
+                Table name: action, see
+                `adapter.incremental.write_table`
+        """
+        if keys is None:
+            keys = dict()
+
+        fingerprints = read_fingerprints(db_con)
+
+        # write all tables that changed in the db
+        actions = dict()
+        for table_name in dict_of_dfs.keys():
+            df = dict_of_dfs[table_name]
+            table_keys = keys.get(table_name)
+            table_indexes = indexes
+
+            if strict:
+                if all(name is not None for name in df.index.names):
+                    df = df.reset_index()
+
+                if (
+                    table_keys is None
+                    and self.schema is not None
+                    and len(self.schema.tables.get(table_name, {}).get("index", [])) > 0
+                ):
+                    table_keys = self.schema.tables[table_name]["index"]
+
+            if isinstance(indexes, dict):
+                table_indexes = indexes.get(table_name)
+                if table_indexes and all(isinstance(i, str) for i in table_indexes):
+                    table_indexes = [table_indexes]
+
+            try:
+                actions[table_name] = write_table(
+                    db_con,
+                    table_name,
+                    df,
+                    keys=table_keys,
+                    fingerprints=fingerprints,
+                    strict=strict,
+                    indexes=table_indexes,
+                )
+            except:
+                msg = "An error occurred when writting {} table " "to a db {}."
+                log.error(msg.format(table_name, db_path))
+                raise ValueError
+
+        return actions
+
     def write(
             self,
             type="db",
@@ -666,6 +2516,15 @@ class IO(object):
             run_tag="",
             db_conn=None,
             close_db=True,
+            compression=None,
+            chunksize=None,
+            index=True,
+            max_workers=None,
+            consolidated_db=None,
+            keys=None,
+            strict_db=False,
+            db_indexes=None,
+            db_scratch=None,
     ):
         """Writes all dataframes from a dictionary of dataframes
         out into an existing database.
@@ -679,6 +2538,8 @@ class IO(object):
                 'db': database
                 'csv': csv
                 'db&csv': both database and csv
+                'consolidated': consolidated database
+                    of many runs, see consolidated_db
 
             data_connection: dict
                 Return of `load` method
@@ -734,6 +2595,62 @@ class IO(object):
                 To close the db connection after
                 the data is written.
 
+            compression: str
+                Default: None, no compression
+                Compression of csv files:
+                'gzip' (.csv.gz) or 'zstd' (.csv.zst).
+                zstd requires the `zstandard` package.
+
+            chunksize: int
+                Default: None, each table gets
+                written at once
+                Number of rows written at a time, for
+                streaming very large tables to csv
+
+            index: bool or dict
+                Default: True
+                Write the dataframe index to csv.
+                Pass a dict of table name: bool
+                to set it per table, tables not
+                in the dict keep the index.
+
+            max_workers: int
+                Maximum number of csv files written at a
+                time. Default: None, see
+                concurrent.futures.ThreadPoolExecutor
+
+            consolidated_db: str
+                Default: None, the consolidated database
+                the data connection got loaded into, if any
+                Consolidated database path, see
+                `adapter.consolidated.ConsolidatedDb`. The tables
+                get added under the run tag.
+
+            keys: dict
+                Default: None
+                Table name: list of columns identifying the
+                rows. Tables written to a db before get
+                rewritten in part: unchanged tables get
+                skipped, added rows appended and, for tables
+                with keys, only the changed rows replaced.
+                See `adapter.incremental.write_table`.
+
+            strict_db: bool
+                Default: False, column types chosen by pandas
+                Write replaced tables as STRICT tables typed
+                by the table dtypes, see `create_db`
+
+            db_indexes: bool or dict
+                Default: None, no indexes
+                Indexes of the database tables, see `create_db`
+
+            db_scratch: str
+                Default: None, the database gets written
+                in place
+                'memory' or a local folder path: assemble the
+                database there and copy it to the output folder
+                at once, see `create_db`
+
         Return:
 
             True
@@ -743,7 +2660,10 @@ class IO(object):
             if data_as_dict_of_dfs is None:
                 data_as_dict_of_dfs = data_connection["tables_as_dict_of_dfs"]
 
-            db_conn = data_connection["db_conn"]
+            db_conn = data_connection.get("db_conn")
+
+            if consolidated_db is None:
+                consolidated_db = data_connection.get("consolidated_db")
 
             if outpath is None:
                 outpath = data_connection["outpath"]
@@ -752,13 +2672,13 @@ class IO(object):
         else:
             if outpath is None:
                 outpath = os.getcwd()
-        outpath = convert_network_drive_path(outpath, mapping=self.os_mapping)
+        outpath = self.resolver.resolve(outpath)
 
         if data_as_dict_of_dfs is None:
             msg = "No data to write passed."
             log.error(msg)
             raise ValueError
-        elif not isinstance(data_as_dict_of_dfs, dict):
+        elif not isinstance(data_as_dict_of_dfs, Mapping):
             msg = "Data needs to be in a " "dictionary of dataframes format."
             log.error(msg)
             raise ValueError
@@ -772,13 +2692,32 @@ class IO(object):
                 log.error(msg)
                 raise ValueError
 
-            self.create_db(
+            db_res = self.create_db(
                 dict_of_dfs=data_as_dict_of_dfs,
                 db_conn=db_conn,
                 outpath=outpath,
                 run_tag=run_tag,
                 flavor="sqlite",
                 close=close_db,
+                keys=keys,
+                strict=strict_db,
+                indexes=db_indexes,
+                scratch=db_scratch,
+            )
+
+            if data_connection is not None:
+                # reused by further writes
+                data_connection["db_conn"] = db_res["db_conn"]
+
+        if "consolidated" in type:
+
+            if consolidated_db is None:
+                msg = "Missing consolidated database path."
+                log.error(msg)
+                raise ValueError(msg)
+
+            ConsolidatedDb(consolidated_db).write_tables(
+                run_tag, data_as_dict_of_dfs
             )
 
         if "csv" in type:
@@ -786,17 +2725,102 @@ class IO(object):
             if not os.path.exists(outpath):
                 os.mkdir(outpath)
 
-            for key in data_as_dict_of_dfs.keys():
-                df_to_write = data_as_dict_of_dfs[key]
+            if compression not in self.csv_compression_extensions:
+                msg = "Unsupported csv compression {}. Supported: {}."
+                log.error(msg.format(compression, list(self.csv_compression_extensions)))
+                raise ValueError(msg.format(compression, list(self.csv_compression_extensions)))
+
+            if not isinstance(index, dict):
+                index = {key: index for key in data_as_dict_of_dfs.keys()}
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = dict()
 
-                df_to_write.to_csv(
-                    path_or_buf=os.path.join(
+                for key in data_as_dict_of_dfs.keys():
+                    csv_path = os.path.join(
                         outpath,
-                        key + "_" + run_tag + ".csv",
+                        key + "_" + run_tag + ".csv"
+                        + self.csv_compression_extensions[compression],
                     )
+
+                    futures[csv_path] = executor.submit(
+                        self.write_csv,
+                        data_as_dict_of_dfs[key],
+                        csv_path,
+                        index=index.get(key, True),
+                        compression=compression,
+                        chunksize=chunksize,
+                    )
+
+                failures = dict()
+                for csv_path, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as err:
+                        failures[csv_path] = "{}: {}".format(err.__class__.__name__, err)
+
+            if len(failures) > 0:
+                msg = "Failed to write {} of {} csv files:\n{}".format(
+                    len(failures),
+                    len(futures),
+                    "\n".join(
+                        "    {} - {}".format(path, err) for path, err in failures.items()
+                    ),
                 )
+                log.error(msg)
+                raise ValueError(msg)
+
+            msg = "Wrote {} csv files in {}."
+            log.info(msg.format(len(futures), outpath))
+
+    def write_csv(self, df, csv_path, index=True, compression=None, chunksize=None):
+        """Writes a dataframe to a csv file. The file
+        is first written under a temporary name in the
+        same folder and renamed once complete, so that
+        a partially written file never appears under
+        the final name.
+
+        Parameters:
+
+            df: pandas dataframe
+                Table to write
+
+            csv_path: str
+                Output file fullpath
+
+            index: bool
+                Write the dataframe index
 
-    def first_col_to_index(self, dict_of_dfs, table_names=True, drop=True):
+            compression: str
+                None, 'gzip' or 'zstd'
+
+            chunksize: int
+                Number of rows written at a time
+
+        Returns:
+
+            csv_path: str
+                Output file fullpath
+        """
+        tmp_path = csv_path + ".tmp"
+
+        try:
+            df.to_csv(
+                path_or_buf=tmp_path,
+                index=index,
+                compression=compression,
+                chunksize=chunksize,
+            )
+            os.replace(tmp_path, csv_path)
+
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return csv_path
+
+    def first_col_to_index(self, dict_of_dfs, table_names=True, drop=True, copy=True):
         """Function that sets the first column of dataframe as index.
 
         Parameters:
@@ -818,6 +2842,11 @@ class IO(object):
                 Flag indicating whether to drop the column
                 being set as index. Default value is true.
 
+            copy: boolean
+                Default: True, the passed tables are not modified
+                False: set the index of the passed tables in place
+                and return them without making any copies.
+
         Returns:
 
             res: dict of pandas dataframes
@@ -842,6 +2871,14 @@ class IO(object):
             log.error(msg.format(table_names))
             raise ValueError
 
+        if not copy:
+            for x in dict_of_dfs.keys():
+                if x in table_names:
+                    col = dict_of_dfs[x].columns[0]
+                    dict_of_dfs[x].set_index(col, drop=True, inplace=True)
+
+            return dict_of_dfs
+
         res = dict()
         for x in dict_of_dfs.keys():
             if x in table_names:
@@ -866,11 +2903,7 @@ class IO(object):
             list_of_cleaned_labels: list
                 A list with cleaned lables
         """
-        list_of_labels = [str(x) for x in list_of_labels]
-
-        list_of_cleaned_labels = [
-            re.sub(" +", " ", lbl.strip()) for lbl in list_of_labels
-        ]
+        list_of_cleaned_labels = [clean_label(str(lbl)) for lbl in list_of_labels]
 
         return list_of_cleaned_labels
 
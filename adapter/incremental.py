@@ -0,0 +1,539 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+
+from adapter.cas import clone_file, table_digest
+from adapter.comm.tools import lazy_import
+from adapter.consolidated import quote, sql_values
+from adapter.label_map import Labels
+
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# table of the fingerprints of the tables written
+# to a run database, left out when reading
+fingerprint_table = Labels().set_labels()["fingerprints"]
+
+
+def is_open(con):
+    """Whether a sqlite connection can still be used."""
+    if not isinstance(con, sqlite3.Connection):
+        return False
+
+    try:
+        con.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return False
+
+    return True
+
+
+def read_fingerprints(con):
+    """Reads the fingerprints of the tables of a database.
+
+    Parameters:
+
+        con: sqlite3 connection
+
+    Returns:
+
+        fingerprints: dict
+            Table name: (digest, number of rows, layout),
+            see `get_layout`
+    """
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS {} "
+        "(table_name TEXT PRIMARY KEY, digest TEXT, n_rows INTEGER, layout TEXT)".format(
+            fingerprint_table
+        )
+    )
+    if "layout" not in get_columns(con, fingerprint_table):
+        con.execute("ALTER TABLE {} ADD COLUMN layout TEXT".format(fingerprint_table))
+    con.commit()
+
+    return {
+        row[0]: (row[1], row[2], row[3])
+        for row in con.execute(
+            "SELECT table_name, digest, n_rows, layout FROM {}".format(fingerprint_table)
+        )
+    }
+
+
+def get_layout(keys=None, strict=False, indexes=None):
+    """Describes the layout a table gets written in, so that
+    a table written in another layout gets replaced.
+
+    Returns:
+
+        layout: str
+            None for the default layout of `pandas.DataFrame.to_sql`
+    """
+    if not strict and not indexes:
+        return None
+
+    return json.dumps(
+        {"strict": bool(strict), "keys": keys if strict else None, "indexes": indexes}
+    )
+
+
+def set_fingerprint(con, table_name, digest=None, n_rows=None, layout=None):
+    """Records the fingerprint of a table, or drops
+    it if no digest is passed."""
+    if digest is None:
+        con.execute(
+            "DELETE FROM {} WHERE table_name = ?".format(fingerprint_table),
+            (table_name,),
+        )
+    else:
+        con.execute(
+            "INSERT OR REPLACE INTO {} (table_name, digest, n_rows, layout) "
+            "VALUES (?, ?, ?, ?)".format(fingerprint_table),
+            (table_name, digest, n_rows, layout),
+        )
+    con.commit()
+
+
+def get_columns(con, table_name):
+    """Column labels of a table, empty if the table does not exist."""
+    return [row[1] for row in con.execute("PRAGMA table_info({})".format(quote(table_name)))]
+
+
+def strict_type(series):
+    """Column type of a pandas column in a STRICT table.
+
+    Parameters:
+
+        series: pandas series
+
+    Returns:
+
+        type: str
+            'INTEGER', 'REAL', 'TEXT', 'BLOB' or 'ANY'
+    """
+    kind = getattr(series.dtype, "kind", "O")
+
+    # durations are stored as integer nanoseconds, see `sql_values`
+    if kind in "bium":
+        return "INTEGER"
+    if kind == "f":
+        return "REAL"
+    if kind in "MU":
+        return "TEXT"
+
+    # object columns, by the types of their values
+    types = {type(value) for value in series.dropna()}
+    if len(types) == 0 or types <= {str}:
+        return "TEXT"
+    if types <= {bytes}:
+        return "BLOB"
+
+    return "ANY"
+
+
+def is_key(df, columns):
+    """Whether columns identify the rows of a table uniquely."""
+    return (
+        len(columns) > 0
+        and not df[columns].isna().any().any()
+        and not df.duplicated(columns).any()
+    )
+
+
+def create_table(con, table_name, df, strict=True, primary_key=None):
+    """Creates a table with column types derived from
+    the dtypes of a dataframe, replacing any table of
+    the same name.
+
+    Parameters:
+
+        con: sqlite3 connection
+
+        table_name: str
+
+        df: pandas dataframe
+
+        strict: bool
+            Default: True
+            Create a STRICT table, if the sqlite
+            version supports it (3.37 and later)
+
+        primary_key: list of str
+            Default: None
+            Primary key columns. The table gets created
+            WITHOUT ROWID, stored in the order of the key.
+    """
+    columns = [
+        "{} {}".format(quote(str(col)), strict_type(df.iloc[:, inx]))
+        for inx, col in enumerate(df.columns)
+    ]
+
+    options = list()
+    if primary_key:
+        columns.append(
+            "PRIMARY KEY ({})".format(", ".join(quote(col) for col in primary_key))
+        )
+        options.append("WITHOUT ROWID")
+
+    if strict:
+        if sqlite3.sqlite_version_info >= (3, 37, 0):
+            options.append("STRICT")
+        else:
+            msg = "Sqlite {} does not support STRICT tables, created {} without."
+            log.warning(msg.format(sqlite3.sqlite_version, table_name))
+
+    con.execute("DROP TABLE IF EXISTS {}".format(quote(table_name)))
+    con.execute(
+        "CREATE TABLE {} ({}) {}".format(
+            quote(table_name), ", ".join(columns), ", ".join(options)
+        ).strip()
+    )
+
+
+def create_indexes(con, table_name, indexes):
+    """Creates indexes on a table, best after its rows got inserted.
+
+    Parameters:
+
+        con: sqlite3 connection
+
+        table_name: str
+
+        indexes: list of lists of str
+            Columns of each index
+    """
+    for columns in indexes:
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                quote("{}__{}".format(table_name, "_".join(columns))),
+                quote(table_name),
+                ", ".join(quote(col) for col in columns),
+            )
+        )
+
+
+def insert_rows(con, table_name, df):
+    """Inserts the rows of a dataframe into an existing table."""
+    columns = [str(col) for col in df.columns]
+    values = [sql_values(df.iloc[:, inx]) for inx in range(df.shape[1])]
+
+    con.executemany(
+        "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(table_name),
+            ", ".join(quote(col) for col in columns),
+            ", ".join("?" for _ in columns),
+        ),
+        zip(*values),
+    )
+
+
+def upsert_table(con, table_name, df, keys):
+    """Brings a table to the rows of a dataframe by deleting
+    and inserting only the rows that differ, identified by
+    key columns.
+
+    Parameters:
+
+        con: sqlite3 connection
+
+        table_name: str
+
+        df: pandas dataframe
+            New content of the table
+
+        keys: list of str
+            Columns identifying the rows
+
+    Returns:
+
+        n_deleted, n_inserted: int
+            None if the keys do not identify the rows
+            uniquely, in which case nothing got written
+    """
+    columns = [str(col) for col in df.columns]
+    key_positions = [columns.index(key) for key in keys]
+
+    new_rows = dict()
+    for row in zip(*[sql_values(df.iloc[:, inx]) for inx in range(df.shape[1])]):
+        new_rows[tuple(row[inx] for inx in key_positions)] = row
+
+    old_rows = dict()
+    for row in con.execute(
+        "SELECT {} FROM {}".format(
+            ", ".join(quote(col) for col in columns), quote(table_name)
+        )
+    ):
+        old_rows[tuple(row[inx] for inx in key_positions)] = row
+
+    n_rows = con.execute("SELECT count(*) FROM {}".format(quote(table_name))).fetchone()[0]
+    if len(new_rows) < len(df) or len(old_rows) < n_rows:
+        return None
+
+    deleted = [key for key, row in old_rows.items() if new_rows.get(key) != row]
+    inserted = [row for key, row in new_rows.items() if old_rows.get(key) != row]
+
+    with con:
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                quote(table_name + "__keys"),
+                quote(table_name),
+                ", ".join(quote(key) for key in keys),
+            )
+        )
+        con.executemany(
+            "DELETE FROM {} WHERE {}".format(
+                quote(table_name), " AND ".join(quote(key) + " IS ?" for key in keys)
+            ),
+            deleted,
+        )
+        con.executemany(
+            "INSERT INTO {} ({}) VALUES ({})".format(
+                quote(table_name),
+                ", ".join(quote(col) for col in columns),
+                ", ".join("?" for _ in columns),
+            ),
+            inserted,
+        )
+
+    return len(deleted), len(inserted)
+
+
+def write_table(
+    con, table_name, df, keys=None, fingerprints=None, strict=False, indexes=None
+):
+    """Writes a table to a database, writing only what changed
+    since the table was last written with a fingerprint in
+    the same layout, see `get_layout`:
+
+        - 'skipped': the table did not change
+        - 'appended': rows got added to the end of the table
+        - 'upserted': with key columns, the rows that changed,
+        got added or got removed got deleted and inserted
+        - 'replaced': the table got written in full
+
+    A table without columns cannot be written to sqlite, so
+    it gets skipped, dropping any table of the same name.
+
+    Parameters:
+
+        con: sqlite3 connection
+
+        table_name: str
+
+        df: pandas dataframe
+
+        keys: list of str
+            Default: None
+            Columns identifying the rows of the table
+
+        fingerprints: dict
+            Default: None, read from the database
+            See `read_fingerprints`
+
+        strict: bool
+            Default: False, column types chosen by
+            `pandas.DataFrame.to_sql`
+            Replace the table with a STRICT table typed
+            by the dtypes, see `create_table`. Key columns
+            that identify the rows become the primary key.
+
+        indexes: list of lists of str or True
+            Default: None
+            Columns of indexes created after the rows
+            of a replaced table got inserted. True: an
+            index on the key columns, unless they are the
+            primary key, or else on the first column
+
+    Returns:
+
+        action: str
+    """
+    if fingerprints is None:
+        fingerprints = read_fingerprints(con)
+
+    if df.shape[1] == 0:
+        msg = "Table {} has no columns, skipped writing it."
+        log.warning(msg.format(table_name))
+        with con:
+            con.execute("DROP TABLE IF EXISTS {}".format(quote(table_name)))
+        set_fingerprint(con, table_name)
+        fingerprints.pop(table_name, None)
+        return "skipped"
+
+    if keys is not None:
+        missing = [key for key in keys if key not in [str(col) for col in df.columns]]
+        if len(missing) > 0:
+            msg = "Key columns {} not found in table {}."
+            log.error(msg.format(missing, table_name))
+            raise ValueError(msg.format(missing, table_name))
+
+    digest = table_digest(df)
+    layout = get_layout(keys=keys, strict=strict, indexes=indexes)
+    previous = fingerprints.get(table_name)
+    existing = get_columns(con, table_name)
+
+    if previous is not None and len(existing) > 0 and previous[2] != layout:
+        # written in another layout
+        set_fingerprint(con, table_name)
+        action = "replaced"
+
+    elif previous is not None and len(existing) > 0:
+        previous_digest, previous_rows, _ = previous
+
+        if previous_digest == digest:
+            return "skipped"
+
+        # invalidated first, so that an interrupted
+        # write never leaves a matching fingerprint
+        set_fingerprint(con, table_name)
+
+        if (
+            len(df) > previous_rows
+            and table_digest(df.iloc[:previous_rows]) == previous_digest
+        ):
+            with con:
+                insert_rows(con, table_name, df.iloc[previous_rows:])
+            action = "appended"
+
+        elif keys is not None and existing == [str(col) for col in df.columns]:
+            if upsert_table(con, table_name, df, keys) is not None:
+                action = "upserted"
+            else:
+                action = "replaced"
+        else:
+            action = "replaced"
+    else:
+        set_fingerprint(con, table_name)
+        action = "replaced"
+
+    if action == "replaced":
+        primary_key = None
+
+        if strict:
+            primary_key = keys if keys is not None and is_key(df, keys) else None
+
+            with con:
+                create_table(con, table_name, df, primary_key=primary_key)
+                insert_rows(con, table_name, df)
+        else:
+            df.to_sql(name=table_name, con=con, if_exists="replace", index=False)
+
+        if indexes is True:
+            # the key, unless it is the primary key already,
+            # or else the first column
+            if keys is not None:
+                indexes = [] if primary_key is not None else [keys]
+            else:
+                indexes = [[str(df.columns[0])]] if df.shape[1] > 0 else []
+
+        if indexes:
+            with con:
+                create_indexes(con, table_name, indexes)
+
+    set_fingerprint(con, table_name, digest, len(df), layout)
+    fingerprints[table_name] = (digest, len(df), layout)
+
+    return action
+
+
+def open_scratch(db_path, scratch):
+    """Opens a database to assemble a run database in,
+    holding a copy of the run database if it exists.
+
+    Parameters:
+
+        db_path: str
+            Run database path
+
+        scratch: str
+            'memory' or a scratch folder path
+
+    Returns:
+
+        con: sqlite3 connection
+
+        scratch_path: str
+            Scratch database path, None in memory
+    """
+    if scratch == "memory":
+        scratch_path = None
+        con = sqlite3.connect(":memory:")
+    else:
+        os.makedirs(scratch, exist_ok=True)
+        fd, scratch_path = tempfile.mkstemp(dir=scratch, suffix=".db")
+        os.close(fd)
+        con = sqlite3.connect(scratch_path)
+
+        # disposable, so no need for durability
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+
+    if os.path.isfile(db_path):
+        src = sqlite3.connect(db_path)
+        try:
+            src.backup(con)
+        finally:
+            src.close()
+
+    return con, scratch_path
+
+
+def discard_scratch(con, scratch_path):
+    """Closes and removes a scratch database."""
+    con.close()
+
+    if scratch_path is not None and os.path.exists(scratch_path):
+        os.remove(scratch_path)
+
+
+def publish_scratch(con, scratch_path, db_path):
+    """Copies a database assembled by `open_scratch` next to
+    the run database path in a single pass and renames it into
+    place, so that readers never see a partly written database.
+
+    Parameters:
+
+        con: sqlite3 connection
+            Scratch database, gets closed
+
+        scratch_path: str
+            Scratch database path, None in memory
+
+        db_path: str
+            Run database path
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(db_path)),
+        prefix="." + os.path.basename(db_path),
+        suffix=".tmp",
+    )
+    os.close(fd)
+
+    try:
+        if scratch_path is None:
+            dest = sqlite3.connect(tmp_path)
+            try:
+                con.backup(dest)
+            finally:
+                dest.close()
+        else:
+            con.close()
+            clone_file(scratch_path, tmp_path)
+
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        discard_scratch(con, scratch_path)
+
+    msg = "Copied the database assembled in {} to {}."
+    log.info(msg.format(scratch_path or "memory", db_path))
@@ -13,12 +13,21 @@ class Labels(object):
             # table names
             "run_pars": "run_parameters",
             "extra_files": "inputs_from_files",
+            "schema": "table_schema",
+            "overlay_keys": "overlay_keys",
+            "fingerprints": "adapter_fingerprints",
             # column labels
             "outpath": "Output Path",
             "version": "Version",
             "inpath": "File Path",
             "tbl_nam": "Table Name",
             "query": "Query Only",
+            "concat": "Concatenate",
+            "column": "Column",
+            "dtype": "Dtype",
+            "index": "Index",
+            "required": "Required",
+            "key_cols": "Key Columns",
         }
 
         return self.labels
@@ -0,0 +1,312 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from adapter.comm.tools import lazy_import
+
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class Manifest(object):
+    """Keeps a record of the input files read in by
+    the `IO` object, together with the tables parsed
+    from each of them, so that a subsequent load
+    can reuse the tables of any files that did not
+    change since.
+
+    Each file is identified by its path and the table
+    selection it was read with. A file is considered
+    unchanged if its size and modification time match
+    the ones recorded. If they do not match, the content
+    hash gets compared, so that a file that got touched
+    or copied over without changes is not read in again.
+
+    Parameters:
+
+        cache_dir: str
+            Default: None, the parsed tables are only kept
+            in memory of the running process
+            Folder to persist the manifest and the parsed
+            tables to, so that they can be reused across
+            python sessions.
+    """
+
+    manifest_filename = "manifest.json"
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.entries = dict()
+        self.tables = dict()
+
+        # reuse statistics
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+        if self.cache_dir is not None:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+
+            manifest_path = os.path.join(self.cache_dir, self.manifest_filename)
+
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as f:
+                    self.entries = json.load(f)
+
+                msg = "Read the input manifest with {} entries from {}."
+                log.info(msg.format(len(self.entries), manifest_path))
+
+    @staticmethod
+    def get_key(file_path, table_names=None, query_only=None, sample=None):
+        """Creates a manifest key for an input file
+        read with a given table selection.
+
+        Parameters:
+
+            file_path: str
+                Input file path
+
+            table_names: list of str
+                Tables loaded from the file
+
+            query_only: str or list of str
+                Query flags for the tables
+
+            sample: int or float
+                Default: None, full tables
+                Row sample, see `adapter.sampling`
+
+        Returns:
+
+            key: str
+        """
+        key = [os.path.abspath(file_path), str(table_names), str(query_only)]
+
+        if sample is not None:
+            key.append(str(sample))
+
+        return json.dumps(key)
+
+    @staticmethod
+    def file_hash(file_path, block_size=2**20):
+        """Hashes the content of a file.
+
+        Parameters:
+
+            file_path: str
+                File path
+
+            block_size: int
+                Number of bytes read at a time
+
+        Returns:
+
+            sha256 hexdigest: str
+        """
+        file_hash = hashlib.sha256()
+
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                file_hash.update(block)
+
+        return file_hash.hexdigest()
+
+    def count(self, hit):
+        """Counts a cache hit or miss, from any thread."""
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def file_state(self, file_path):
+        """Size, modification time and content hash of a file,
+        to be taken before the file gets read and passed to `put`.
+
+        Parameters:
+
+            file_path: str
+                Input file path
+
+        Returns:
+
+            state: dict or None
+                Keys 'size', 'mtime' and 'hash', None
+                if the file does not exist
+        """
+        if not os.path.isfile(file_path):
+            return None
+
+        stat = os.stat(file_path)
+
+        return {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": self.file_hash(file_path),
+        }
+
+    def get(self, file_path, table_names=None, query_only=None, sample=None):
+        """Looks up the tables previously read from
+        an input file.
+
+        Parameters:
+
+            file_path: str
+                Input file path
+
+            table_names: list of str
+                Tables loaded from the file
+
+            query_only: str or list of str
+                Query flags for the tables
+
+            sample: int or float
+                Default: None, full tables
+                Row sample, see `adapter.sampling`
+
+        Returns:
+
+            dict_of_dfs: dict of pd dfs or None
+                Shallow copies of the previously read tables,
+                or None if the file changed or was
+                not read in before
+        """
+        key = self.get_key(file_path, table_names, query_only, sample)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+        if entry is None or not os.path.isfile(file_path):
+            self.count(hit=False)
+            return None
+
+        stat = os.stat(file_path)
+
+        if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime"]):
+            if stat.st_size != entry["size"] or (
+                self.file_hash(file_path) != entry["hash"]
+            ):
+                msg = "Input file {} changed since it was last read in."
+                log.info(msg.format(file_path))
+                self.count(hit=False)
+                return None
+
+            # same content, only the file got touched
+            with self.lock:
+                entry["mtime"] = stat.st_mtime_ns
+                self.save()
+
+        with self.lock:
+            dict_of_dfs = self.tables.get(key)
+
+        if dict_of_dfs is None:
+            if entry.get("tables_path") is None or not os.path.exists(
+                entry["tables_path"]
+            ):
+                self.count(hit=False)
+                return None
+
+            dict_of_dfs = pd.read_pickle(entry["tables_path"], compression="gzip")
+
+            with self.lock:
+                self.tables[key] = dict_of_dfs
+
+        self.count(hit=True)
+
+        msg = "Reusing tables {} previously read from unchanged input file {}."
+        log.info(msg.format(entry["tables"], file_path))
+
+        return {name: df.copy(deep=False) for name, df in dict_of_dfs.items()}
+
+    def put(
+        self,
+        file_path,
+        dict_of_dfs,
+        table_names=None,
+        query_only=None,
+        sample=None,
+        state=None,
+    ):
+        """Records the tables read from an input file.
+
+        Parameters:
+
+            file_path: str
+                Input file path
+
+            dict_of_dfs: dict of pd dfs
+                Tables read from the file
+
+            table_names: list of str
+                Tables loaded from the file
+
+            query_only: str or list of str
+                Query flags for the tables
+
+            sample: int or float
+                Default: None, full tables
+                Row sample, see `adapter.sampling`
+
+            state: dict
+                Default: None, taken now
+                File state taken before the file got read,
+                see `file_state`. Tables of a file that changed
+                while it was read do not get recorded.
+        """
+        if not os.path.isfile(file_path):
+            return
+
+        key = self.get_key(file_path, table_names, query_only, sample)
+
+        if state is None:
+            state = self.file_state(file_path)
+        else:
+            stat = os.stat(file_path)
+
+            if (stat.st_size, stat.st_mtime_ns) != (state["size"], state["mtime"]):
+                msg = "Input file {} changed while it was read in, not recorded."
+                log.info(msg.format(file_path))
+                return
+
+        entry = {
+            "path": os.path.abspath(file_path),
+            "size": state["size"],
+            "mtime": state["mtime"],
+            "hash": state["hash"],
+            "tables": list(dict_of_dfs.keys()),
+            "tables_path": None,
+        }
+
+        # keep own shallow copies, as the returned
+        # tables may get relabeled in place
+        dict_of_dfs = {name: df.copy(deep=False) for name, df in dict_of_dfs.items()}
+
+        if self.cache_dir is not None:
+            entry["tables_path"] = os.path.join(
+                self.cache_dir,
+                hashlib.sha256(key.encode()).hexdigest() + ".pkl.gz",
+            )
+            pd.to_pickle(dict_of_dfs, entry["tables_path"], compression="gzip")
+
+        with self.lock:
+            self.entries[key] = entry
+            self.tables[key] = dict_of_dfs
+            self.save()
+
+    def save(self):
+        """Writes the manifest to the cache folder, if any."""
+        if self.cache_dir is None:
+            return
+
+        manifest_path = os.path.join(self.cache_dir, self.manifest_filename)
+
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(self.entries, f, indent=1)
+
+        os.replace(manifest_path + ".tmp", manifest_path)
@@ -0,0 +1,164 @@
+import logging
+
+from adapter.comm.tools import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+def get_key_index(df, keys):
+    """Creates an index of the key values of a table.
+
+    Parameters:
+
+        df: pandas dataframe
+
+        keys: list of str
+            Key column labels or index level names
+
+    Returns:
+
+        key index: pandas index
+    """
+    arrays = list()
+    for key in keys:
+        if key in df.columns:
+            arrays.append(df[key].to_numpy())
+        elif key in df.index.names:
+            arrays.append(df.index.get_level_values(key).to_numpy())
+        else:
+            msg = "Key column {} not found in table with columns {}."
+            log.error(msg.format(key, list(df.columns)))
+            raise ValueError(msg.format(key, list(df.columns)))
+
+    if len(arrays) == 1:
+        return pd.Index(arrays[0])
+
+    return pd.MultiIndex.from_arrays(arrays)
+
+
+def replace_values(series, positions, values):
+    """Creates a copy of a column with the values
+    at the given positions replaced.
+
+    Parameters:
+
+        series: pandas series
+
+        positions: numpy array of int
+
+        values: numpy array
+
+    Returns:
+
+        series: pandas series
+    """
+    current = series.to_numpy()
+
+    if current.dtype != object and values.dtype != object:
+        dtype = np.result_type(current, values)
+    else:
+        dtype = object
+
+    replaced = current.astype(dtype, copy=True)
+    replaced[positions] = values
+    replaced = pd.Series(replaced, index=series.index, name=series.name)
+
+    if not isinstance(series.dtype, np.dtype):
+        # categorical, nullable and other extension types
+        try:
+            replaced = replaced.astype(series.dtype)
+        except (TypeError, ValueError):
+            pass
+
+    return replaced
+
+
+def upsert_rows(base_df, delta_df, keys):
+    """Applies the rows of a delta table to a base table. Rows
+    with keys found in the base table replace the values of the
+    columns present in the delta table, and rows with new
+    keys get appended. The base table is not modified. If only
+    existing rows get updated, the result shares all columns
+    that did not change with it. Appending rows copies the whole
+    table, as pandas columns are contiguous arrays, so that
+    memory then grows with the base table rather than the delta.
+
+    Parameters:
+
+        base_df: pandas dataframe
+            Base table
+
+        delta_df: pandas dataframe
+            Rows to update or add. May contain a
+            subset of the columns of the base table.
+
+        keys: list of str
+            Columns, or index levels of the base table,
+            identifying the rows
+
+    Returns:
+
+        df: pandas dataframe
+    """
+    base_keys = get_key_index(base_df, keys)
+    delta_keys = get_key_index(delta_df, keys)
+
+    for table, key_index in [("base", base_keys), ("overlay", delta_keys)]:
+        if not key_index.is_unique:
+            msg = "Keys {} do not identify the rows of the {} table uniquely."
+            log.error(msg.format(keys, table))
+            raise ValueError(msg.format(keys, table))
+
+    columns = [col for col in delta_df.columns if col not in keys]
+
+    unknown = [col for col in columns if col not in base_df.columns]
+    if len(unknown) > 0:
+        msg = "Overlay columns {} not found in the base table."
+        log.error(msg.format(unknown))
+        raise ValueError(msg.format(unknown))
+
+    positions = base_keys.get_indexer(delta_keys)
+    matched = positions >= 0
+
+    data = dict()
+    for inx in range(base_df.shape[1]):
+        series = base_df.iloc[:, inx]
+
+        if matched.any() and base_df.columns[inx] in columns:
+            series = replace_values(
+                series,
+                positions[matched],
+                delta_df[base_df.columns[inx]].to_numpy()[matched],
+            )
+
+        # arrays, so that no index alignment takes place
+        data[inx] = series.array
+
+    df = pd.DataFrame(data, index=base_df.index, copy=False)
+    df.columns = base_df.columns
+
+    if not matched.all():
+        new_rows = delta_df[~matched]
+
+        # bring the keys to the layout of the base table
+        index_keys = [key for key in keys if key in base_df.index.names]
+        if len(index_keys) > 0 and all(key in new_rows.columns for key in index_keys):
+            new_rows = new_rows.set_index(list(base_df.index.names))
+        elif isinstance(base_df.index, pd.RangeIndex):
+            new_rows = new_rows.set_axis(
+                pd.RangeIndex(len(base_df), len(base_df) + len(new_rows))
+            )
+
+        # missing columns of the new rows are filled in by concat
+        df = pd.concat(
+            [df, new_rows[[col for col in base_df.columns if col in new_rows.columns]]]
+        )
+
+    msg = "Updated {} and added {} rows by keys {}."
+    log.debug(msg.format(int(matched.sum()), int((~matched).sum()), keys))
+
+    return df
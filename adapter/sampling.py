@@ -0,0 +1,160 @@
+import logging
+import numbers
+
+from adapter.comm.tools import lazy_import
+
+np = lazy_import("numpy")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# Knuth's multiplicative hash, spreads consecutive
+# row positions uniformly over 32 bits
+_multiplier = 2654435761
+_modulus = 2**32
+
+
+def parse_sample(sample):
+    """Checks a row sample specification.
+
+    Parameters:
+
+        sample: int or float
+            int: number of leading rows of each table
+            float between 0 and 1: fraction of the rows
+            of each table, selected by row position, so that
+            repeated reads select the very same rows
+
+    Returns:
+
+        kind: str
+            'head' or 'fraction'
+
+        value: int or float
+    """
+    if isinstance(sample, numbers.Integral) and not isinstance(sample, bool):
+        if sample >= 0:
+            return "head", int(sample)
+
+    elif isinstance(sample, numbers.Real) and 0 < sample < 1:
+        return "fraction", float(sample)
+
+    msg = (
+        "Unsupported row sample {}. Pass a number of rows, "
+        "or a fraction of the rows between 0 and 1."
+    )
+    log.error(msg.format(sample))
+    raise ValueError(msg.format(sample))
+
+
+def keep_row(position, fraction):
+    """Whether a row at a position, counted from 0,
+    is part of a deterministic sample of a fraction
+    of the rows.
+
+    Parameters:
+
+        position: int
+
+        fraction: float
+
+    Returns:
+
+        bool
+    """
+    return (position * _multiplier) % _modulus < fraction * _modulus
+
+
+def keep_rows(n_rows, fraction):
+    """Vectorized `keep_row` for all positions of a table.
+
+    Parameters:
+
+        n_rows: int
+
+        fraction: float
+
+    Returns:
+
+        mask: numpy array of bool
+    """
+    positions = np.arange(n_rows, dtype=np.uint64)
+
+    return (positions * np.uint64(_multiplier)) % np.uint64(_modulus) < fraction * _modulus
+
+
+def sample_frame(df, sample):
+    """Samples the rows of a table already read in,
+    for readers that can not limit the rows they read.
+
+    Parameters:
+
+        df: pandas dataframe
+
+        sample: int or float
+            See `parse_sample`
+
+    Returns:
+
+        df: pandas dataframe
+    """
+    kind, value = parse_sample(sample)
+
+    if kind == "head":
+        return df.iloc[:value]
+
+    return df[keep_rows(len(df), value)]
+
+
+def sql_sample_query(table_name, sample):
+    """Creates a query reading a row sample of a sqlite
+    table. Fractions select rows by rowid, matching
+    `keep_row` for tables with consecutive rowids.
+
+    Parameters:
+
+        table_name: str
+
+        sample: int or float
+            See `parse_sample`
+
+    Returns:
+
+        query: str
+    """
+    kind, value = parse_sample(sample)
+    table = '"{}"'.format(table_name.replace('"', '""'))
+
+    if kind == "head":
+        return "SELECT * FROM {} LIMIT {}".format(table, value)
+
+    return "SELECT * FROM {} WHERE ((rowid - 1) * {}) % {} < {}".format(
+        table, _multiplier, _modulus, fraction_threshold(value)
+    )
+
+
+def fraction_threshold(fraction):
+    """Hash threshold below which rows are kept."""
+    return int(np.ceil(fraction * _modulus))
+
+
+def csv_sample_kwargs(sample):
+    """Keyword arguments of `pandas.read_csv`
+    that read only a row sample of a csv file.
+
+    Parameters:
+
+        sample: int or float
+            See `parse_sample`
+
+    Returns:
+
+        kwargs: dict
+    """
+    kind, value = parse_sample(sample)
+
+    if kind == "head":
+        return {"nrows": value}
+
+    # row 0 holds the column labels
+    return {"skiprows": lambda inx: inx > 0 and not keep_row(inx - 1, value)}
@@ -0,0 +1,376 @@
+import logging
+
+from adapter.comm.tools import clean_label, lazy_import
+from adapter.label_map import Labels
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class Schema(object):
+    """Declared column types, index columns and
+    required columns of the input tables, as read
+    from a `table_schema` table with columns:
+
+        - Table Name: name of the declared table
+        - Column: column label
+        - Dtype: pandas dtype, such as 'float64', 'int64',
+        'Int64', 'bool', 'str', 'category' or 'datetime64[ns]'.
+        Empty cells leave the inferred type.
+        - Index: 'Y' to set the column as (part of) the
+        table index, in the order of the rows
+        - Required: 'Y' if the column needs to be present
+        and may not contain any missing values
+
+    The readers parse the declared tables straight into
+    the declared types where possible. All values that can
+    not be converted, missing required columns and missing
+    required values are collected by `validate` and reported
+    at once by `check`.
+
+    Parameters:
+
+        schema_table: pandas dataframe
+            Table schema table
+    """
+
+    # number of offending values listed per column
+    max_reported_values = 5
+
+    def __init__(self, schema_table):
+        self.la = Labels().set_labels()
+
+        missing = [
+            self.la[col]
+            for col in ["tbl_nam", "column"]
+            if self.la[col] not in schema_table.columns
+        ]
+        if len(missing) > 0:
+            msg = "The {} table is missing columns {}."
+            log.error(msg.format(self.la["schema"], missing))
+            raise ValueError(msg.format(self.la["schema"], missing))
+
+        self.tables = dict()
+        errors = list()
+
+        for row in schema_table.to_dict(orient="records"):
+            table = row[self.la["tbl_nam"]]
+            col = row[self.la["column"]]
+
+            if pd.isna(table) or pd.isna(col):
+                continue
+
+            table = str(table).strip()
+            col = clean_label(str(col))
+
+            declared = self.tables.setdefault(
+                table, {"dtypes": dict(), "index": list(), "required": list()}
+            )
+
+            dtype = row.get(self.la["dtype"])
+            if not pd.isna(dtype) and str(dtype).strip() != "":
+                try:
+                    declared["dtypes"][col] = pd.api.types.pandas_dtype(
+                        str(dtype).strip()
+                    )
+                except TypeError:
+                    errors.append(
+                        "{}.{}: unsupported dtype '{}'".format(table, col, dtype)
+                    )
+
+            if self.is_flagged(row.get(self.la["index"])):
+                declared["index"].append(col)
+
+            if self.is_flagged(row.get(self.la["required"])):
+                declared["required"].append(col)
+
+        if len(errors) > 0:
+            msg = "Invalid {} table:\n    {}".format(
+                self.la["schema"], "\n    ".join(errors)
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+    @staticmethod
+    def is_flagged(value):
+        """True for 'Y' flags."""
+        return isinstance(value, str) and value.strip().upper() == "Y"
+
+    def get_dtypes(self, table, kind=None):
+        """Declared column types of a table.
+
+        Parameters:
+
+            table: str
+                Table name
+
+            kind: str
+                Default: None, all declared types
+                'datetime': only datetime columns
+                'other': all but datetime columns
+
+        Returns:
+
+            dtypes: dict
+                Column label: dtype
+        """
+        if table not in self.tables:
+            return dict()
+
+        dtypes = self.tables[table]["dtypes"]
+
+        if kind == "datetime":
+            return {
+                col: dtype
+                for col, dtype in dtypes.items()
+                if pd.api.types.is_datetime64_any_dtype(dtype)
+            }
+        elif kind == "other":
+            return {
+                col: dtype
+                for col, dtype in dtypes.items()
+                if not pd.api.types.is_datetime64_any_dtype(dtype)
+            }
+
+        return dict(dtypes)
+
+    @staticmethod
+    def convert(series, dtype):
+        """Converts a column to a declared type.
+
+        Parameters:
+
+            series: pandas series
+
+            dtype: pandas dtype
+
+        Returns:
+
+            converted: pandas series or None
+                None if any value can not be converted
+
+            invalid: pandas boolean series or None
+                Flags the values that can not be converted
+        """
+        if series.dtype == dtype and dtype.kind != "U":
+            return series, None
+
+        if pd.api.types.is_bool_dtype(dtype):
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                values = series
+            else:
+                # text flags
+                flags = {"TRUE": True, "FALSE": False, "Y": True, "N": False}
+                values = series.map(
+                    lambda x: flags.get(x.strip().upper(), x) if isinstance(x, str) else x
+                )
+
+            invalid = ~values.isin([True, False]) & series.notna()
+            if isinstance(dtype, np.dtype):
+                # no missing values in numpy bool columns
+                invalid |= series.isna()
+
+            if invalid.any():
+                return None, invalid
+
+            return values.astype(dtype), None
+
+        if pd.api.types.is_numeric_dtype(dtype):
+            values = pd.to_numeric(series, errors="coerce")
+            invalid = values.isna() & series.notna()
+
+            if pd.api.types.is_integer_dtype(dtype):
+                # fractional values
+                invalid |= values.notna() & (values != values.round())
+                if isinstance(dtype, np.dtype):
+                    # no missing values in numpy integer columns
+                    invalid |= series.isna()
+
+            if invalid.any():
+                return None, invalid
+
+            return values.astype(dtype), None
+
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            values = pd.to_datetime(series, errors="coerce")
+            invalid = values.isna() & series.notna()
+
+            if invalid.any():
+                return None, invalid
+
+            return values.astype(dtype), None
+
+        if isinstance(dtype, np.dtype) and dtype.kind == "U":
+            # 'str', kept as python strings
+            values = series.where(series.isna(), series.astype(str))
+            return values.astype(object), None
+
+        try:
+            return series.astype(dtype), None
+        except (TypeError, ValueError):
+            return None, pd.Series(True, index=series.index)
+
+    def cast(self, table, df):
+        """Converts the declared columns of a table
+        to the declared types. Columns holding any
+        values that can not be converted are left as
+        they are, to be reported by `validate`.
+
+        Parameters:
+
+            table: str
+                Table name
+
+            df: pandas dataframe
+
+        Returns:
+
+            df: pandas dataframe
+                Shallow copy with the converted columns,
+                or the passed table if nothing changed
+        """
+        dtypes = self.get_dtypes(table)
+
+        if len(dtypes) == 0 or not isinstance(df, pd.DataFrame):
+            return df
+
+        converted = dict()
+        for inx, col in enumerate(df.columns):
+            label = clean_label(str(col))
+
+            if label not in dtypes:
+                continue
+
+            series = df.iloc[:, inx]
+            values, invalid = self.convert(series, dtypes[label])
+
+            if invalid is None and values is not series:
+                converted[inx] = values
+
+        if len(converted) == 0:
+            return df
+
+        df = df.copy(deep=False)
+        for inx, values in converted.items():
+            df.isetitem(inx, values)
+
+        return df
+
+    def validate(self, dict_of_dfs, table_names=None):
+        """Validates the tables against the schema.
+
+        Parameters:
+
+            dict_of_dfs: dict of pandas dataframes
+                Loaded tables
+
+            table_names: list of str
+                Default: None, all declared tables
+                Declared tables to validate
+
+        Returns:
+
+            errors: list of str
+                One message per failed check
+        """
+        errors = list()
+
+        for table, declared in self.tables.items():
+            if (table_names is not None) and (table not in table_names):
+                continue
+
+            if table not in dict_of_dfs.keys():
+                if len(declared["required"]) > 0:
+                    errors.append(
+                        "{}: table with required columns {} not found".format(
+                            table, declared["required"]
+                        )
+                    )
+                continue
+
+            df = dict_of_dfs[table]
+            columns = {clean_label(str(col)): inx for inx, col in enumerate(df.columns)}
+
+            for col in declared["required"] + declared["index"]:
+                if col not in columns:
+                    errors.append("{}.{}: column not found".format(table, col))
+
+            for col in declared["required"]:
+                if col in columns:
+                    n_missing = int(df.iloc[:, columns[col]].isna().sum())
+                    if n_missing > 0:
+                        errors.append(
+                            "{}.{}: {} missing values in a required column".format(
+                                table, col, n_missing
+                            )
+                        )
+
+            for col, dtype in declared["dtypes"].items():
+                if col not in columns:
+                    continue
+
+                series = df.iloc[:, columns[col]]
+                _, invalid = self.convert(series, dtype)
+
+                if invalid is not None:
+                    values = series[invalid]
+                    errors.append(
+                        "{}.{}: {} values not convertible to {}, such as {}".format(
+                            table,
+                            col,
+                            len(values),
+                            dtype,
+                            list(values.iloc[: self.max_reported_values]),
+                        )
+                    )
+
+        return errors
+
+    def check(self, dict_of_dfs, table_names=None):
+        """Raises a ValueError listing all
+        failed checks of `validate`, if any.
+
+        Parameters:
+
+            dict_of_dfs: dict of pandas dataframes
+                Loaded tables
+
+            table_names: list of str
+                Default: None, all declared tables
+                Declared tables to validate
+        """
+        errors = self.validate(dict_of_dfs, table_names=table_names)
+
+        if len(errors) > 0:
+            msg = "Input tables do not match the {} table:\n    {}".format(
+                self.la["schema"], "\n    ".join(errors)
+            )
+            log.error(msg)
+            raise ValueError(msg)
+
+    def set_index(self, table, df):
+        """Sets the declared index columns of a table
+        as its index.
+
+        Parameters:
+
+            table: str
+                Table name
+
+            df: pandas dataframe
+
+        Returns:
+
+            df: pandas dataframe
+        """
+        if table not in self.tables or len(self.tables[table]["index"]) == 0:
+            return df
+
+        columns = {clean_label(str(col)): col for col in df.columns}
+
+        return df.set_index(
+            [columns[col] for col in self.tables[table]["index"]], drop=True
+        )
@@ -0,0 +1,333 @@
+import logging
+import os
+import pickle
+import struct
+import sys
+import uuid
+import weakref
+from collections.abc import Mapping
+from multiprocessing import resource_tracker, shared_memory
+
+from adapter.comm.tools import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+# length prefix of the pickled metadata
+_meta_header = struct.Struct("<Q")
+
+# names of the segments published by this process, or, in a
+# forked process, by its parent, which share one resource tracker
+_published = set()
+
+
+def _is_shareable(dtype):
+    """Fixed width numpy types that can be placed
+    in shared memory as a flat buffer."""
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+def _unlink_segments(segments, pid):
+    """Closes and removes shared memory segments. Only
+    the publishing process removes the segments, not
+    any forked worker processes."""
+    for shm in segments:
+        try:
+            shm.close()
+            if os.getpid() == pid:
+                shm.unlink()
+                _published.discard(shm.name)
+        except (FileNotFoundError, BufferError):
+            pass
+
+
+def _open_segment(name):
+    """Attaches to an existing shared memory segment without
+    leaving it with the resource tracker, that would otherwise
+    remove the segment once the attaching process exits. A
+    forked process shares the resource tracker of the publisher,
+    so the registration of its own segments is left in place."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, create=False, track=False)
+
+    shm = shared_memory.SharedMemory(name=name, create=False)
+    if shm.name not in _published:
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+    return shm
+
+
+class SharedTables(object):
+    """Publishes a dictionary of dataframes into shared
+    memory, so that other processes on the same machine
+    can attach to the tables by name without reading
+    the inputs again or holding copies of them, see
+    `attach`.
+
+    Each fixed width numeric, boolean and datetime column
+    is placed in its own shared memory segment, as are the
+    codes of categorical columns. All other columns, such as
+    strings, nullable and arrow backed columns, and the table
+    indexes are pickled into a metadata segment that carries
+    the published name, and get unpickled by each attaching
+    process.
+
+    The segments are removed once `close` is called,
+    the object gets garbage collected, or the
+    publishing process exits. Use as a context manager
+    to limit the publication to a block.
+
+    Parameters:
+
+        dict_of_dfs: dict of pandas dataframes
+            Tables to publish, such as the
+            'tables_as_dict_of_dfs' returned by `IO.load`
+
+        name: str
+            Default: None, a unique name gets generated
+            Name the tables are published under. Keep it
+            short, as some platforms limit shared memory
+            names to 30 characters.
+    """
+
+    def __init__(self, dict_of_dfs, name=None):
+        self.name = name if name is not None else "ad" + uuid.uuid4().hex[:10]
+        self.segments = list()
+        self.shared_bytes = 0
+        self.pickled_bytes = 0
+
+        self._finalizer = weakref.finalize(
+            self, _unlink_segments, self.segments, os.getpid()
+        )
+
+        try:
+            meta = {
+                table: self.publish_table(df) for table, df in dict_of_dfs.items()
+            }
+
+            payload = pickle.dumps(meta, protocol=5)
+            self.pickled_bytes = len(payload)
+
+            shm = self.create_segment(self.name, _meta_header.size + len(payload))
+            _meta_header.pack_into(shm.buf, 0, len(payload))
+            shm.buf[_meta_header.size : _meta_header.size + len(payload)] = payload
+
+        except Exception:
+            self.close()
+            raise
+
+        msg = (
+            "Published {} tables as {}: {} bytes of columns in {} "
+            "shared memory segments and {} bytes of pickled metadata."
+        )
+        log.info(
+            msg.format(
+                len(meta),
+                self.name,
+                self.shared_bytes,
+                len(self.segments) - 1,
+                self.pickled_bytes,
+            )
+        )
+
+    def create_segment(self, name, size):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        self.segments.append(shm)
+        _published.add(shm.name)
+
+        return shm
+
+    def publish_array(self, values):
+        """Copies a flat numpy array into a new segment.
+
+        Returns:
+
+            segment name, dtype string and length: tuple
+        """
+        values = np.ascontiguousarray(values)
+        name = "{}_{}".format(self.name, len(self.segments))
+
+        shm = self.create_segment(name, values.nbytes)
+        target = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)
+        target[...] = values
+        del target
+
+        self.shared_bytes += values.nbytes
+
+        return name, values.dtype.str, len(values)
+
+    def publish_table(self, df):
+        """Publishes the columns of a table.
+
+        Returns:
+
+            table metadata: dict
+        """
+        columns = list()
+
+        for inx in range(df.shape[1]):
+            series = df.iloc[:, inx]
+
+            if _is_shareable(series.dtype):
+                columns.append(("array",) + self.publish_array(series.to_numpy()))
+
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                columns.append(
+                    ("categorical",)
+                    + self.publish_array(series.cat.codes.to_numpy())
+                    + (series.dtype,)
+                )
+
+            else:
+                columns.append(("pickle", series.array))
+
+        return {"columns": list(df.columns), "index": df.index, "data": columns}
+
+    def close(self):
+        """Removes all segments of the published tables.
+        Processes attached to the tables keep their
+        mappings until they close them."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<SharedTables {}, {} segments>".format(self.name, len(self.segments))
+
+
+class AttachedTables(Mapping):
+    """Read-only dataframes attached to tables published in
+    shared memory by another process, see `SharedTables`.
+    Columns placed in shared memory are not copied. Any
+    attempt to modify them in place raises a ValueError,
+    while copies of the tables can be modified as usual.
+
+    The shared memory stays mapped until `close` is called.
+    Keep this object for as long as the tables are in use,
+    and do not use the tables after closing it.
+
+    Parameters:
+
+        name: str
+            Name the tables were published under
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.segments = dict()
+
+        meta_shm = _open_segment(name)
+        try:
+            (length,) = _meta_header.unpack_from(meta_shm.buf, 0)
+            meta = pickle.loads(
+                meta_shm.buf[_meta_header.size : _meta_header.size + length]
+            )
+        finally:
+            meta_shm.close()
+
+        self.tables = {table: self.attach_table(spec) for table, spec in meta.items()}
+
+        log.info("Attached to {} shared tables {}.".format(len(self.tables), name))
+
+    def attach_array(self, name, dtype, length):
+        shm = _open_segment(name)
+        self.segments[name] = shm
+
+        values = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)
+        values.flags.writeable = False
+
+        return values
+
+    def attach_table(self, spec):
+        data = dict()
+
+        for inx, column in enumerate(spec["data"]):
+            if column[0] == "array":
+                data[inx] = self.attach_array(*column[1:])
+
+            elif column[0] == "categorical":
+                codes = self.attach_array(*column[1:4])
+                data[inx] = pd.Categorical.from_codes(codes, dtype=column[4])
+
+            else:
+                data[inx] = column[1]
+
+        df = pd.DataFrame(data, index=spec["index"], copy=False)
+        df.columns = spec["columns"]
+
+        return df
+
+    def __getitem__(self, key):
+        return self.tables[key]
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def close(self):
+        """Drops the tables and unmaps the shared memory."""
+        self.tables = dict()
+
+        for shm in self.segments.values():
+            try:
+                shm.close()
+            except BufferError:
+                # tables still referenced elsewhere,
+                # the memory stays mapped until they are gone
+                pass
+
+        self.segments = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<AttachedTables {}, {} tables>".format(self.name, len(self))
+
+
+def publish(dict_of_dfs, name=None):
+    """Publishes tables into shared memory.
+    See `SharedTables`.
+
+    Parameters:
+
+        dict_of_dfs: dict of pandas dataframes
+
+        name: str
+            Default: None, a unique name gets generated
+
+    Returns:
+
+        shared: SharedTables
+            Pass shared.name to worker processes
+    """
+    return SharedTables(dict_of_dfs, name=name)
+
+
+def attach(name):
+    """Attaches to tables published into shared memory.
+    See `AttachedTables`.
+
+    Parameters:
+
+        name: str
+            Name the tables were published under
+
+    Returns:
+
+        tables: AttachedTables
+            Mapping of table name to read-only dataframe
+    """
+    return AttachedTables(name)
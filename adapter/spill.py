@@ -0,0 +1,309 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from adapter.comm.tools import lazy_import
+
+pd = lazy_import("pandas")
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class SpillingDict(MutableMapping):
+    """Dictionary of dataframes that keeps the memory used by
+    the dataframes it holds under a budget. Once the budget is
+    exceeded, the least recently used dataframes get written to
+    a local scratch folder and dropped from memory. Accessing a
+    spilled dataframe transparently reads it back in.
+
+    Dataframes are stored as parquet files if pyarrow is
+    available and the dataframe reads back from parquet with
+    the same types, otherwise as pickle files.
+
+    Note that any dataframe still referenced elsewhere stays
+    in memory after it got spilled, and that changes made in place
+    to a dataframe after it got spilled are not stored. Assign
+    modified dataframes back to the dictionary.
+
+    Parameters:
+
+        memory_budget: int
+            Number of bytes of dataframe memory that can be
+            held in memory. The most recently used dataframe
+            is always kept in memory, even if it exceeds
+            the budget alone.
+
+        spill_dir: str
+            Default: None, a temporary folder gets created
+            and removed once the dictionary is garbage
+            collected or `close` is called
+            Scratch folder to spill the dataframes to
+
+        data: dict
+            Default: None
+            Initial dictionary of dataframes
+    """
+
+    def __init__(self, memory_budget, spill_dir=None, data=None):
+        self.memory_budget = memory_budget
+
+        if spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="adapter_spill_")
+            self._finalizer = weakref.finalize(
+                self, shutil.rmtree, self.spill_dir, ignore_errors=True
+            )
+        else:
+            self.spill_dir = spill_dir
+            if not os.path.exists(self.spill_dir):
+                os.makedirs(self.spill_dir)
+            self._finalizer = None
+
+        # all keys, in insertion order
+        self.keys_order = OrderedDict()
+        # dataframes held in memory, least recently used first
+        self.resident = OrderedDict()
+        self.sizes = dict()
+        # shapes as inserted, known without reloading
+        self.shapes = dict()
+        # spilled table name: (file path, format)
+        self.spilled = dict()
+        self.spill_count = 0
+
+        self.metrics = {
+            "spills": 0,
+            "reloads": 0,
+            "bytes_spilled": 0,
+            "bytes_reloaded": 0,
+        }
+
+        self.lock = threading.RLock()
+
+        if data is not None:
+            self.update(data)
+
+    @staticmethod
+    def get_size(df):
+        """Memory used by a dataframe in bytes."""
+        if isinstance(df, pd.DataFrame):
+            return int(df.memory_usage(index=True, deep=True).sum())
+        return 0
+
+    @property
+    def memory_usage(self):
+        """Memory used by the dataframes held in memory in bytes."""
+        with self.lock:
+            return sum(self.sizes[key] for key in self.resident.keys())
+
+    def __getitem__(self, key):
+        with self.lock:
+            if key in self.resident:
+                self.resident.move_to_end(key)
+                return self.resident[key]
+
+            if key not in self.spilled:
+                raise KeyError(key)
+
+            df = self.reload(key)
+            self.enforce_budget(keep=key)
+
+            return df
+
+    def __setitem__(self, key, df):
+        with self.lock:
+            self.remove_spilled(key)
+
+            self.keys_order[key] = None
+            self.resident[key] = df
+            self.resident.move_to_end(key)
+            self.sizes[key] = self.get_size(df)
+            self.shapes[key] = getattr(df, "shape", None)
+
+            self.enforce_budget(keep=key)
+
+    def __delitem__(self, key):
+        with self.lock:
+            if key not in self.keys_order:
+                raise KeyError(key)
+
+            self.remove_spilled(key)
+            self.resident.pop(key, None)
+            self.sizes.pop(key, None)
+            self.shapes.pop(key, None)
+            del self.keys_order[key]
+
+    def __iter__(self):
+        return iter(list(self.keys_order.keys()))
+
+    def __len__(self):
+        return len(self.keys_order)
+
+    def __contains__(self, key):
+        return key in self.keys_order
+
+    def __repr__(self):
+        return "<SpillingDict of {} tables, {} spilled>".format(
+            len(self), len(self.spilled)
+        )
+
+    def enforce_budget(self, keep=None):
+        """Spills the least recently used dataframes until
+        the memory in use is within the budget.
+
+        Parameters:
+
+            keep: str
+                Key of a dataframe never to spill
+        """
+        usage = self.memory_usage
+
+        for key in list(self.resident.keys()):
+            if usage <= self.memory_budget:
+                break
+
+            if key == keep:
+                continue
+
+            usage -= self.sizes[key]
+            self.spill(key)
+
+    def spill(self, key):
+        """Writes a dataframe to the scratch folder
+        and drops it from memory.
+
+        Parameters:
+
+            key: str
+                Table name
+        """
+        df = self.resident.pop(key)
+        self.spill_count += 1
+        file_path = os.path.join(self.spill_dir, "table_{}".format(self.spill_count))
+
+        file_format = None
+
+        if isinstance(df, pd.DataFrame):
+            try:
+                df.to_parquet(file_path + ".parquet")
+
+                if self.round_trips(df, file_path + ".parquet"):
+                    file_format = "parquet"
+                else:
+                    os.remove(file_path + ".parquet")
+            except Exception:
+                # pyarrow not installed, or columns
+                # that can not be stored in parquet
+                if os.path.exists(file_path + ".parquet"):
+                    os.remove(file_path + ".parquet")
+
+        if file_format is None:
+            pd.to_pickle(df, file_path + ".pkl", protocol=5)
+            file_format = "pkl"
+
+        self.spilled[key] = (file_path + "." + file_format, file_format)
+
+        self.metrics["spills"] += 1
+        self.metrics["bytes_spilled"] += self.sizes[key]
+
+        msg = "Spilled table {} ({} bytes) to {}."
+        log.debug(msg.format(key, self.sizes[key], self.spilled[key][0]))
+
+    @staticmethod
+    def round_trips(df, file_path):
+        """Whether a dataframe written to a parquet file gets read
+        back with the same column and index types. Object columns
+        of python ints or of mixed scalars, for example, would not.
+        Only the file schema gets read.
+
+        Parameters:
+
+            df: pandas dataframe
+
+            file_path: str
+                Parquet file path
+
+        Returns:
+
+            bool
+        """
+        import pyarrow.parquet
+
+        empty = pyarrow.parquet.read_schema(file_path).empty_table().to_pandas()
+
+        return (
+            list(empty.columns) == list(df.columns)
+            and list(empty.dtypes) == list(df.dtypes)
+            and list(empty.index.names) == list(df.index.names)
+            and all(
+                empty.index.get_level_values(inx).dtype
+                == df.index.get_level_values(inx).dtype
+                for inx in range(df.index.nlevels)
+            )
+        )
+
+    def reload(self, key):
+        """Reads a spilled dataframe back in.
+
+        Parameters:
+
+            key: str
+                Table name
+
+        Returns:
+
+            df: pandas dataframe
+        """
+        file_path, file_format = self.spilled.pop(key)
+
+        if file_format == "parquet":
+            df = pd.read_parquet(file_path)
+        else:
+            df = pd.read_pickle(file_path)
+
+        os.remove(file_path)
+
+        self.resident[key] = df
+        self.resident.move_to_end(key)
+
+        self.metrics["reloads"] += 1
+        self.metrics["bytes_reloaded"] += self.sizes[key]
+
+        return df
+
+    def remove_spilled(self, key):
+        if key in self.spilled:
+            file_path, _ = self.spilled.pop(key)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def get_metrics(self):
+        """Returns the spill statistics.
+
+        Returns:
+
+            dict with keys 'spills', 'reloads', 'bytes_spilled',
+            'bytes_reloaded', 'resident_tables', 'spilled_tables'
+            and 'memory_usage'
+        """
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics["resident_tables"] = len(self.resident)
+            metrics["spilled_tables"] = len(self.spilled)
+            metrics["memory_usage"] = self.memory_usage
+
+        return metrics
+
+    def close(self):
+        """Drops all tables and removes the scratch folder,
+        if it was created by this dictionary."""
+        with self.lock:
+            for key in list(self.keys_order.keys()):
+                del self[key]
+
+            if self._finalizer is not None:
+                self._finalizer()
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+log.setLevel(logging.DEBUG)
+
+
+class LoadStats(object):
+    """Collects timing, memory and size statistics
+    of the stages of loading input data.
+
+    Each stage record holds:
+
+        'kind' - 'stage'
+        'stage' - stage name, e.g. 'get_tables', 'create_db'
+        'table' - table name, if the stage processed a single table
+        'file_path' - input file path, if the stage read a file
+        'wall_time' - elapsed time in seconds
+        'cpu_time' - cpu time of the thread running the stage in seconds
+        'peak_memory' - tracemalloc peak of the stage in bytes,
+            None if memory tracing is off. As tracemalloc is
+            process wide, stages running concurrently in other
+            threads contribute to each others' peaks.
+
+    Each table record holds:
+
+        'kind' - 'table'
+        'table' - table name
+        'rows' - number of rows
+        'columns' - number of columns
+        'memory' - dataframe memory usage in bytes, including
+            the contents of object columns
+
+    Parameters:
+
+        enabled: bool
+            Default: True
+            False makes all methods no-ops
+
+        hook: callable
+            Default: None
+            Called with each record as soon as
+            it is created. It may get called from
+            multiple threads.
+
+        trace_memory: bool
+            Default: True
+            Trace memory peaks of each stage with tracemalloc.
+            Tracing slows python allocations down.
+    """
+
+    def __init__(self, enabled=True, hook=None, trace_memory=True):
+        self.enabled = enabled
+        self.hook = hook
+        self.trace_memory = trace_memory
+
+        self.stages = list()
+        self.tables = list()
+
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started_tracing = False
+        self.active_stages = 0
+
+    def start_tracing(self):
+        """Starts memory tracing when the first of
+        possibly concurrent stages starts."""
+        with self.lock:
+            self.active_stages += 1
+
+            if (
+                self.active_stages == 1
+                and self.trace_memory
+                and not tracemalloc.is_tracing()
+            ):
+                tracemalloc.start()
+                self.started_tracing = True
+
+    def stop_tracing(self):
+        """Stops memory tracing when the last of
+        possibly concurrent stages ends, if it
+        was started by `start_tracing`."""
+        with self.lock:
+            self.active_stages -= 1
+
+            if self.active_stages == 0 and self.started_tracing:
+                tracemalloc.stop()
+                self.started_tracing = False
+
+    @contextmanager
+    def stage(self, stage, table=None, file_path=None):
+        """Context manager measuring a single stage.
+
+        Parameters:
+
+            stage: str
+                Stage name
+
+            table: str
+                Table name, if the stage processes a single table
+
+            file_path: str
+                Input file path, if the stage reads a file
+        """
+        if not self.enabled:
+            yield
+            return
+
+        # nested stages of the same thread, used to
+        # carry the memory peaks up to enclosing stages
+        if not hasattr(self.local, "stack"):
+            self.local.stack = list()
+
+        self.start_tracing()
+        tracing = tracemalloc.is_tracing()
+
+        record = {
+            "kind": "stage",
+            "stage": stage,
+            "table": table,
+            "file_path": file_path,
+            "wall_time": None,
+            "cpu_time": None,
+            "peak_memory": None,
+        }
+
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self.local.stack) > 0 and self.local.stack[-1] is not None:
+                self.local.stack[-1]["peak"] = max(self.local.stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame = {"start": current, "peak": current}
+        else:
+            frame = None
+
+        self.local.stack.append(frame)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+
+        try:
+            yield
+        finally:
+            record["wall_time"] = time.perf_counter() - wall_start
+            record["cpu_time"] = time.thread_time() - cpu_start
+
+            self.local.stack.pop()
+
+            if tracing and tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(frame["peak"], peak)
+                record["peak_memory"] = peak - frame["start"]
+
+                if len(self.local.stack) > 0 and self.local.stack[-1] is not None:
+                    self.local.stack[-1]["peak"] = max(self.local.stack[-1]["peak"], peak)
+
+            self.stop_tracing()
+            self.emit(record, self.stages)
+
+    def table(self, name, df=None, shape=None, memory=None):
+        """Records the size of a table.
+
+        Parameters:
+
+            name: str
+                Table name
+
+            df: pandas dataframe
+                Default: None
+                Table
+
+            shape: tuple
+                Default: None, the shape of df
+                Number of rows and columns, for tables
+                not held in memory
+
+            memory: int
+                Default: None, the memory used by df
+                Bytes
+        """
+        if not self.enabled:
+            return
+
+        if shape is None:
+            shape = df.shape
+        if memory is None:
+            memory = int(df.memory_usage(index=True, deep=True).sum())
+
+        record = {
+            "kind": "table",
+            "table": name,
+            "rows": shape[0],
+            "columns": shape[1],
+            "memory": memory,
+        }
+
+        self.emit(record, self.tables)
+
+    def emit(self, record, records):
+        with self.lock:
+            records.append(record)
+
+        if self.hook is not None:
+            self.hook(record)
+
+    def as_dict(self):
+        """Returns the collected statistics.
+
+        Returns:
+
+            dict with keys:
+
+                'stages' - list of stage records
+                'tables' - list of table records
+                'totals' - dict of total wall time and cpu
+                    time per stage name
+        """
+        totals = dict()
+        for record in self.stages:
+            total = totals.setdefault(
+                record["stage"], {"wall_time": 0.0, "cpu_time": 0.0, "count": 0}
+            )
+            total["wall_time"] += record["wall_time"]
+            total["cpu_time"] += record["cpu_time"]
+            total["count"] += 1
+
+        return {
+            "stages": list(self.stages),
+            "tables": list(self.tables),
+            "totals": totals,
+        }
@@ -0,0 +1,119 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+from adapter.cas import ContentStore, restore, table_digest
+from adapter.i_o import IO
+
+
+class ContentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.test_dir, "store")
+        self.outpath = os.path.join(self.test_dir, "output")
+        os.makedirs(self.outpath)
+
+        self.path = os.path.join(self.test_dir, "inputs.db")
+        con = sqlite3.connect(self.path)
+        pd.DataFrame({"Output Path": [self.outpath], "Version": ["vStore"]}).to_sql(
+            "run_parameters", con, index=False
+        )
+        pd.DataFrame({"x": [1.0, 2.0, 3.0]}).to_sql("values", con, index=False)
+        con.close()
+
+    def tearDown(self):
+        for root, dirs, files in os.walk(self.test_dir):
+            for name in files:
+                os.chmod(os.path.join(root, name), 0o644)
+        shutil.rmtree(self.test_dir)
+
+    def test_runs_share_unchanged_inputs(self):
+        """Tests that runs with identical inputs link
+        the same stored input copy and database."""
+        runs = [
+            IO(self.path).load(store_dir=self.store_dir, unique_run_tag=True)
+            for _ in range(2)
+        ]
+
+        self.assertNotEqual(runs[0]["outpath"], runs[1]["outpath"])
+        self.assertEqual(
+            os.stat(runs[0]["db_path"]).st_ino, os.stat(runs[1]["db_path"]).st_ino
+        )
+
+        for res in runs:
+            self.assertEqual(
+                sorted(os.listdir(res["outpath"])),
+                sorted(
+                    [
+                        "content_store.json",
+                        res["run_tag"] + ".db",
+                        "inputs_" + res["run_tag"] + ".db",
+                    ]
+                ),
+            )
+
+        objects = [
+            name
+            for _, _, files in os.walk(os.path.join(self.store_dir, "objects"))
+            for name in files
+        ]
+        self.assertEqual(len(objects), 2)
+
+        # writing to a run database leaves the store unchanged
+        IO(None).write(
+            type="db",
+            data_connection=runs[0],
+            data_as_dict_of_dfs={"results": pd.DataFrame({"y": [1]})},
+        )
+        self.assertNotEqual(
+            os.stat(runs[0]["db_path"]).st_ino, os.stat(runs[1]["db_path"]).st_ino
+        )
+
+        con = sqlite3.connect(runs[1]["db_path"])
+        tables = pd.read_sql_query("SELECT name FROM sqlite_master", con)["name"]
+        con.close()
+        self.assertFalse("results" in list(tables))
+
+        # a changed input gets stored
+        con = sqlite3.connect(self.path)
+        pd.DataFrame({"x": [4.0]}).to_sql("values", con, index=False, if_exists="append")
+        con.close()
+
+        res = IO(self.path).load(store_dir=self.store_dir, unique_run_tag=True)
+        self.assertNotEqual(
+            os.stat(res["db_path"]).st_ino, os.stat(runs[1]["db_path"]).st_ino
+        )
+
+    def test_restore(self):
+        """Tests restoring a run folder to independent files."""
+        res = IO(self.path).load(store_dir=self.store_dir)
+
+        db_name = os.path.basename(res["db_path"])
+        os.remove(res["db_path"])
+
+        dest_dir = os.path.join(self.test_dir, "restored")
+        restored = restore(res["outpath"], dest_dir)
+
+        self.assertTrue(db_name in restored)
+        self.assertEqual(os.stat(os.path.join(dest_dir, db_name)).st_nlink, 1)
+
+        con = sqlite3.connect(os.path.join(dest_dir, db_name))
+        self.assertEqual(len(pd.read_sql_query('SELECT * FROM "values"', con)), 3)
+        con.close()
+
+        store = ContentStore(self.store_dir)
+        self.assertTrue(os.access(os.path.join(dest_dir, db_name), os.W_OK))
+        self.assertEqual(len(store.read_index()), 1)
+
+    def test_table_digest_covers_index(self):
+        """Tests that tables differing only in their index differ."""
+        df = pd.DataFrame({"x": [1.0, 2.0]}, index=pd.Index([1, 2], name="key"))
+
+        self.assertEqual(table_digest(df), table_digest(df.copy()))
+        self.assertNotEqual(table_digest(df), table_digest(df.set_axis([1, 3])))
+        self.assertNotEqual(table_digest(df), table_digest(df.rename_axis("other")))
+        self.assertNotEqual(table_digest(df), table_digest(df.reset_index(drop=True)))
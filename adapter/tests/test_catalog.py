@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.catalog import catalog_csv, read_excel_object
+from adapter.i_o import IO
+
+
+class CatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_catalog_matches_load(self):
+        """Tests that the catalog lists the tables
+        that get loaded, with their sizes."""
+        path = "adapter/tests/inputs_from_files_vTest.csv"
+
+        catalog = IO(path).catalog()
+        tables = IO(path).load(skip_writeout=True)["tables_as_dict_of_dfs"]
+
+        self.assertEqual(
+            set(catalog["table_name"]) - set(tables.keys()), {"table2"}
+        )
+        self.assertTrue(
+            catalog.set_index("table_name").loc["table2", "query_only"]
+        )
+
+        for row in catalog.itertuples():
+            if row.table_name not in tables.keys():
+                continue
+
+            df = tables[row.table_name]
+            self.assertEqual(row.n_rows, len(df), row.table_name)
+
+            if row.columns is not None and row.object_type != "named_range":
+                self.assertEqual(list(row.columns), list(df.columns), row.table_name)
+
+    def test_catalog_csv_estimate(self):
+        """Tests the row estimate of a csv file larger than the sample."""
+        path = os.path.join(self.test_dir, "large.csv")
+        pd.DataFrame(
+            {"x": np.arange(10000, 30000), "y": np.full(20000, 0.5)}
+        ).to_csv(path, index=False)
+
+        entry = catalog_csv(path, "large")[0]
+        self.assertFalse(entry["rows_exact"])
+        self.assertEqual(entry["columns"], ["x", "y"])
+        self.assertLess(abs(entry["n_rows"] - 20000), 100)
+
+        entry = catalog_csv(path, "large", sample_size=2**24)[0]
+        self.assertTrue(entry["rows_exact"])
+        self.assertEqual(entry["n_rows"], 20000)
+
+    def test_read_excel_object(self):
+        """Tests reading a single table of a workbook."""
+        df = read_excel_object("adapter/tests/test.xlsx", "xlsx_table1")
+        self.assertEqual(list(df.columns), ["col_1", "col_2", "col_3"])
+        self.assertEqual(len(df), 3)
+
+        self.assertIsNone(read_excel_object("adapter/tests/test.xlsx", "no_table"))
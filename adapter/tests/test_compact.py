@@ -0,0 +1,94 @@
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.compact import compact_dtypes, downcast_numeric
+from adapter.i_o import IO
+
+
+class CompactTests(unittest.TestCase):
+    def setUp(self):
+        self.dfs = {
+            "a": pd.DataFrame(
+                {
+                    "region": ["west", "east", "west", "east"] * 50,
+                    "id": ["id{}".format(i) for i in range(200)],
+                    "count": np.arange(200, dtype="int64"),
+                    "share": np.full(200, 0.5),
+                    "value": np.linspace(0.1, 1.7, 200),
+                }
+            ),
+            "b": pd.DataFrame({"region": ["north", "west"] * 100}),
+        }
+
+    def test_compact_dtypes(self):
+        """Tests categorical conversion with shared
+        categories and lossless downcasting."""
+        original = {name: df.copy() for name, df in self.dfs.items()}
+
+        report = compact_dtypes(self.dfs)
+
+        a = self.dfs["a"]
+        b = self.dfs["b"]
+
+        self.assertEqual(a["region"].dtype, "category")
+        self.assertEqual(a["region"].dtype, b["region"].dtype)
+        self.assertEqual(
+            list(a["region"].dtype.categories), ["east", "north", "west"]
+        )
+        # high cardinality labels stay strings
+        self.assertEqual(a["id"].dtype, object)
+        self.assertEqual(a["count"].dtype, np.int16)
+        self.assertEqual(a["share"].dtype, np.float32)
+        # not exactly representable as float32
+        self.assertEqual(a["value"].dtype, np.float64)
+
+        for name, df in original.items():
+            pd.testing.assert_frame_equal(
+                self.dfs[name], df, check_dtype=False, check_categorical=False
+            )
+            self.assertGreater(report[name]["bytes_saved"], 0)
+            self.assertEqual(
+                report[name]["bytes_saved"],
+                report[name]["bytes_before"] - report[name]["bytes_after"],
+            )
+
+        self.assertEqual(report["a"]["columns"]["count"], ("int64", "int16"))
+
+    def test_downcast_numeric(self):
+        """Tests that values outside of the smaller
+        type ranges prevent a downcast."""
+        series = pd.Series([0, 2**40])
+        self.assertEqual(downcast_numeric(series).dtype, np.int64)
+
+        series = pd.Series([1.0, np.nan, 1e300])
+        self.assertEqual(downcast_numeric(series).dtype, np.float64)
+
+        series = pd.Series([1.0, np.nan, 0.25])
+        self.assertEqual(downcast_numeric(series).dtype, np.float32)
+
+    def test_load_compact(self):
+        """Tests the compaction of loaded tables."""
+        path = os.path.join(os.getcwd(), r"adapter/tests/inputs_from_files_vTest.csv")
+
+        res = IO(path).load(skip_writeout=True)
+        compact_res = IO(path).load(skip_writeout=True, compact=True)
+
+        self.assertFalse("compaction_report" in res.keys())
+
+        report = compact_res["compaction_report"]
+        self.assertEqual(
+            set(report.keys()), set(compact_res["tables_as_dict_of_dfs"].keys())
+        )
+
+        for name, df in res["tables_as_dict_of_dfs"].items():
+            compacted = compact_res["tables_as_dict_of_dfs"][name]
+            self.assertEqual(
+                report[name]["bytes_after"],
+                compacted.memory_usage(index=True, deep=True).sum(),
+            )
+            pd.testing.assert_frame_equal(
+                compacted, df, check_dtype=False, check_categorical=False
+            )
@@ -0,0 +1,92 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.consolidated import ConsolidatedDb
+from adapter.i_o import IO
+
+
+class ConsolidatedDbTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, "runs.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_write_tables(self):
+        """Tests that unchanged tables are referenced and
+        that the views list the rows of each run."""
+        db = ConsolidatedDb(self.db_path)
+
+        prices = pd.DataFrame(
+            {
+                "region": ["west", None],
+                "price": [1.0, np.nan],
+                "n": [1, 2],
+                "when": pd.to_datetime(["2020-01-01", None]),
+            }
+        )
+        rates = pd.DataFrame({"rate": [0.1]})
+
+        self.assertEqual(
+            db.write_tables("run_1", {"prices": prices, "rates": rates}),
+            {"prices": True, "rates": True},
+        )
+        self.assertEqual(
+            db.write_tables("run_2", {"prices": prices, "rates": rates.assign(rate=0.2)}),
+            {"prices": False, "rates": True},
+        )
+        # new columns in later runs
+        db.write_tables("run_3", {"rates": rates.assign(source="survey")})
+
+        con = sqlite3.connect(self.db_path)
+        self.assertEqual(con.execute('SELECT count(*) FROM "prices__rows"').fetchone()[0], 2)
+        con.close()
+
+        res = db.read_table("prices")
+        self.assertEqual(list(res["run_tag"]), ["run_1", "run_1", "run_2", "run_2"])
+        self.assertEqual(list(res.columns), ["run_tag", "region", "price", "n", "when"])
+        self.assertTrue(res["price"].isna().iloc[1])
+
+        res = db.read_table("rates", run_tags=["run_2", "run_3"])
+        self.assertEqual(list(res["rate"]), [0.2, 0.1])
+        self.assertEqual(list(res["source"].fillna("")), ["", "survey"])
+
+        # rewriting a run replaces its table versions
+        db.write_tables("run_2", {"rates": rates.assign(rate=0.3)})
+        self.assertEqual(list(db.read_table("rates", ["run_2"])["rate"]), [0.3])
+
+        with self.assertRaises(ValueError):
+            db.write_tables("run_4", {"runs": rates})
+        with self.assertRaises(ValueError):
+            db.write_tables("run_4", {"other": rates.assign(run_tag="x")})
+
+        # failed runs leave no trace
+        self.assertFalse("run_4" in list(db.get_runs()["run_tag"]))
+
+    def test_load_and_write(self):
+        """Tests adding runs and their outputs via load and write."""
+        path = os.path.join(os.getcwd(), r"adapter/tests/inputs_from_files_vTest.csv")
+
+        res = IO(path).load(create_db=False, save_input=False, consolidated_db=self.db_path)
+        IO(path).write(
+            type="consolidated",
+            data_connection=res,
+            data_as_dict_of_dfs={"results": pd.DataFrame({"y": [1, 2]})},
+        )
+
+        db = ConsolidatedDb(self.db_path)
+        runs = db.get_runs()
+        self.assertEqual(list(runs["run_tag"]), [res["run_tag"]])
+        self.assertTrue("v123" in runs["run_parameters"].iloc[0])
+
+        self.assertEqual(list(db.read_table("results")["y"]), [1, 2])
+        self.assertEqual(
+            len(db.read_table("table1")), len(res["tables_as_dict_of_dfs"]["table1"])
+        )
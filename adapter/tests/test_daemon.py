@@ -0,0 +1,152 @@
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.daemon import LoaderClient, LoaderServer, decode_tables, encode_tables
+from adapter.i_o import IO
+
+
+class LoaderDaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.test_dir, "adapter.sock")
+
+        self.table_path = os.path.join(self.test_dir, "prices.csv")
+        pd.DataFrame({"region": ["west", "east"], "price": [1.0, 2.0]}).to_csv(
+            self.table_path, index=False
+        )
+
+        self.path = os.path.join(self.test_dir, "inputs_from_files_vDaemon.csv")
+        pd.DataFrame(
+            {
+                "File Path": [
+                    self.table_path,
+                    os.path.join(os.getcwd(), "adapter/tests/test.db"),
+                ],
+                "Table Name": [None, None],
+                "Query Only": [None, None],
+            }
+        ).to_csv(self.path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_encode_decode(self):
+        """Tests a round trip through the wire format."""
+        dfs = {
+            "mixed": pd.DataFrame(
+                {
+                    "x": np.arange(5, dtype=float),
+                    "n": np.arange(5),
+                    "when": pd.date_range("2020-01-01", periods=5),
+                    "label": pd.Categorical(list("abcab")),
+                    "text": ["a", None, "c", "d", "e"],
+                    "count": pd.array([1, None, 3, 4, 5], dtype="Int64"),
+                },
+                index=pd.Index(list("vwxyz"), name="key"),
+            ),
+            "empty": pd.DataFrame({"x": np.array([], dtype=float)}),
+        }
+
+        header, buffers = encode_tables(dfs)
+        buffers = (bytearray(memoryview(buffer).cast("B")) for buffer in buffers)
+        decoded = decode_tables(header, buffers)
+
+        for name, df in dfs.items():
+            pd.testing.assert_frame_equal(decoded[name], df)
+
+    def test_serve_and_reload(self):
+        """Tests serving tables and reloading
+        once an input file changes."""
+        expected = IO(self.path).load(skip_writeout=True)["tables_as_dict_of_dfs"]
+
+        with LoaderServer(self.path, self.socket_path, poll_interval=0.05):
+            with LoaderClient(self.socket_path, timeout=10) as client:
+                res = client.load()
+
+                self.assertEqual(res["generation"], 1)
+                self.assertEqual(
+                    set(res["tables_as_dict_of_dfs"].keys()), set(expected.keys())
+                )
+                for name, df in expected.items():
+                    pd.testing.assert_frame_equal(res["tables_as_dict_of_dfs"][name], df)
+
+                self.assertEqual(client.tables(), list(expected.keys()))
+                self.assertIn(os.path.abspath(self.table_path), client.status()["files"])
+
+                prices = client.load(tables=["prices"])["tables_as_dict_of_dfs"]
+                self.assertEqual(list(prices.keys()), ["prices"])
+
+                with self.assertRaises(ValueError):
+                    client.load(tables=["no_such_table"])
+
+                pd.DataFrame({"region": ["west"], "price": [3.0]}).to_csv(
+                    self.table_path, index=False
+                )
+
+                start = time.time()
+                while client.status()["generation"] == 1 and time.time() - start < 10:
+                    time.sleep(0.05)
+
+                res = client.load(tables=["prices"])
+                self.assertEqual(res["generation"], 2)
+                self.assertEqual(
+                    list(res["tables_as_dict_of_dfs"]["prices"]["price"]), [3.0]
+                )
+
+                self.assertEqual(client.reload(), 3)
+
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_reload_on_new_files(self):
+        """Tests reloading once a file gets added
+        to a directory of input files."""
+        folder = os.path.join(self.test_dir, "regions")
+        os.mkdir(folder)
+        pd.DataFrame({"x": [1]}).to_csv(os.path.join(folder, "west.csv"), index=False)
+        pd.DataFrame(
+            {"File Path": [folder], "Table Name": [None], "Query Only": [None]}
+        ).to_csv(self.path, index=False)
+
+        with LoaderServer(self.path, self.socket_path, poll_interval=0.05):
+            with LoaderClient(self.socket_path, timeout=10) as client:
+                self.assertEqual(sorted(client.tables()), ["inputs_from_files", "west"])
+                self.assertEqual(client.status()["file_sets"], [folder])
+
+                pd.DataFrame({"x": [2]}).to_csv(
+                    os.path.join(folder, "east.csv"), index=False
+                )
+
+                start = time.time()
+                while client.status()["generation"] == 1 and time.time() - start < 10:
+                    time.sleep(0.05)
+
+                self.assertEqual(client.status()["generation"], 2)
+                self.assertEqual(
+                    sorted(client.tables()), ["east", "inputs_from_files", "west"]
+                )
+
+    def test_socket_in_use(self):
+        """Tests that a running daemon keeps its socket,
+        while a stale socket gets replaced."""
+        with LoaderServer(self.path, self.socket_path, poll_interval=0.05):
+            with self.assertRaises(ValueError):
+                LoaderServer(self.path, self.socket_path).start()
+
+            with LoaderClient(self.socket_path, timeout=10) as client:
+                self.assertEqual(client.status()["generation"], 1)
+
+        # left behind by a daemon that did not shut down
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+
+        with LoaderServer(self.path, self.socket_path, poll_interval=0.05):
+            with LoaderClient(self.socket_path, timeout=10) as client:
+                self.assertEqual(client.status()["generation"], 1)
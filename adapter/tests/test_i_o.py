@@ -1,13 +1,20 @@
+import gc
 import gzip
 import logging
 import os
 import pickle
 import shutil
+import sqlite3
+import tempfile
 import unittest
+import weakref
 
+import numpy as np
 import pandas as pd
 
+from adapter.catalog import get_sqlite_table_names
 from adapter.i_o import IO, to_pickle, from_pickle
+from adapter.manifest import Manifest
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -101,6 +108,446 @@ class IOTests(unittest.TestCase):
         self.assertEqual(len(res["tables_as_dict_of_dfs"].keys()), 11)
         self.assertEqual(len(res.keys()), 5)
 
+    def test_load_from_folder_and_glob(self):
+        """Tests loading all files found in a folder
+        or matched by a glob pattern listed in
+        the `inputs_from_files` table.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        folder = os.path.join(tmp_dir, "regions")
+        os.makedirs(folder)
+
+        for region in ["north", "south", "west"]:
+            shutil.copy(
+                os.path.join(os.getcwd(), r"adapter/tests/test.csv"),
+                os.path.join(folder, region + ".csv"),
+            )
+
+        # one table per file
+        path = os.path.join(tmp_dir, "inputs_from_files_vFolder.csv")
+        pd.DataFrame(
+            {"File Path": [folder], "Table Name": [None], "Query Only": [None]}
+        ).to_csv(path, index=False)
+
+        res = IO(path).load(skip_writeout=True, max_workers=2)
+
+        self.assertTrue(
+            {"north", "south", "west"}.issubset(res["tables_as_dict_of_dfs"].keys())
+        )
+
+        # all files stacked into one table
+        pd.DataFrame(
+            {
+                "File Path": [os.path.join(folder, "*.csv")],
+                "Table Name": [None],
+                "Query Only": [None],
+                "Concatenate": ["Y"],
+            }
+        ).to_csv(path, index=False)
+
+        res = IO(path).load(skip_writeout=True)
+
+        single = pd.read_csv(os.path.join(folder, "north.csv"))
+        self.assertFalse("north" in res["tables_as_dict_of_dfs"].keys())
+        self.assertEqual(
+            len(res["tables_as_dict_of_dfs"]["regions"]), 3 * len(single)
+        )
+
+        # failures are reported together
+        shutil.copy(
+            os.path.join(os.getcwd(), r"adapter/tests/corrupt.db"),
+            os.path.join(folder, "broken_1.db"),
+        )
+        shutil.copy(
+            os.path.join(os.getcwd(), r"adapter/tests/corrupt.db"),
+            os.path.join(folder, "broken_2.db"),
+        )
+
+        with self.assertRaises(ValueError) as err:
+            IO(path).get_tables(folder)
+
+        self.assertTrue("broken_1.db" in str(err.exception))
+        self.assertTrue("broken_2.db" in str(err.exception))
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_selected_tables(self):
+        """Tests loading only the requested tables
+        and skipping files that hold none of them.
+        """
+        path = os.path.join(os.getcwd(), r"adapter/tests/inputs_from_files_vTest.csv")
+
+        res = IO(path).load(skip_writeout=True, tables=["table*", "xlsx_table1", "test"])
+
+        self.assertEqual(
+            set(res["tables_as_dict_of_dfs"].keys()),
+            {"inputs_from_files", "run_parameters", "table1", "table3", "xlsx_table1", "test"},
+        )
+
+        # unreadable files that can not hold the table are not read
+        tmp_dir = tempfile.mkdtemp()
+        folder = os.path.join(tmp_dir, "regions")
+        os.makedirs(folder)
+        shutil.copy(
+            os.path.join(os.getcwd(), r"adapter/tests/test.csv"),
+            os.path.join(folder, "north.csv"),
+        )
+        with open(os.path.join(folder, "south.csv"), "wb") as f:
+            f.write(b"\xff\xfe\x00\x81")
+
+        path = os.path.join(tmp_dir, "inputs_from_files_vSelect.csv")
+        pd.DataFrame(
+            {"File Path": [folder], "Table Name": [None], "Query Only": [None]}
+        ).to_csv(path, index=False)
+
+        with self.assertRaises(ValueError):
+            IO(path).load(skip_writeout=True)
+
+        res = IO(path).load(skip_writeout=True, tables=["north"])
+        self.assertEqual(
+            set(res["tables_as_dict_of_dfs"].keys()), {"inputs_from_files", "north"}
+        )
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_pipelined(self):
+        """Tests that the tables listed in the
+        `inputs_from_files` table of a main input db get
+        merged in order while the main input is read.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "main.db")
+
+        con = sqlite3.connect(path)
+        pd.DataFrame(
+            {
+                "File Path": [
+                    os.path.join(os.getcwd(), r"adapter/tests/test.xlsx"),
+                    os.path.join(os.getcwd(), r"adapter/tests/test.csv"),
+                ],
+                "Table Name": ["xlsx_table2, xlsx_table1", None],
+                "Query Only": [None, None],
+            }
+        ).to_sql("inputs_from_files", con, index=False)
+        pd.DataFrame({"x": [1, 2]}).to_sql("main_table", con, index=False)
+        con.close()
+
+        i_o = IO(path)
+        self.assertEqual(list(i_o.read_pointer_tables(path).keys()), ["inputs_from_files"])
+
+        res = i_o.load(skip_writeout=True)
+
+        keys = list(res["tables_as_dict_of_dfs"].keys())
+        self.assertEqual(set(keys[:2]), {"inputs_from_files", "main_table"})
+        self.assertEqual(set(keys[2:4]), {"xlsx_table1", "xlsx_table2"})
+        self.assertEqual(keys[4], "test")
+
+        # same-named tables in the main input and a listed file
+        con = sqlite3.connect(path)
+        pd.DataFrame({"x": [1]}).to_sql("test", con, index=False)
+        con.close()
+
+        with self.assertRaises(ValueError):
+            IO(path).load(skip_writeout=True)
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_pipelined_frees_spilled_tables(self):
+        """Tests that tables of listed files get freed once
+        spilled while the load is still running."""
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "main.db")
+
+        csv_paths = list()
+        for inx in range(4):
+            csv_paths.append(os.path.join(tmp_dir, "large{}.csv".format(inx)))
+            pd.DataFrame({"x": np.arange(10000) * inx}).to_csv(csv_paths[-1], index=False)
+
+        con = sqlite3.connect(path)
+        pd.DataFrame(
+            {
+                "File Path": csv_paths,
+                "Table Name": [None] * 4,
+                "Query Only": [None] * 4,
+            }
+        ).to_sql("inputs_from_files", con, index=False)
+        con.close()
+
+        i_o = IO(path)
+
+        refs = dict()
+        get_tables = i_o.get_tables
+
+        def tracked(*args, **kwargs):
+            tables = get_tables(*args, **kwargs)
+            for name, df in tables.items():
+                refs[name] = weakref.ref(df)
+            return tables
+
+        alive = list()
+        process_column_labels = i_o.process_column_labels
+
+        def check(labels):
+            # the last calls clean the labels of the merged tables
+            gc.collect()
+            alive.append(
+                [
+                    name
+                    for name, ref in refs.items()
+                    if name.startswith("large") and ref() is not None
+                ]
+            )
+            return process_column_labels(labels)
+
+        i_o.get_tables = tracked
+        i_o.process_column_labels = check
+
+        res = i_o.load(skip_writeout=True, memory_budget=1, spill_dir=tmp_dir)
+
+        self.assertGreater(res["tables_as_dict_of_dfs"].get_metrics()["spills"], 0)
+        self.assertLessEqual(len(alive[-1]), 1)
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_pipelined_validates_main_tables(self):
+        """Tests that the schema covers the tables of the main
+        input file once the listed files got merged in."""
+        path = os.path.join(
+            os.getcwd(), r"adapter/tests/test_w_inputs_from_files_table.xlsx"
+        )
+        schema = pd.DataFrame(
+            {
+                "Table Name": ["xlsx_table15"],
+                "Column": ["no_such_column"],
+                "Required": ["Y"],
+            }
+        )
+
+        with self.assertRaises(ValueError) as err:
+            IO(path).load(skip_writeout=True, schema=schema)
+        self.assertTrue("no_such_column" in str(err.exception))
+
+        with self.assertRaises(ValueError):
+            IO(path).load(skip_writeout=True, schema=schema, tables=["xlsx_table15"])
+
+    def test_incremental_load(self):
+        """Tests that repeated loads only read in
+        the input files that changed since.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        cache_dir = os.path.join(tmp_dir, "cache")
+        csv_path = os.path.join(tmp_dir, "regional.csv")
+        shutil.copy(os.path.join(os.getcwd(), r"adapter/tests/test.csv"), csv_path)
+
+        path = os.path.join(tmp_dir, "inputs_from_files_vIncremental.csv")
+        pd.DataFrame(
+            {
+                "File Path": [
+                    os.path.join(os.getcwd(), r"adapter/tests/test.db"),
+                    os.path.join(os.getcwd(), r"adapter/tests/test.xlsx"),
+                    csv_path,
+                ],
+                "Table Name": [None, None, None],
+                "Query Only": [None, None, None],
+            }
+        ).to_csv(path, index=False)
+
+        full = IO(path).load(skip_writeout=True)["tables_as_dict_of_dfs"]
+
+        i_o = IO(path, cache_dir=cache_dir)
+        i_o.load(skip_writeout=True)
+        self.assertEqual(i_o.manifest.hits, 0)
+
+        res = i_o.load(skip_writeout=True)["tables_as_dict_of_dfs"]
+        self.assertEqual(i_o.manifest.hits, 4)
+        self.assertEqual(res.keys(), full.keys())
+        for key in full.keys():
+            pd.testing.assert_frame_equal(res[key], full[key])
+
+        # change one of the files
+        pd.DataFrame({"csv_col_1": [5]}).to_csv(csv_path, index=False)
+        res = i_o.load(skip_writeout=True)["tables_as_dict_of_dfs"]
+        self.assertEqual(i_o.manifest.hits, 7)
+        self.assertEqual(res["regional"]["csv_col_1"].tolist(), [5])
+
+        # a new instance reuses the tables stored on disk
+        i_o = IO(path, cache_dir=cache_dir)
+        i_o.load(skip_writeout=True)
+        self.assertEqual(i_o.manifest.hits, 4)
+
+        # a file changing while it gets read is not recorded
+        manifest = Manifest()
+        state = manifest.file_state(csv_path)
+        pd.DataFrame({"csv_col_1": [5, 6]}).to_csv(csv_path, index=False)
+        manifest.put(csv_path, {"regional": pd.DataFrame({"csv_col_1": [5]})}, state=state)
+        self.assertIsNone(manifest.get(csv_path))
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_many(self):
+        """Tests loading many scenarios that share input files."""
+        tmp_dir = tempfile.mkdtemp()
+        outpath = os.path.join(tmp_dir, "output")
+        os.makedirs(outpath)
+
+        shared_paths = [
+            os.path.join(os.getcwd(), r"adapter/tests/test.db"),
+            os.path.join(os.getcwd(), r"adapter/tests/test.csv"),
+        ]
+
+        paths = list()
+        for i in range(3):
+            run_parameters_path = os.path.join(tmp_dir, "run_parameters_{}.csv".format(i))
+            pd.DataFrame({"Output Path": [outpath], "Version": ["sweep"]}).to_csv(
+                run_parameters_path, index=False
+            )
+
+            paths.append(os.path.join(tmp_dir, "inputs_from_files_vS{}.csv".format(i)))
+            pd.DataFrame(
+                {
+                    "File Path": shared_paths + [run_parameters_path],
+                    "Table Name": [None] * 3,
+                    "Query Only": [None] * 3,
+                }
+            ).to_csv(paths[-1], index=False)
+
+        results = IO.load_many(paths, save_input=False, close_db=False)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len({res["run_tag"] for res in results}), 3)
+        self.assertEqual(len({res["outpath"] for res in results}), 3)
+
+        for path, res in zip(paths, results):
+            self.assertTrue(os.path.exists(res["db_path"]))
+            self.assertEqual(
+                len(get_sqlite_table_names(res["db_conn"])),
+                len(res["tables_as_dict_of_dfs"]),
+            )
+            res["db_conn"].close()
+
+            expected = IO(path).load(skip_writeout=True)["tables_as_dict_of_dfs"]
+            self.assertEqual(
+                set(res["tables_as_dict_of_dfs"].keys()), set(expected.keys())
+            )
+            for name, df in expected.items():
+                pd.testing.assert_frame_equal(res["tables_as_dict_of_dfs"][name], df)
+
+        # shared files are parsed once and their tables share data
+        for name in ["test", "table1"]:
+            first = results[0]["tables_as_dict_of_dfs"][name]
+            last = results[2]["tables_as_dict_of_dfs"][name]
+            for inx in range(first.shape[1]):
+                self.assertTrue(
+                    np.shares_memory(
+                        first.iloc[:, inx].to_numpy(), last.iloc[:, inx].to_numpy()
+                    )
+                )
+
+        for res in results:
+            self.assertTrue(res["outpath"].startswith(outpath))
+
+        results = IO.load_many(paths, skip_writeout=True)
+        self.assertEqual(len({res["run_tag"] for res in results}), 3)
+
+        with self.assertRaises(ValueError):
+            IO.load_many(paths + [os.path.join(tmp_dir, "missing.csv")], skip_writeout=True)
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_recursive_inputs_from_files(self):
+        """Tests following nested inputs_from_files tables,
+        with a file shared between branches read in once
+        and circular references raising an error.
+        """
+        tmp_dir = tempfile.mkdtemp()
+
+        def pointer_table(name, file_paths):
+            pd.DataFrame(
+                {
+                    "File Path": file_paths,
+                    "Table Name": [None] * len(file_paths),
+                    "Query Only": [None] * len(file_paths),
+                }
+            ).to_csv(os.path.join(tmp_dir, name), index=False)
+
+        for name in ["shared.csv", "b_only.csv"]:
+            shutil.copy(
+                os.path.join(os.getcwd(), r"adapter/tests/test.csv"),
+                os.path.join(tmp_dir, name),
+            )
+
+        # relative paths get resolved from the pointing file's folder
+        pointer_table("inputs_from_files_vMain.csv", ["inputs_from_files_vA.csv", "inputs_from_files_vB.csv"])
+        pointer_table("inputs_from_files_vA.csv", ["shared.csv"])
+        pointer_table("inputs_from_files_vB.csv", ["shared.csv", "b_only.csv"])
+
+        path = os.path.join(tmp_dir, "inputs_from_files_vMain.csv")
+
+        res = IO(path).load(skip_writeout=True, recursive=True)
+
+        self.assertEqual(
+            set(res["tables_as_dict_of_dfs"].keys()),
+            {"inputs_from_files", "shared", "b_only"},
+        )
+
+        # circular reference
+        pointer_table("inputs_from_files_vA.csv", ["shared.csv", "inputs_from_files_vMain.csv"])
+
+        with self.assertRaises(ValueError) as err:
+            IO(path).load(skip_writeout=True, recursive=True)
+
+        self.assertTrue("Circular" in str(err.exception))
+
+        # circular reference between sibling branches
+        pointer_table("inputs_from_files_vA.csv", ["inputs_from_files_vB.csv"])
+        pointer_table("inputs_from_files_vB.csv", ["b_only.csv", "inputs_from_files_vA.csv"])
+
+        with self.assertRaises(ValueError) as err:
+            IO(path).load(skip_writeout=True, recursive=True)
+
+        self.assertTrue("Circular" in str(err.exception))
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
+    def test_load_stats(self):
+        """Tests the collection of loading stage
+        and table statistics.
+        """
+        path = os.path.join(os.getcwd(), r"adapter/tests/inputs_from_files_vTest.csv")
+
+        records = list()
+        res = IO(path).load(skip_writeout=True, stats_hook=records.append)
+
+        stats = res["load_stats"]
+        self.assertEqual(len(records), len(stats["stages"]) + len(stats["tables"]))
+
+        stages = {record["stage"] for record in stats["stages"]}
+        self.assertTrue(
+            {"get_tables", "open_workbook", "convert", "astype", "read_sql",
+             "read_csv", "process_column_labels"}.issubset(stages)
+        )
+        for record in stats["stages"]:
+            self.assertGreaterEqual(record["wall_time"], 0.0)
+            self.assertIsNotNone(record["peak_memory"])
+
+        self.assertEqual(
+            {record["table"] for record in stats["tables"]},
+            set(res["tables_as_dict_of_dfs"].keys()),
+        )
+        for record in stats["tables"]:
+            df = res["tables_as_dict_of_dfs"][record["table"]]
+            self.assertEqual((record["rows"], record["columns"]), df.shape)
+
+        res = IO(path).load(skip_writeout=True)
+        self.assertFalse("load_stats" in res.keys())
+
     def test_load_from_excel_no_run_parameters(self):
         """Tests loading from an excel table without
         defined version and output path parameters.
@@ -179,6 +626,14 @@ class IOTests(unittest.TestCase):
         for x in case2.keys():
             assert case2[x].equals(case2_check[x])
 
+        # Case3: In place, without copying the tables
+        case3 = i_o.first_col_to_index(dict_of_dfs, table_names=["df1"], copy=False)
+
+        self.assertIs(case3, dict_of_dfs)
+        self.assertIs(case3["df2"], df2)
+        for x in case3.keys():
+            assert case3[x].equals(case2_check[x])
+
     def test_process_column_labels(self):
         """Tests if undesired whitespace from column labels is removed."""
         path = os.path.join(os.getcwd(), r"adapter/tests/test_labels.xlsx")
@@ -256,6 +711,52 @@ class IOTests(unittest.TestCase):
         # tear down files
         shutil.rmtree(data_conn["outpath"])
 
+    def test_write_to_compressed_csv(self):
+        """Tests writing gzip compressed csv files in
+        chunks, with the index suppressed for one table
+        """
+        tmp_dir = tempfile.mkdtemp()
+        new = {"df1": pd.DataFrame({"a": range(1000)}), "df2": pd.DataFrame(["a", "b"])}
+
+        i_o = IO(None)
+        i_o.write(
+            type="csv",
+            data_as_dict_of_dfs=new,
+            outpath=tmp_dir,
+            run_tag="test",
+            compression="gzip",
+            chunksize=100,
+            index={"df1": False},
+            max_workers=2,
+        )
+
+        self.assertEqual(
+            sorted(os.listdir(tmp_dir)), ["df1_test.csv.gz", "df2_test.csv.gz"]
+        )
+
+        df1 = pd.read_csv(os.path.join(tmp_dir, "df1_test.csv.gz"))
+        self.assertTrue(df1.equals(new["df1"]))
+
+        df2 = pd.read_csv(os.path.join(tmp_dir, "df2_test.csv.gz"))
+        self.assertEqual(list(df2.columns), ["Unnamed: 0", "0"])
+
+        with self.assertRaises(ValueError):
+            i_o.write(type="csv", data_as_dict_of_dfs=new, outpath=tmp_dir, compression="rar")
+
+        # failures of single files get reported together
+        def fail(df, csv_path, **kwargs):
+            raise OSError("disk full")
+
+        i_o.write_csv = fail
+        with self.assertRaises(ValueError) as err:
+            i_o.write(type="csv", data_as_dict_of_dfs=new, outpath=tmp_dir, run_tag="failed")
+
+        self.assertTrue("Failed to write 2 of 2 csv files" in str(err.exception))
+        self.assertTrue("df1_failed.csv - OSError: disk full" in str(err.exception))
+
+        # tear down
+        shutil.rmtree(tmp_dir)
+
     def test_write_to_csv_and_db(self):
         """Tests main write method for both csv and db"""
         path = os.path.join(os.getcwd(), r"adapter/tests/inputs_from_files_vTest.csv")
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import unittest
+
+# modules that should only get imported once
+# a reader or writer that needs them is used
+HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "sqlalchemy", "tkinter", "pdb"]
+
+
+class ImportTests(unittest.TestCase):
+    def run_in_fresh_interpreter(self, code):
+        """Runs code in a new python process, so that
+        modules imported by other tests do not interfere.
+        """
+        res = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return res.stdout.split()
+
+    def test_import_is_lazy(self):
+        """Tests that importing the adapter modules
+        does not import any of the heavy backends.
+        """
+        code = (
+            "import sys\n"
+            "import adapter.i_o, adapter.comm.sql, adapter.comm.tools\n"
+            "print(' '.join(m for m in {} if m in sys.modules))\n"
+        ).format(HEAVY_MODULES)
+
+        self.assertEqual(self.run_in_fresh_interpreter(code), [])
+
+    def test_backend_imported_on_first_use(self):
+        """Tests that a backend gets imported once used."""
+        code = (
+            "import sys\n"
+            "from adapter.i_o import IO\n"
+            "IO('adapter/tests/test.db').get_tables('adapter/tests/test.csv')\n"
+            "print('pandas' in sys.modules, 'openpyxl' in sys.modules)\n"
+        )
+
+        self.assertEqual(self.run_in_fresh_interpreter(code), ["True", "False"])
+
+
+if __name__ == "__main__":
+    unittest.main()
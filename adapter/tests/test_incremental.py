@@ -0,0 +1,285 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+from adapter.i_o import IO
+from adapter.incremental import fingerprint_table, write_table
+
+
+class IncrementalWriteTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.con = sqlite3.connect(os.path.join(self.test_dir, "run.db"))
+
+    def tearDown(self):
+        self.con.close()
+        shutil.rmtree(self.test_dir)
+
+    def read(self, table_name):
+        return pd.read_sql_query(
+            'SELECT * FROM "{}" ORDER BY rowid'.format(table_name), self.con
+        )
+
+    def read_ordered(self, table_name):
+        return pd.read_sql_query('SELECT * FROM "{}"'.format(table_name), self.con)
+
+    def test_write_table(self):
+        """Tests that only what changed gets written."""
+        df = pd.DataFrame({"id": [1, 2, 3], "x": [1.0, 2.0, None]})
+
+        self.assertEqual(write_table(self.con, "t", df, keys=["id"]), "replaced")
+        self.assertEqual(write_table(self.con, "t", df.copy(), keys=["id"]), "skipped")
+
+        longer = pd.concat([df, pd.DataFrame({"id": [4], "x": [4.0]})], ignore_index=True)
+        self.assertEqual(write_table(self.con, "t", longer), "appended")
+        self.assertEqual(list(self.read("t")["id"]), [1, 2, 3, 4])
+
+        # row 2 changed, row 3 removed, row 5 added
+        changed = pd.DataFrame({"id": [1, 2, 4, 5], "x": [1.0, 20.0, 4.0, 5.0]})
+        rowids = dict(self.con.execute('SELECT id, rowid FROM "t"').fetchall())
+
+        self.assertEqual(write_table(self.con, "t", changed, keys=["id"]), "upserted")
+        self.assertEqual(
+            self.read("t").sort_values("id").reset_index(drop=True).to_dict("list"),
+            changed.to_dict("list"),
+        )
+        # unchanged rows were left in place
+        self.assertEqual(
+            self.con.execute('SELECT rowid FROM "t" WHERE id = 1').fetchone()[0],
+            rowids[1],
+        )
+
+        # no keys, or keys that do not identify the rows
+        self.assertEqual(write_table(self.con, "t", changed.iloc[::-1]), "replaced")
+        duplicated = pd.DataFrame({"id": [1, 1], "x": [1.0, 2.0]})
+        self.assertEqual(write_table(self.con, "t", duplicated, keys=["id"]), "replaced")
+        self.assertEqual(len(self.read("t")), 2)
+
+        with self.assertRaises(ValueError):
+            write_table(self.con, "t", df, keys=["missing"])
+
+    def table_sql(self, name, con=None):
+        con = self.con if con is None else con
+        return con.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (name,)
+        ).fetchone()[0]
+
+    def test_strict_tables(self):
+        """Tests typed STRICT tables with a primary key and indexes."""
+        df = pd.DataFrame(
+            {
+                "id": [2, 1],
+                "x": [0.5, None],
+                "label": ["a", None],
+                "when": pd.to_datetime(["2020-01-01", "2021-01-01"]),
+                "mixed": ["a", 1],
+            }
+        )
+
+        write_table(self.con, "t", df, keys=["id"], strict=True, indexes=True)
+        sql = self.table_sql("t")
+        for part in [
+            '"id" INTEGER',
+            '"x" REAL',
+            '"label" TEXT',
+            '"when" TEXT',
+            '"mixed" ANY',
+            'PRIMARY KEY ("id")',
+            "WITHOUT ROWID",
+            "STRICT",
+        ]:
+            self.assertTrue(part in sql, part)
+
+        # rows in the order of the primary key, no index on it
+        self.assertEqual(list(self.read_ordered("t")["id"]), [1, 2])
+        self.assertEqual(
+            self.con.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = 't'"
+            ).fetchone()[0],
+            0,
+        )
+
+        # no key, indexed on the first column
+        write_table(self.con, "u", df, strict=True, indexes=True)
+        self.assertFalse("WITHOUT ROWID" in self.table_sql("u"))
+        self.assertTrue('("id")' in self.table_sql("u__id"))
+
+        write_table(self.con, "v", df, indexes=[["label", "x"]])
+        self.assertTrue('("label", "x")' in self.table_sql("v__label_x"))
+
+    def test_strict_durations(self):
+        """Tests that durations are stored as integer
+        nanoseconds in STRICT tables."""
+        df = pd.DataFrame({"id": [1, 2], "took": pd.to_timedelta(["1s", None])})
+
+        self.assertEqual(write_table(self.con, "t", df, strict=True), "replaced")
+        self.assertTrue('"took" INTEGER' in self.table_sql("t"))
+        self.assertEqual(
+            self.con.execute('SELECT took FROM "t" ORDER BY id').fetchall(),
+            [(10**9,), (None,)],
+        )
+
+        longer = pd.concat([df, df.assign(id=[3, 4])], ignore_index=True)
+        self.assertEqual(write_table(self.con, "t", longer, strict=True), "appended")
+        self.assertEqual(len(self.read("t")), 4)
+
+    def test_switch_to_strict(self):
+        """Tests that tables written in another layout get replaced."""
+        df = pd.DataFrame({"id": [1, 2], "x": [0.5, 1.5]})
+
+        self.assertEqual(write_table(self.con, "t", df), "replaced")
+        self.assertEqual(
+            write_table(self.con, "t", df, keys=["id"], strict=True, indexes=True),
+            "replaced",
+        )
+        sql = self.table_sql("t")
+        self.assertTrue("STRICT" in sql)
+        self.assertTrue('PRIMARY KEY ("id")' in sql)
+
+        # the same layout again
+        self.assertEqual(
+            write_table(self.con, "t", df, keys=["id"], strict=True, indexes=True),
+            "skipped",
+        )
+
+        # grown table, indexed on the first column
+        longer = pd.DataFrame({"id": [1, 2, 3], "x": [0.5, 1.5, 2.5]})
+        self.assertEqual(write_table(self.con, "t", longer, indexes=True), "replaced")
+        self.assertFalse("STRICT" in self.table_sql("t"))
+        self.assertTrue('("id")' in self.table_sql("t__id"))
+
+    def test_table_without_columns(self):
+        """Tests that a table without columns gets skipped
+        and drops the table written before."""
+        df = pd.DataFrame({"id": [1, 2]})
+
+        self.assertEqual(write_table(self.con, "t", df), "replaced")
+        for strict in [False, True]:
+            self.assertEqual(
+                write_table(self.con, "t", pd.DataFrame(index=range(2)), strict=strict),
+                "skipped",
+            )
+            self.assertEqual(
+                self.con.execute(
+                    "SELECT count(*) FROM sqlite_master WHERE name = 't'"
+                ).fetchone()[0],
+                0,
+            )
+
+        self.assertEqual(write_table(self.con, "t", df), "replaced")
+
+    def test_load_strict_db(self):
+        """Tests the declared index columns as primary key."""
+        outpath = os.path.join(self.test_dir, "output")
+        os.makedirs(outpath)
+
+        path = os.path.join(self.test_dir, "inputs.db")
+        con = sqlite3.connect(path)
+        pd.DataFrame({"Output Path": [outpath], "Version": ["vStrict"]}).to_sql(
+            "run_parameters", con, index=False
+        )
+        pd.DataFrame({"Year": [2021, 2020], "Amount": [1.0, 2.0]}).to_sql(
+            "sales", con, index=False
+        )
+        pd.DataFrame(
+            {
+                "Table Name": ["sales", "sales"],
+                "Column": ["Year", "Amount"],
+                "Dtype": ["int64", "float64"],
+                "Index": ["Y", None],
+            }
+        ).to_sql("table_schema", con, index=False)
+        con.close()
+
+        res = IO(path).load(save_input=False, strict_db=True)
+
+        con = sqlite3.connect(res["db_path"])
+        sql = self.table_sql("sales", con)
+        sales = pd.read_sql_query("SELECT * FROM sales", con)
+        con.close()
+
+        self.assertTrue('PRIMARY KEY ("Year")' in sql)
+        self.assertTrue("STRICT" in sql)
+        self.assertEqual(list(sales["Year"]), [2020, 2021])
+
+    def test_write_reuses_connection(self):
+        """Tests repeated writes of results through one connection."""
+        outpath = os.path.join(self.test_dir, "output")
+        os.makedirs(outpath)
+
+        path = os.path.join(self.test_dir, "inputs.db")
+        con = sqlite3.connect(path)
+        pd.DataFrame({"Output Path": [outpath], "Version": ["vIncr"]}).to_sql(
+            "run_parameters", con, index=False
+        )
+        pd.DataFrame({"x": [1.0, 2.0]}).to_sql("values", con, index=False)
+        con.close()
+
+        i_o = IO(path)
+        res = i_o.load(save_input=False, close_db=False)
+        db_conn = res["db_conn"]
+
+        results = {"results": pd.DataFrame({"i": [0], "y": [0.5]})}
+        i_o.write(type="db", data_connection=res, data_as_dict_of_dfs=results, close_db=False)
+        self.assertTrue(res["db_conn"] is db_conn)
+
+        results["results"] = pd.DataFrame({"i": [0, 1], "y": [0.5, 0.25]})
+        i_o.write(
+            type="db",
+            data_connection=res,
+            data_as_dict_of_dfs=results,
+            keys={"results": ["i"]},
+        )
+
+        con = sqlite3.connect(res["db_path"])
+        fingerprints = pd.read_sql_query("SELECT * FROM " + fingerprint_table, con)
+        self.assertEqual(len(pd.read_sql_query("SELECT * FROM results", con)), 2)
+        con.close()
+
+        self.assertEqual(
+            sorted(fingerprints["table_name"]),
+            sorted(list(res["tables_as_dict_of_dfs"].keys()) + ["results"]),
+        )
+
+        # the fingerprints are not read in as an input table
+        res = IO(res["db_path"]).load(skip_writeout=True)
+        self.assertFalse(fingerprint_table in res["tables_as_dict_of_dfs"])
+
+    def test_scratch_assembly(self):
+        """Tests assembling the run database in memory
+        and in a scratch folder."""
+        outpath = os.path.join(self.test_dir, "output")
+        os.makedirs(outpath)
+        scratch = os.path.join(self.test_dir, "scratch")
+
+        path = os.path.join(self.test_dir, "inputs.db")
+        con = sqlite3.connect(path)
+        pd.DataFrame({"Output Path": [outpath], "Version": ["vScratch"]}).to_sql(
+            "run_parameters", con, index=False
+        )
+        pd.DataFrame({"x": [1.0, 2.0]}).to_sql("values", con, index=False)
+        con.close()
+
+        i_o = IO(path)
+        res = i_o.load(save_input=False, db_scratch="memory")
+
+        results = {"results": pd.DataFrame({"y": [1, 2, 3]})}
+        i_o.write(
+            type="db", data_connection=res, data_as_dict_of_dfs=results, db_scratch=scratch
+        )
+
+        # only the database, no leftovers
+        self.assertEqual(os.listdir(res["outpath"]), [os.path.basename(res["db_path"])])
+        self.assertEqual(os.listdir(scratch), [])
+
+        con = sqlite3.connect(res["db_path"])
+        self.assertEqual(
+            pd.read_sql_query('SELECT * FROM "values"', con)["x"].tolist(), [1.0, 2.0]
+        )
+        self.assertEqual(len(pd.read_sql_query("SELECT * FROM results", con)), 3)
+        con.close()
+
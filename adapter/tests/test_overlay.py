@@ -0,0 +1,108 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.i_o import IO
+from adapter.overlay import upsert_rows
+
+
+class OverlayTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+        self.base = {
+            "prices": pd.DataFrame(
+                {
+                    "region": ["west", "east", "north"],
+                    "year": [2020, 2020, 2020],
+                    "price": [1.0, 2.0, 3.0],
+                    "units": [10, 20, 30],
+                }
+            ),
+            "rates": pd.DataFrame({"rate": [0.1, 0.2]}),
+            "other": pd.DataFrame({"x": [1, 2, 3]}),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_upsert_rows(self):
+        """Tests updating and adding rows by keys."""
+        base = self.base["prices"]
+        delta = pd.DataFrame(
+            {"region": ["east", "south"], "year": [2020, 2020], "price": [5.0, 6.0]}
+        )
+
+        res = upsert_rows(base, delta, ["region", "year"])
+
+        self.assertEqual(list(res["region"]), ["west", "east", "north", "south"])
+        self.assertEqual(list(res["price"]), [1.0, 5.0, 3.0, 6.0])
+        self.assertTrue(np.isnan(res["units"].iloc[3]))
+        self.assertEqual(list(res.index), [0, 1, 2, 3])
+        # the base table is unchanged
+        self.assertEqual(list(base["price"]), [1.0, 2.0, 3.0])
+
+        # keys in the index
+        res = upsert_rows(base.set_index("region"), delta.drop(columns="year"), ["region"])
+        self.assertEqual(list(res.index), ["west", "east", "north", "south"])
+        self.assertEqual(res.loc["east", "price"], 5.0)
+
+        with self.assertRaises(ValueError):
+            upsert_rows(base, delta.assign(other=1), ["region"])
+
+        with self.assertRaises(ValueError):
+            upsert_rows(base, pd.concat([delta, delta]), ["region"])
+
+    def test_overlay_shares_unchanged_data(self):
+        """Tests that overlaid tables share all
+        unchanged data with the base tables."""
+        delta = {
+            "prices": pd.DataFrame({"region": ["east"], "price": [9.0]}),
+            "rates": pd.DataFrame({"rate": [0.5]}),
+        }
+
+        res = IO(None).overlay(self.base, delta, keys={"prices": ["region"]})
+
+        self.assertIs(res["other"], self.base["other"])
+        self.assertEqual(list(res["rates"]["rate"]), [0.5])
+        self.assertEqual(list(res["prices"]["price"]), [1.0, 9.0, 3.0])
+
+        for col in ["region", "year", "units"]:
+            self.assertTrue(
+                np.shares_memory(
+                    res["prices"][col].to_numpy(), self.base["prices"][col].to_numpy()
+                )
+            )
+        self.assertFalse(
+            np.shares_memory(
+                res["prices"]["price"].to_numpy(), self.base["prices"]["price"].to_numpy()
+            )
+        )
+        self.assertEqual(list(self.base["prices"]["price"]), [1.0, 2.0, 3.0])
+
+    def test_overlay_from_file(self):
+        """Tests applying an overlay file with
+        an overlay_keys table."""
+        path = os.path.join(self.test_dir, "delta.db")
+        con = sqlite3.connect(path)
+        pd.DataFrame(
+            {"region": ["north", "south"], "year": [2020, 2021], "units": [33, 44]}
+        ).to_sql("prices", con, index=False)
+        pd.DataFrame({"rate": [0.3]}).to_sql("rates", con, index=False)
+        pd.DataFrame(
+            {"Table Name": ["prices"], "Key Columns": ["region, year"]}
+        ).to_sql("overlay_keys", con, index=False)
+        con.close()
+
+        res = IO(None).overlay(self.base, path)
+
+        self.assertEqual(set(res.keys()), set(self.base.keys()))
+        self.assertEqual(list(res["prices"]["units"]), [10, 20, 33, 44])
+        self.assertEqual(list(res["prices"]["year"]), [2020, 2020, 2020, 2021])
+        self.assertEqual(list(res["rates"]["rate"]), [0.3])
+        self.assertIs(res["other"], self.base["other"])
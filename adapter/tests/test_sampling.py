@@ -0,0 +1,90 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.i_o import IO
+from adapter.sampling import keep_row, keep_rows, parse_sample, sql_sample_query
+from adapter.to_python import Excel
+
+
+class SamplingTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_fraction_is_deterministic(self):
+        """Tests that all readers select the same rows
+        for a fraction of the rows."""
+        mask = keep_rows(1000, 0.1)
+
+        self.assertEqual(list(mask), [keep_row(i, 0.1) for i in range(1000)])
+        self.assertTrue(80 < mask.sum() < 120)
+
+        con = sqlite3.connect(":memory:")
+        pd.DataFrame({"x": np.arange(1000)}).to_sql("t", con, index=False)
+        sampled = pd.read_sql_query(sql_sample_query("t", 0.1), con)
+        con.close()
+
+        self.assertEqual(list(sampled["x"]), list(np.flatnonzero(mask)))
+
+        for sample in [-1, 0.0, 1.5, True, "10"]:
+            with self.assertRaises(ValueError):
+                parse_sample(sample)
+
+    def test_load_sample(self):
+        """Tests loading a row sample of each table."""
+        path = os.path.join(self.test_dir, "inputs_from_files_vSample.csv")
+
+        pd.DataFrame({"x": np.arange(100)}).to_csv(
+            os.path.join(self.test_dir, "large.csv"), index=False
+        )
+        pd.DataFrame(
+            {
+                "File Path": [
+                    os.path.join(self.test_dir, "large.csv"),
+                    os.path.join(os.getcwd(), "adapter/tests/test.xlsx"),
+                    os.path.join(os.getcwd(), "adapter/tests/test.db"),
+                ],
+                "Table Name": [None, "xlsx_table1, run_parameters", None],
+                "Query Only": [None, None, None],
+            }
+        ).to_csv(path, index=False)
+
+        res = IO(path).load(sample=2, skip_writeout=True)
+        tables = res["tables_as_dict_of_dfs"]
+
+        self.assertEqual(res["sample"], 2)
+        self.assertEqual(len(tables["inputs_from_files"]), 3)
+        for name in ["large", "xlsx_table1", "table1"]:
+            self.assertEqual(len(tables[name]), 2)
+        self.assertEqual(list(tables["large"]["x"]), [0, 1])
+
+        res = IO(path).load(sample=0.3, skip_writeout=True)
+        self.assertEqual(
+            list(res["tables_as_dict_of_dfs"]["large"]["x"]),
+            list(np.flatnonzero(keep_rows(100, 0.3))),
+        )
+
+        # no database of sampled tables, unless requested
+        res = IO(path).load(sample=2, save_input=False)
+        self.assertFalse("db_path" in res.keys())
+
+        res = IO(path).load(sample=2, save_input=False, write_sample=True)
+        self.assertTrue(os.path.isfile(res["db_path"]))
+
+    def test_sampled_workbook_is_closed(self):
+        """Tests that the streaming reader releases the
+        workbook once the sampled tables are loaded."""
+        exl = Excel(os.path.join(os.getcwd(), "adapter/tests/test.xlsx"), sample=2)
+        tables = exl.load(["xlsx_table1"], kind="tables")
+
+        self.assertEqual(len(tables["xlsx_table1"]), 2)
+        self.assertIsNone(exl.wb._archive.fp)
+
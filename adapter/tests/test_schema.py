@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.i_o import IO
+from adapter.schema import Schema
+
+
+class SchemaTests(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+        self.schema_table = pd.DataFrame(
+            {
+                "Table Name": ["sales", "sales", "sales", "sales", "regions"],
+                "Column": ["Region", "Year", "Amount", "Flag", "Region"],
+                "Dtype": ["category", "int64", "float64", "bool", "str"],
+                "Index": ["Y", "Y", None, None, None],
+                "Required": ["Y", "Y", None, None, "Y"],
+            }
+        )
+
+        self.sales = pd.DataFrame(
+            {
+                "Region": ["west", "east", "west"],
+                "Year": [2020, 2021, 2022],
+                "Amount": [1.5, 2, 3],
+                "Flag": ["Y", "N", "TRUE"],
+            }
+        )
+        self.regions = pd.DataFrame({"Region": ["west", "east"], "Size": [1, 2]})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_inputs(self, sales, with_schema=True):
+        """Writes an inputs_from_files csv pointing
+        to csv tables and returns its path."""
+        paths = list()
+        tables = {"sales": sales, "regions": self.regions}
+        if with_schema:
+            tables["table_schema"] = self.schema_table
+
+        for name, df in tables.items():
+            path = os.path.join(self.test_dir, name + ".csv")
+            df.to_csv(path, index=False)
+            paths.append(path)
+
+        path = os.path.join(self.test_dir, "inputs_from_files_vSchema.csv")
+        pd.DataFrame(
+            {
+                "File Path": paths,
+                "Table Name": [None] * len(paths),
+                "Query Only": [None] * len(paths),
+            }
+        ).to_csv(path, index=False)
+
+        return path
+
+    def test_cast_and_validate(self):
+        """Tests conversion to the declared types and
+        the aggregated validation report."""
+        schema = Schema(self.schema_table)
+
+        sales = schema.cast("sales", self.sales)
+        self.assertEqual(sales["Region"].dtype, "category")
+        self.assertEqual(sales["Year"].dtype, np.int64)
+        self.assertEqual(sales["Amount"].dtype, np.float64)
+        self.assertEqual(list(sales["Flag"]), [True, False, True])
+        self.assertEqual(
+            schema.validate({"sales": sales, "regions": self.regions}), []
+        )
+
+        bad = self.sales.copy()
+        bad["Year"] = [2020, "x", 2022.5]
+        bad["Amount"] = [1.0, "n/a", None]
+        bad = bad.drop(columns="Region")
+
+        bad = schema.cast("sales", bad)
+        # columns that do not convert are left as read
+        self.assertEqual(bad["Year"].dtype, object)
+        self.assertEqual(bad["Flag"].dtype, bool)
+
+        errors = schema.validate({"sales": bad})
+        self.assertEqual(len(errors), 5)
+        self.assertTrue(any("sales.Region: column not found" in e for e in errors))
+        self.assertTrue(any("sales.Year: 2 values" in e for e in errors))
+        self.assertTrue(any("'n/a'" in e for e in errors))
+        self.assertTrue(any("regions: table" in e for e in errors))
+
+        with self.assertRaises(ValueError):
+            schema.check({"sales": bad})
+
+        with self.assertRaises(ValueError):
+            Schema(
+                pd.DataFrame(
+                    {"Table Name": ["a"], "Column": ["b"], "Dtype": ["no_such_type"]}
+                )
+            )
+
+    def test_load_with_schema(self):
+        """Tests typed loading with a schema table
+        and with a passed schema."""
+        path = self.write_inputs(self.sales)
+
+        for schema in [None, self.schema_table]:
+            res = IO(path).load(skip_writeout=True, schema=schema)
+            sales = res["tables_as_dict_of_dfs"]["sales"]
+
+            self.assertEqual(sales.index.names, ["Region", "Year"])
+            self.assertEqual(sales.index.get_level_values(1).dtype, np.int64)
+            self.assertEqual(sales["Amount"].dtype, np.float64)
+            self.assertEqual(sales["Flag"].dtype, bool)
+            self.assertEqual(
+                res["tables_as_dict_of_dfs"]["regions"]["Region"].dtype, object
+            )
+
+    def test_load_validation_errors(self):
+        """Tests that all schema violations get reported
+        before any output is written."""
+        sales = self.sales.copy()
+        sales.loc[1, "Year"] = None
+        sales["Amount"] = [1.5, 2, "abc"]
+        path = self.write_inputs(sales)
+
+        with self.assertRaises(ValueError) as context:
+            IO(path).load(quick_db_out_filename="test_schema", skip_writeout=False)
+
+        msg = str(context.exception)
+        self.assertIn("sales.Year", msg)
+        self.assertIn("sales.Amount", msg)
+        self.assertIn("abc", msg)
+        self.assertFalse(os.path.exists(os.path.join(os.getcwd(), "test_schema.db")))
@@ -0,0 +1,89 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.shared import attach, publish
+
+
+def summarize_shared(name):
+    """Attaches to published tables in a worker process."""
+    with attach(name) as tables:
+        df = tables["numbers"]
+
+        try:
+            df.iloc[0, 0] = -1.0
+            read_only = False
+        except ValueError:
+            read_only = True
+
+        return {
+            "sum": float(df["x"].sum()),
+            "labels": list(tables["labels"]["region"].astype(str)),
+            "read_only": read_only,
+        }
+
+
+class SharedTablesTests(unittest.TestCase):
+    def setUp(self):
+        self.dfs = {
+            "numbers": pd.DataFrame(
+                {
+                    "x": np.arange(1000, dtype=float),
+                    "n": np.arange(1000),
+                    "flag": np.arange(1000) % 2 == 0,
+                    "when": pd.date_range("2020-01-01", periods=1000, freq="h"),
+                }
+            ),
+            "labels": pd.DataFrame(
+                {
+                    "region": pd.Categorical(["west", "east", "west"]),
+                    "name": ["a", None, "c"],
+                    "count": pd.array([1, None, 3], dtype="Int64"),
+                },
+                index=pd.Index(["r1", "r2", "r3"], name="key"),
+            ),
+            "empty": pd.DataFrame({"x": np.array([], dtype=float)}),
+        }
+
+    def test_publish_and_attach(self):
+        """Tests a round trip through shared memory
+        with zero-copy, read-only columns."""
+        with publish(self.dfs) as shared:
+            with attach(shared.name) as tables:
+                self.assertEqual(set(tables.keys()), set(self.dfs.keys()))
+
+                for name, df in self.dfs.items():
+                    pd.testing.assert_frame_equal(tables[name], df)
+
+                numbers = tables["numbers"]
+                for col in ["x", "n", "flag", "when"]:
+                    self.assertFalse(numbers[col].to_numpy().flags.writeable)
+
+                with self.assertRaises(ValueError):
+                    numbers.iloc[0, 0] = 1.0
+
+                # copies are writeable
+                copy = numbers.copy()
+                copy.iloc[0, 0] = 1.0
+                self.assertEqual(numbers.iloc[0, 0], 0.0)
+
+        with self.assertRaises(FileNotFoundError):
+            attach(shared.name)
+
+    def test_attach_in_worker(self):
+        """Tests attaching from a separate process."""
+        with publish(self.dfs) as shared:
+            ctx = multiprocessing.get_context("spawn")
+            with ctx.Pool(2) as pool:
+                results = pool.map(summarize_shared, [shared.name] * 2)
+
+            for res in results:
+                self.assertEqual(res["sum"], float(self.dfs["numbers"]["x"].sum()))
+                self.assertEqual(res["labels"], ["west", "east", "west"])
+                self.assertTrue(res["read_only"])
+
+            # worker exits leave the segments in place
+            with attach(shared.name) as tables:
+                self.assertEqual(len(tables), 3)
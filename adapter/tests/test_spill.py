@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from adapter.i_o import IO
+from adapter.spill import SpillingDict
+
+
+class SpillingDictTests(unittest.TestCase):
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        self.dfs = {
+            "table{}".format(i): pd.DataFrame(
+                {"a": np.arange(1000) * i, "b": ["x{}".format(i)] * 1000}
+            )
+            for i in range(4)
+        }
+        self.size = SpillingDict.get_size(self.dfs["table0"])
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_dir)
+
+    def test_spill_and_reload(self):
+        """Tests that the least recently used tables get
+        spilled once over budget and read back in on access."""
+        tables = SpillingDict(
+            int(2.5 * self.size), spill_dir=self.spill_dir, data=self.dfs
+        )
+
+        self.assertEqual(list(tables.keys()), list(self.dfs.keys()))
+        self.assertLessEqual(tables.memory_usage, 2.5 * self.size)
+
+        metrics = tables.get_metrics()
+        self.assertEqual(metrics["spills"], 2)
+        self.assertEqual(metrics["spilled_tables"], 2)
+        self.assertEqual(len(os.listdir(self.spill_dir)), 2)
+
+        for key, df in self.dfs.items():
+            pd.testing.assert_frame_equal(tables[key], df)
+
+        # a scan through all tables reloads each, as
+        # each reload spills the least recently used one
+        metrics = tables.get_metrics()
+        self.assertEqual(metrics["reloads"], 4)
+        self.assertLessEqual(tables.memory_usage, 2.5 * self.size)
+
+        del tables["table0"]
+        self.assertFalse("table0" in tables)
+
+        tables.close()
+        self.assertEqual(len(tables), 0)
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_load_with_memory_budget(self):
+        """Tests loading inputs under a memory budget."""
+        path = os.path.join(os.getcwd(), r"adapter/tests/inputs_from_files_vTest.csv")
+
+        full = IO(path).load(skip_writeout=True)["tables_as_dict_of_dfs"]
+
+        res = IO(path).load(
+            skip_writeout=True,
+            memory_budget=1,
+            spill_dir=self.spill_dir,
+            set_first_col_as_index=True,
+        )
+        tables = res["tables_as_dict_of_dfs"]
+
+        self.assertTrue(isinstance(tables, SpillingDict))
+        self.assertGreater(tables.get_metrics()["spills"], 0)
+        self.assertEqual(set(tables.keys()), set(full.keys()))
+
+        # statistics do not read the spilled tables back in
+        res = IO(path).load(
+            skip_writeout=True,
+            memory_budget=1,
+            spill_dir=self.spill_dir,
+            collect_stats=True,
+        )
+        stats_tables = res["tables_as_dict_of_dfs"]
+        self.assertEqual(
+            {record["table"]: record["rows"] for record in res["load_stats"]["tables"]},
+            {name: len(full[name]) for name in full.keys()},
+        )
+        self.assertEqual(
+            stats_tables.get_metrics()["reloads"],
+            IO(path).load(
+                skip_writeout=True, memory_budget=1, spill_dir=self.spill_dir
+            )["tables_as_dict_of_dfs"].get_metrics()["reloads"],
+        )
+
+        full = IO(path).first_col_to_index(full)
+        for key in full.keys():
+            pd.testing.assert_frame_equal(tables[key], full[key])
+
+
+    def test_parquet_round_trip(self):
+        """Tests that spilled tables read back unchanged,
+        falling back to pickle where parquet changes the types."""
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow not installed")
+
+        dfs = {
+            "numeric": pd.DataFrame({"a": np.arange(10), "b": np.linspace(0, 1, 10)}),
+            "ints": pd.DataFrame({"a": pd.Series(list(range(10)), dtype=object)}),
+            "mixed": pd.DataFrame({"a": pd.Series([1, 2.5] * 5, dtype=object)}),
+            "indexed": pd.DataFrame(
+                {"a": ["x"] * 10}, index=pd.Index(np.arange(10) * 2, name="key")
+            ),
+        }
+
+        tables = SpillingDict(1, spill_dir=self.spill_dir)
+        for key, df in dfs.items():
+            tables[key] = df.copy()
+
+        formats = {key: tables.spilled[key][1] for key in ["numeric", "ints", "mixed"]}
+        self.assertEqual(
+            formats, {"numeric": "parquet", "ints": "pkl", "mixed": "pkl"}
+        )
+
+        for key, df in dfs.items():
+            pd.testing.assert_frame_equal(tables[key], df)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,23 @@
 import logging
 import os
 import traceback
-import openpyxl
 
-import numpy as np
-import pandas as pd
-from sqlalchemy import create_engine, MetaData
-
-from adapter.comm.tools import process_column_labels
-
-import logging
+from adapter.catalog import get_excel_objects
+from adapter.comm.tools import (
+    clean_label,
+    lazy_import,
+    process_column_labels,
+    select_names,
+)
+from adapter.label_map import Labels
+from adapter.sampling import keep_row, parse_sample, sample_frame, sql_sample_query
+from adapter.stats import LoadStats
+
+# backends get imported once first used
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+openpyxl = lazy_import("openpyxl")
+sqlalchemy = lazy_import("sqlalchemy")
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -31,13 +39,53 @@ class Excel(object):
         pre_existing_keys: dictionary key index
             Keys is the previously loaded
             dictionary of dataframes
+
+        stats: LoadStats
+            Default: None, no statistics collected
+            Collects timing and memory statistics
+            of the loading stages
+
+        schema: Schema
+            Default: None
+            Declared column types, see `adapter.schema.Schema`.
+            Declared columns are converted to the declared
+            types instead of numbers being converted to floats.
+
+        sample: int or float
+            Default: None, read all rows
+            Row sample read from each table and range, see
+            `adapter.sampling.parse_sample`. The workbook
+            gets opened with the streaming reader, and only
+            the rows of the sample get read.
+
+        unsampled: list of str
+            Default: None
+            Names or glob patterns of tables and
+            ranges read in full when sampling
     """
 
-    def __init__(self, file_path, pre_existing_keys=None):
+    def __init__(
+        self,
+        file_path,
+        pre_existing_keys=None,
+        stats=None,
+        schema=None,
+        sample=None,
+        unsampled=None,
+    ):
         self.file_path = file_path
-        self.wb = openpyxl.load_workbook(
-            self.file_path, data_only=True, read_only=False, keep_vba=False
-        )
+        self.stats = stats if stats is not None else LoadStats(enabled=False)
+        self.schema = schema
+        self.sample = sample
+        self.unsampled = unsampled if unsampled is not None else list()
+
+        with self.stats.stage("open_workbook", file_path=self.file_path):
+            self.wb = openpyxl.load_workbook(
+                self.file_path,
+                data_only=True,
+                read_only=sample is not None,
+                keep_vba=False,
+            )
         self.pre_existing_keys = pre_existing_keys
 
         log.info("Connected to: {}".format(self.file_path))
@@ -73,9 +121,28 @@ class Excel(object):
                 the corresponding named data object
                 values
         """
+        try:
+            return self.read_data_objects(data_object_names, kind)
+        finally:
+            if self.sample is not None:
+                # the streaming reader keeps the file open until closed
+                self.wb.close()
+
+    def read_data_objects(self, data_object_names, kind):
+        """Reads the data objects from the workbook, see `load`."""
         # check if any name in data_object_names not in excel file
-        all_input_ranges = set(self.wb.defined_names.keys())    
-        all_input_tables = {object_table for ws in self.wb.worksheets for object_table in ws.tables.keys()}
+        if self.sample is None:
+            all_input_ranges = set(self.wb.defined_names.keys())    
+            all_input_tables = {object_table for ws in self.wb.worksheets for object_table in ws.tables.keys()}
+        else:
+            # the streaming reader does not list the tables
+            objects = {obj["name"]: obj for obj in get_excel_objects(self.file_path)}
+            all_input_ranges = {
+                name for name, obj in objects.items() if obj["object_type"] == "named_range"
+            }
+            all_input_tables = {
+                name for name, obj in objects.items() if obj["object_type"] == "table"
+            }
         all_input_objects = all_input_ranges | all_input_tables
 
         if isinstance(data_object_names, list):
@@ -104,7 +171,11 @@ class Excel(object):
         if kind in ['all', 'ranges']:
             try:
                 for name in data_object_names & all_input_ranges:
-                    dict_of_dfs[name] = self.get_named_data_object(name)
+                    with self.stats.stage("convert", table=name, file_path=self.file_path):
+                        if self.sample is not None and objects[name]["ref"] is not None:
+                            dict_of_dfs[name] = self.get_sampled_data_object(objects[name])
+                        else:
+                            dict_of_dfs[name] = self.get_named_data_object(name)
             except:
                 msg = (
                 "Failed to read input named range {}"
@@ -118,14 +189,33 @@ class Excel(object):
                 raise ValueError(msg.format(name, self.file_path))
 
         # get named tables
-        if kind in ['all', 'tables']:
+        if kind in ['all', 'tables'] and self.sample is not None:
+            try:
+                for table_name in data_object_names & all_input_tables:
+                    with self.stats.stage(
+                        "convert", table=table_name, file_path=self.file_path
+                    ):
+                        dict_of_dfs[table_name] = self.get_sampled_data_object(
+                            objects[table_name]
+                        )
+            except:
+                msg = (
+                "Failed to read input named table {}"
+                " from input file {}."
+                )
+                raise ValueError(msg.format(table_name, self.file_path))
+
+        elif kind in ['all', 'tables']:
             try:
                 for ws in self.wb.worksheets:
                     for table_name, table_range in ws.tables.items():
                         if table_name in data_object_names:
-                            dict_of_dfs[table_name] = self.convert_data_object_to_df(
-                                ws[table_range], table_name
-                            )
+                            with self.stats.stage(
+                                "convert", table=table_name, file_path=self.file_path
+                            ):
+                                dict_of_dfs[table_name] = self.convert_data_object_to_df(
+                                    ws[table_range], table_name
+                                )
             except:
                 msg = (
                 "Failed to read input named table {}"
@@ -145,13 +235,23 @@ class Excel(object):
         for k, df in dict_of_dfs.items():
             # xlwings-based Excel class converted all numbers to float types.
             # The code below maintains backward compatibility
-            df = df.astype(
-                {
-                    k: float if np.issubdtype(v, np.number) else v
-                    for k, v in df.dtypes.items()
-                }
-            )
-            df.columns = process_column_labels(df.columns)
+            with self.stats.stage("astype", table=k, file_path=self.file_path):
+                declared = (
+                    set() if self.schema is None else self.schema.get_dtypes(k).keys()
+                )
+                df = df.astype(
+                    {
+                        c: float
+                        if np.issubdtype(v, np.number)
+                        and clean_label(str(c)) not in declared
+                        else v
+                        for c, v in df.dtypes.items()
+                    }
+                )
+                if self.schema is not None:
+                    df = self.schema.cast(k, df)
+            with self.stats.stage("process_column_labels", table=k, file_path=self.file_path):
+                df.columns = process_column_labels(df.columns)
             dict_of_dfs[k] = df
 
         log.info(f"Read in input named tables and ranges: {data_object_names}")
@@ -207,6 +307,66 @@ class Excel(object):
 
         return df
 
+    def get_sampled_data_object(self, data_object):
+        """Reads the rows of the row sample of a named table
+        or range, streaming only the rows within the sample
+        bounds. Tables and ranges that are not sampled get
+        read in full.
+
+        Parameters:
+
+            data_object: dict
+                Named table or range, as listed by
+                `adapter.catalog.get_excel_objects`
+
+        Returns:
+
+            df: dataframe
+                named table or range in format of
+                pandas dataframe read from the input workbook
+        """
+        name = data_object["name"]
+        min_col, min_row, max_col, max_row = openpyxl.utils.cell.range_boundaries(
+            data_object["ref"]
+        )
+
+        if ":" not in data_object["ref"]:
+            # single cell
+            value = next(
+                self.wb[data_object["sheet"]].iter_rows(
+                    min_row=min_row,
+                    max_row=min_row,
+                    min_col=min_col,
+                    max_col=min_col,
+                    values_only=True,
+                )
+            )[0]
+            return pd.DataFrame([[value]], columns=[name])
+
+        kind, value = (None, None)
+        if not select_names([name], self.unsampled):
+            kind, value = parse_sample(self.sample)
+
+        if kind == "head":
+            # the first row holds the column labels
+            max_row = min(max_row, min_row + value)
+
+        rows = self.wb[data_object["sheet"]].iter_rows(
+            min_row=min_row,
+            max_row=max_row,
+            min_col=min_col,
+            max_col=max_col,
+            values_only=True,
+        )
+        columns = list(next(rows))
+
+        if kind == "fraction":
+            data = [list(row) for pos, row in enumerate(rows) if keep_row(pos, value)]
+        else:
+            data = [list(row) for row in rows]
+
+        return pd.DataFrame(data, columns=columns)
+
     def convert_data_object_to_df(self, data_object, name):
         """Converts data objects defined as named ranges
         and tables in excel file into dataframes
@@ -248,11 +408,44 @@ class Db(object):
         pre_existing_keys: dictionary key index
             Keys is the previously loaded
             dictionary of dataframes
+
+        stats: LoadStats
+            Default: None, no statistics collected
+            Collects timing and memory statistics
+            of the loading stages
+
+        schema: Schema
+            Default: None
+            Declared column types, see `adapter.schema.Schema`.
+            Declared columns are converted as each table is read.
+
+        sample: int or float
+            Default: None, read all rows
+            Row sample read from each table, see
+            `adapter.sampling.parse_sample`. The sample
+            is selected by the query.
+
+        unsampled: list of str
+            Default: None
+            Names or glob patterns of tables read
+            in full when sampling
     """
 
-    def __init__(self, file_path, pre_existing_keys=None):
+    def __init__(
+        self,
+        file_path,
+        pre_existing_keys=None,
+        stats=None,
+        schema=None,
+        sample=None,
+        unsampled=None,
+    ):
         self.file_path = file_path
         self.pre_existing_keys = pre_existing_keys
+        self.stats = stats if stats is not None else LoadStats(enabled=False)
+        self.schema = schema
+        self.sample = sample
+        self.unsampled = unsampled if unsampled is not None else list()
 
     def load(self, table_names=None):
         """Loads tables from a sqlite file
@@ -271,11 +464,15 @@ class Db(object):
         #     # check if file exists
         #     raise ImportError(f'Cannot find {self.file_path}')
         con_str = f'sqlite+pysqlite:///{self.file_path}'
-        engine = create_engine(con_str)
-        metadata = MetaData()
-        metadata.reflect(bind=engine)
-
-        keys = metadata.tables.keys()
+        engine = sqlalchemy.create_engine(con_str)
+
+        # table names only, the columns get
+        # reflected as each selected table is read
+        fingerprints = Labels().set_labels()["fingerprints"]
+        keys = [
+            key for key in sqlalchemy.inspect(engine).get_table_names()
+            if key != fingerprints
+        ]
         if len(keys) == 0:
             # check database integrity
             raise IOError(
@@ -289,12 +486,48 @@ class Db(object):
             # skip pre_existing_keys
         if table_names is not None:
             # only import given table names
-            keys = keys & set(table_names)
+            keys = [t for t in keys if t in set(table_names)]
         dict_of_dfs = dict()
         for t in keys:
-            dict_of_dfs[t] = pd.read_sql_table(f'{t}', con=con_str)
+            with self.stats.stage("read_sql", table=t, file_path=self.file_path):
+                if self.sample is None or select_names([t], self.unsampled):
+                    df = pd.read_sql_table(f'{t}', con=con_str)
+                else:
+                    df = self.read_sample(t, engine)
+
+                if self.schema is None:
+                    dict_of_dfs[t] = df
+                else:
+                    dict_of_dfs[t] = self.schema.cast(t, df)
         return dict_of_dfs
 
+    def read_sample(self, table_name, engine):
+        """Reads the row sample of a table, limiting
+        the rows in the query. Tables without rowids
+        get sampled once read in full.
+
+        Parameters:
+
+            table_name: str
+
+            engine: sqlalchemy engine
+
+        Returns:
+
+            df: dataframe
+        """
+        try:
+            return pd.read_sql_query(
+                sql_sample_query(table_name, self.sample), con=engine
+            )
+        except sqlalchemy.exc.OperationalError:
+            msg = "Sampling the rows of table {} once read in full."
+            log.info(msg.format(table_name))
+
+            return sample_frame(
+                pd.read_sql_table(table_name, con=engine), self.sample
+            )
+
 
 class Db_sqlalchemy(object):
     """Loads tables from a database using sqlalchemy to python
@@ -328,7 +561,7 @@ class Db_sqlalchemy(object):
                 + "@"
                 + file_path
         )
-        self.engine = create_engine(self.cxn_str)
+        self.engine = sqlalchemy.create_engine(self.cxn_str)
         self.file_path = file_path
         self.pre_existing_keys = pre_existing_keys
 
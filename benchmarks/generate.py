@@ -0,0 +1,262 @@
+"""Generators of synthetic input files used by the
+adapter benchmarks. All data is generated from a seeded
+random state so that repeated runs read identical inputs.
+"""
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table
+
+
+def make_table(rows, cols, seed=0):
+    """Creates a table with a mix of float, integer
+    and repeated label columns.
+
+    Parameters:
+
+        rows: int
+            Number of rows
+
+        cols: int
+            Number of columns
+
+        seed: int
+            Random state seed
+
+    Returns:
+
+        df: pandas dataframe
+    """
+    rng = np.random.RandomState(seed)
+    labels = np.array(["region_{}".format(i) for i in range(20)])
+
+    data = dict()
+    for col in range(cols):
+        if col % 3 == 0:
+            data["label_{}".format(col)] = labels[rng.randint(0, len(labels), rows)]
+        elif col % 3 == 1:
+            data["int_{}".format(col)] = rng.randint(0, 1000, rows)
+        else:
+            data["float_{}".format(col)] = rng.random_sample(rows)
+
+    return pd.DataFrame(data)
+
+
+def make_run_parameters(outpath, version="bench"):
+    """Creates a `run_parameters` table.
+
+    Parameters:
+
+        outpath: str
+            Output path
+
+        version: str
+            Version
+
+    Returns:
+
+        df: pandas dataframe
+    """
+    return pd.DataFrame({"Output Path": [outpath], "Version": [version]})
+
+
+def make_workbook(path, n_tables, rows, cols, run_parameters=None, seed=0):
+    """Writes an excel workbook with one named
+    table per worksheet.
+
+    Parameters:
+
+        path: str
+            Output file path
+
+        n_tables: int
+            Number of tables
+
+        rows: int
+            Number of rows of each table
+
+        cols: int
+            Number of columns of each table
+
+        run_parameters: pandas dataframe
+            Default: None
+            Optional `run_parameters` table to include
+
+        seed: int
+            Random state seed of the first table
+
+    Returns:
+
+        path: str
+    """
+    wb = Workbook()
+    wb.remove(wb.active)
+
+    tables = {
+        "xlsx_bench_table_{}".format(i): make_table(rows, cols, seed=seed + i)
+        for i in range(n_tables)
+    }
+    if run_parameters is not None:
+        tables["run_parameters"] = run_parameters
+
+    for name, df in tables.items():
+        ws = wb.create_sheet(title=name[:31])
+        ws.append(list(df.columns))
+        for row in df.itertuples(index=False):
+            ws.append([v.item() if hasattr(v, "item") else v for v in row])
+
+        ref = "A1:{}{}".format(get_column_letter(df.shape[1]), df.shape[0] + 1)
+        ws.add_table(Table(displayName=name, ref=ref))
+
+    wb.save(path)
+
+    return path
+
+
+def make_sqlite(path, n_tables, rows, cols, seed=0):
+    """Writes a sqlite database with n_tables tables.
+
+    Parameters:
+
+        path: str
+            Output file path
+
+        n_tables: int
+            Number of tables
+
+        rows: int
+            Number of rows of each table
+
+        cols: int
+            Number of columns of each table
+
+        seed: int
+            Random state seed of the first table
+
+    Returns:
+
+        path: str
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    con = sqlite3.connect(path)
+    for i in range(n_tables):
+        make_table(rows, cols, seed=seed + i).to_sql(
+            "db_bench_table_{}".format(i), con, index=False
+        )
+    con.close()
+
+    return path
+
+
+def make_csv(path, rows, cols, seed=0):
+    """Writes a csv table.
+
+    Parameters:
+
+        path: str
+            Output file path
+
+        rows: int
+            Number of rows
+
+        cols: int
+            Number of columns
+
+        seed: int
+            Random state seed
+
+    Returns:
+
+        path: str
+    """
+    make_table(rows, cols, seed=seed).to_csv(path, index=False)
+
+    return path
+
+
+def make_inputs_from_files_tree(folder, depth, breadth, rows, cols, outpath=None):
+    """Writes a tree of csv `inputs_from_files` tables, where
+    each pointer table lists `breadth` csv tables and
+    `breadth` nested pointer tables, down to `depth` levels.
+
+    Parameters:
+
+        folder: str
+            Output folder
+
+        depth: int
+            Number of nested levels
+
+        breadth: int
+            Number of tables and nested pointer
+            tables listed in each pointer table
+
+        rows: int
+            Number of rows of each table
+
+        cols: int
+            Number of columns of each table
+
+        outpath: str
+            Default: None
+            Output path of a `run_parameters` table
+            added to the main input, if given
+
+    Returns:
+
+        path: str
+            Path of the main input file
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    counter = [0]
+
+    def make_level(name, level):
+        file_paths = list()
+
+        for _ in range(breadth):
+            counter[0] += 1
+            file_paths.append(
+                make_csv(
+                    os.path.join(folder, "tree_table_{}.csv".format(counter[0])),
+                    rows,
+                    cols,
+                    seed=counter[0],
+                )
+            )
+
+        if level < depth:
+            for i in range(breadth):
+                file_paths.append(
+                    make_level("{}_{}".format(name, i), level + 1)
+                )
+
+        path = os.path.join(folder, "inputs_from_files_v{}.csv".format(name))
+        pd.DataFrame(
+            {
+                "File Path": file_paths,
+                "Table Name": [None] * len(file_paths),
+                "Query Only": [None] * len(file_paths),
+            }
+        ).to_csv(path, index=False)
+
+        return path
+
+    path = make_level("Tree", 1)
+
+    if outpath is not None:
+        make_run_parameters(outpath).to_csv(
+            os.path.join(folder, "run_parameters.csv"), index=False
+        )
+        pointer = pd.read_csv(path)
+        pointer.loc[len(pointer), "File Path"] = os.path.join(folder, "run_parameters.csv")
+        pointer.to_csv(path, index=False)
+
+    return path
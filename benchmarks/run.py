@@ -0,0 +1,291 @@
+"""Benchmarks of the adapter input and output paths.
+
+Generates synthetic inputs of a chosen size, times each
+benchmark a number of times and writes the results as json.
+When a baseline result file is given, the run is compared
+against it and the command exits with status 1 if any of the
+benchmarks got slower than the allowed tolerance.
+
+Usage, from the repo root folder:
+
+    python -m benchmarks.run --size small --output bench.json
+    python -m benchmarks.run --size small --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import adapter
+from adapter.i_o import IO, from_pickle, to_pickle
+from adapter.to_python import Db, Excel
+from benchmarks import generate
+
+# number of tables, rows and columns of each of the generated inputs
+SIZES = {
+    "small": {
+        "xlsx": (5, 200, 10),
+        "db": (10, 5000, 10),
+        "csv": (1, 100000, 10),
+        "tree": (2, 3, 1000, 10),
+    },
+    "medium": {
+        "xlsx": (20, 1000, 10),
+        "db": (50, 20000, 10),
+        "csv": (1, 1000000, 10),
+        "tree": (3, 4, 10000, 10),
+    },
+    "large": {
+        "xlsx": (50, 5000, 20),
+        "db": (200, 50000, 20),
+        "csv": (1, 5000000, 20),
+        "tree": (4, 4, 50000, 20),
+    },
+}
+
+
+def make_inputs(folder, size):
+    """Generates all benchmark inputs.
+
+    Parameters:
+
+        folder: str
+            Folder to write the inputs to
+
+        size: str
+            'small', 'medium' or 'large'
+
+    Returns:
+
+        paths: dict
+            Input file paths
+    """
+    spec = SIZES[size]
+    outpath = os.path.join(folder, "output")
+
+    n_tables, rows, cols = spec["xlsx"]
+    xlsx = generate.make_workbook(
+        os.path.join(folder, "bench.xlsx"),
+        n_tables,
+        rows,
+        cols,
+        run_parameters=generate.make_run_parameters(outpath),
+    )
+
+    n_tables, rows, cols = spec["db"]
+    db = generate.make_sqlite(os.path.join(folder, "bench.db"), n_tables, rows, cols)
+
+    _, rows, cols = spec["csv"]
+    csv = generate.make_csv(os.path.join(folder, "bench.csv"), rows, cols)
+
+    depth, breadth, rows, cols = spec["tree"]
+    tree = generate.make_inputs_from_files_tree(
+        os.path.join(folder, "tree"), depth, breadth, rows, cols
+    )
+
+    return {"xlsx": xlsx, "db": db, "csv": csv, "tree": tree, "outpath": outpath}
+
+
+def get_benchmarks(paths):
+    """Defines the benchmarks.
+
+    Parameters:
+
+        paths: dict
+            Input file paths, see `make_inputs`
+
+    Returns:
+
+        benchmarks: dict
+            Benchmark name: function to time
+    """
+    tables = Db(paths["db"]).load()
+    pickle_path = os.path.join(paths["outpath"], "bench.pkl.gz")
+    to_pickle(tables, pickle_path)
+
+    def io_load():
+        res = IO(paths["xlsx"]).load(save_input=False)
+        shutil.rmtree(res["outpath"])
+
+    def create_db():
+        IO(None).create_db(tables, outpath=paths["outpath"], run_tag="bench")
+
+    def write_csv():
+        IO(None).write(
+            type="csv",
+            data_as_dict_of_dfs=tables,
+            outpath=paths["outpath"],
+            run_tag="bench",
+        )
+
+    return {
+        "Excel.load": lambda: Excel(paths["xlsx"]).load(),
+        "Db.load": lambda: Db(paths["db"]).load(),
+        "IO.get_tables.csv": lambda: IO(None).get_tables(paths["csv"]),
+        "IO.load.xlsx": io_load,
+        "IO.load.tree": lambda: IO(paths["tree"]).load(
+            skip_writeout=True, save_input=False, create_db=False, recursive=True
+        ),
+        "IO.create_db": create_db,
+        "IO.write.csv": write_csv,
+        "to_pickle": lambda: to_pickle(tables, pickle_path),
+        "from_pickle": lambda: from_pickle(pickle_path),
+    }
+
+
+def run(size="small", repeat=3, select=None):
+    """Runs the benchmarks.
+
+    Parameters:
+
+        size: str
+            'small', 'medium' or 'large'
+
+        repeat: int
+            Number of times each benchmark is timed
+
+        select: list of str
+            Default: None runs all benchmarks
+            Names of the benchmarks to run
+
+    Returns:
+
+        results: dict
+            Json serializable results
+    """
+    folder = tempfile.mkdtemp(prefix="adapter_bench_")
+
+    try:
+        paths = make_inputs(folder, size)
+        os.makedirs(paths["outpath"])
+
+        benchmarks = get_benchmarks(paths)
+
+        results = dict()
+        for name, func in benchmarks.items():
+            if select is not None and name not in select:
+                continue
+
+            times = list()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                times.append(time.perf_counter() - start)
+
+            results[name] = {
+                "min": min(times),
+                "median": statistics.median(times),
+                "times": times,
+            }
+
+            print("{:<20} min {:9.4f} s  median {:9.4f} s".format(
+                name, results[name]["min"], results[name]["median"]))
+
+    finally:
+        shutil.rmtree(folder)
+
+    return {
+        "meta": {
+            "adapter": adapter.__version__,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "size": size,
+            "repeat": repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Compares benchmark results against a baseline.
+
+    Parameters:
+
+        results: dict
+            Return of `run`
+
+        baseline: dict
+            Return of `run` of an earlier version
+
+        tolerance: float
+            Allowed relative slowdown of the median time
+
+    Returns:
+
+        comparison: dict
+            Benchmark name: dict of 'baseline', 'current',
+            'ratio' and 'regression' flag
+    """
+    if results["meta"]["size"] != baseline["meta"]["size"]:
+        print(
+            "Warning: comparing {} inputs against a {} inputs baseline.".format(
+                results["meta"]["size"], baseline["meta"]["size"]
+            )
+        )
+
+    comparison = dict()
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+
+        base = baseline["results"][name]["median"]
+        ratio = result["median"] / base if base > 0 else float("inf")
+
+        comparison[name] = {
+            "baseline": base,
+            "current": result["median"],
+            "ratio": ratio,
+            "regression": ratio > 1.0 + tolerance,
+        }
+
+        print("{:<20} {:9.4f} s -> {:9.4f} s  x{:5.2f}{}".format(
+            name, base, result["median"], ratio,
+            "  REGRESSION" if comparison[name]["regression"] else ""))
+
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", choices=list(SIZES.keys()), default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--select", nargs="*", default=None,
+                        help="names of the benchmarks to run")
+    parser.add_argument("--output", default=None,
+                        help="json file to write the results to")
+    parser.add_argument("--baseline", default=None,
+                        help="json results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(size=args.size, repeat=args.repeat, select=args.select)
+
+    status = 0
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+        results["comparison"] = compare(results, baseline, tolerance=args.tolerance)
+
+        if any(c["regression"] for c in results["comparison"].values()):
+            status = 1
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -40,7 +40,7 @@ setup(
         "Programming Language :: Python :: 3.8",
     ],
     keywords="data, tables, IO for research computation, sql, excel, csv, dataframe, connection",
-    packages=find_packages(exclude=["*.tests", "*.tests"]),
+    packages=find_packages(exclude=["*.tests", "*.tests", "benchmarks", "benchmarks.*"]),
     install_requires=[
         "pandas>=2.2.0",
         "xlwings>=0.19.4",